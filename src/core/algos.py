@@ -0,0 +1,540 @@
+"""
+底层抽样算法 — 与 SmartSampler 状态无关的纯函数/数据结构
+"""
+import re
+import heapq
+import random as _random
+
+
+class FenwickTree:
+    """树状数组（Fenwick Tree）— 支持 O(log n) 的前缀和更新与按前缀和定位
+
+    用于带权无放回抽样：构建 O(n)，每次抽取 O(log n)。
+    """
+
+    __slots__ = ("n", "tree", "weights", "total", "_top")
+
+    def __init__(self, weights):
+        n = len(weights)
+        w = [x if x > 0 else 0.0 for x in weights]
+        tree = [0.0] + w
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self.n = n
+        self.tree = tree
+        self.weights = w
+        self.total = sum(w)
+        top = 1
+        while top * 2 <= n:
+            top *= 2
+        self._top = top
+
+    def add(self, idx, delta):
+        """第 idx 项（0 起）权重增加 delta"""
+        self.weights[idx] += delta
+        self.total += delta
+        tree = self.tree
+        n = self.n
+        i = idx + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def remove(self, idx):
+        """将第 idx 项权重清零（等价于从池中移除）"""
+        w = self.weights[idx]
+        if w:
+            self.add(idx, -w)
+
+    def prefix(self, idx):
+        """前 idx 项（0..idx-1）的权重和"""
+        tree = self.tree
+        total = 0.0
+        i = min(idx, self.n)
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, u):
+        """返回累计权重首次超过 u 的位置（0 起），越界时返回 n"""
+        tree = self.tree
+        n = self.n
+        pos = 0
+        mask = self._top if n else 0
+        while mask:
+            nxt = pos + mask
+            if nxt <= n and tree[nxt] <= u:
+                pos = nxt
+                u -= tree[nxt]
+            mask >>= 1
+        return pos
+
+
+def weighted_sample_indices(weights, k, rng=None):
+    """带权重的无放回抽样，返回被选中位置的列表（按抽中顺序）
+
+    权重全部为 0（或剩余权重耗尽）时，对剩余位置做等概率抽取，
+    与原 _weighted_select 的行为保持一致。
+
+    Args:
+        weights: 权重序列（≥0）
+        k: 抽取数量
+        rng: 提供 random()/sample() 的随机源，默认使用 random 模块
+    """
+    rng = rng or _random
+    n = len(weights)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    ft = FenwickTree(weights)
+    eps = ft.total * 1e-12
+    result = []
+    while len(result) < k:
+        if ft.total <= eps:
+            break
+        idx = ft.find(rng.random() * ft.total)
+        if idx >= n or ft.weights[idx] <= 0:
+            # 浮点累积误差导致越界，按当前剩余权重重建后重试
+            ft = FenwickTree(ft.weights)
+            eps = ft.total * 1e-12
+            continue
+        result.append(idx)
+        ft.remove(idx)
+
+    if len(result) < k:
+        # 剩余权重全为 0：等概率补足
+        taken = set(result)
+        rest = [i for i in range(n) if i not in taken]
+        result.extend(rng.sample(rest, k - len(result)))
+    return result
+
+
+def floyd_sample_indices(n, k, rng=None):
+    """Floyd 算法等概率无放回抽取 k 个位置（O(k) 时间与空间，与 n 无关）
+
+    第 j 步从 [0, j] 中取 t，若 t 已被选中则改选 j；得到的集合再打乱为随机抽中顺序。
+    """
+    rng = rng or _random
+    k = min(k, n)
+    randrange = rng.randrange
+    chosen = set()
+    result = []
+    for j in range(n - k, n):
+        t = randrange(j + 1)
+        if t in chosen:
+            t = j
+        chosen.add(t)
+        result.append(t)
+    rng.shuffle(result)
+    return result
+
+
+class SparseWeights:
+    """稀疏权重序列 — 只存放权重不等于 default 的位置，按下标读取（供拒绝采样使用）"""
+
+    __slots__ = ("n", "values", "default")
+
+    def __init__(self, n, values, default=1.0):
+        self.n = n
+        self.values = values
+        self.default = default
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.values.get(i, self.default)
+
+    def bounds(self):
+        """(最大值, 总和)，只遍历稀疏项"""
+        values = self.values
+        rest = self.n - len(values)
+        w_max = max(values.values(), default=0.0)
+        if rest:
+            w_max = max(w_max, self.default)
+        return w_max, sum(values.values()) + rest * self.default
+
+
+def rejection_weighted_indices(weights, k, w_max, rng=None):
+    """带权无放回抽样（拒绝采样）：等概率取位置 i，以 w_i / w_max 的概率接受，已选中的重取
+
+    无需建表，每次尝试 O(1)；期望尝试次数约为 k·(w_max / 平均权重)，
+    只适用于 k 远小于 n 且权重偏斜不大（k·w_max 明显小于总权重）的场合，由调用方保证。
+    """
+    rng = rng or _random
+    n = len(weights)
+    randbelow = rng.randrange
+    rand = rng.random
+    chosen = set()
+    result = []
+    while len(result) < k:
+        i = randbelow(n)
+        if i in chosen or rand() * w_max >= weights[i]:
+            continue
+        chosen.add(i)
+        result.append(i)
+    return result
+
+
+class AliasTable:
+    """Vose 别名表 — 构建 O(n)，之后每次按权重抽取一个位置 O(1)
+
+    同一组权重反复抽取时只需构建一次（由调用方按权重版本缓存）。
+    total / w_max / positive 记录权重总和、最大值与正权重个数，供调度器估计拒绝次数。
+    """
+
+    __slots__ = ("n", "prob", "alias", "total", "w_max", "positive")
+
+    def __init__(self, weights):
+        w = [x if x > 0 else 0.0 for x in weights]
+        n = len(w)
+        total = sum(w)
+        if n == 0 or total <= 0:
+            raise ValueError("别名表需要至少一个正权重")
+        scale = n / total
+        prob = [x * scale for x in w]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1.0]
+        large = [i for i, p in enumerate(prob) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            g = large[-1]
+            alias[s] = g
+            prob[g] -= 1.0 - prob[s]
+            if prob[g] < 1.0:
+                large.pop()
+                small.append(g)
+        # 浮点误差残留的项视为满格
+        for i in large:
+            prob[i] = 1.0
+        for i in small:
+            prob[i] = 1.0
+        self.n = n
+        self.prob = prob
+        self.alias = alias
+        self.total = total
+        self.w_max = max(w)
+        self.positive = n - w.count(0.0)
+
+    def sample(self, rng):
+        """按权重抽取一个位置（一个均匀随机数同时决定格子与格内位置）"""
+        u = rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+
+def alias_sample_indices(table, k, rng=None):
+    """基于别名表的带权无放回抽样：逐次按权重抽取，已选中的重抽
+
+    条件于未选中时各位置仍与权重成正比，与逐次按剩余权重抽取同分布；
+    期望尝试次数不超过 k / (1 − 已选权重占比)，适用于 k·w_max 明显小于总权重的场合。
+    """
+    rng = rng or _random
+    k = min(k, table.positive)
+    sample = table.sample
+    chosen = set()
+    result = []
+    while len(result) < k:
+        i = sample(rng)
+        if i in chosen:
+            continue
+        chosen.add(i)
+        result.append(i)
+    return result
+
+
+class LazyPermutation:
+    """惰性 Fisher–Yates 置换 + 游标 — 不放回抽取池
+
+    置换只在被取用时逐位确定：第 i 次取用与 [i, n) 中的随机位置交换。
+    交换记录保存在稀疏映射中（未出现的位置即为自身），因此取 k 个为 O(k)，
+    抽完 n 个总计 O(n)；重载（reset）只需清空映射，代价不超过本轮已取数量。
+    """
+
+    __slots__ = ("n", "cursor", "_swaps", "_rng")
+
+    def __init__(self, n, rng=None):
+        self.n = n
+        self.cursor = 0
+        self._swaps = {}
+        self._rng = rng or _random
+
+    @property
+    def remaining(self):
+        """剩余可取数量"""
+        return self.n - self.cursor
+
+    def reset(self):
+        """重载：全部位置重新可取"""
+        self.cursor = 0
+        self._swaps.clear()
+
+    def remaining_positions(self):
+        """本轮尚未取出的位置（已取出位置的交换记录在 take 时已删除，只能从剩余区间读取）"""
+        get = self._swaps.get
+        return [get(j, j) for j in range(self.cursor, self.n)]
+
+    def take(self, k):
+        """按随机顺序取出 k 个尚未取过的位置（k 不超过剩余数量）"""
+        n = self.n
+        swaps = self._swaps
+        randrange = self._rng.randrange
+        i = self.cursor
+        end = i + min(k, n - i)
+        out = []
+        while i < end:
+            j = randrange(i, n)
+            vj = swaps.pop(j, j)
+            if j != i:
+                swaps[j] = swaps.pop(i, i)
+            else:
+                swaps.pop(i, None)
+            out.append(vj)
+            i += 1
+        self.cursor = end
+        return out
+
+    def take_where(self, k, blocked):
+        """按随机顺序取出至多 k 个 blocked(位置) 为假的位置，被屏蔽的位置留在池中
+
+        抽到被屏蔽的位置时将其换到剩余区间末尾并缩小抽取范围，
+        每个被屏蔽的位置每次调用至多检查一次；未屏蔽的位置不足 k 个时全部取出。
+        """
+        n = self.n
+        swaps = self._swaps
+        randrange = self._rng.randrange
+        i = self.cursor
+        hi = n
+        out = []
+        while len(out) < k and i < hi:
+            j = randrange(i, hi)
+            vj = swaps.get(j, j)
+            if blocked(vj):
+                hi -= 1
+                vh = swaps.pop(hi, hi)
+                if hi != vj:
+                    swaps[hi] = vj
+                if j != hi:
+                    if j == vh:
+                        swaps.pop(j, None)
+                    else:
+                        swaps[j] = vh
+                continue
+            vi = swaps.pop(i, i)
+            if j != i:
+                if j == vi:
+                    swaps.pop(j, None)
+                else:
+                    swaps[j] = vi
+            out.append(vj)
+            i += 1
+        self.cursor = i
+        return out
+
+
+def multi_draw_best_indices(n, k, rounds, rng=None):
+    """多次取最值：后台等概率抽取 rounds 次（每次 k 个），取被抽中次数最多的 k 个位置（闭式解，O(k)）
+
+    每轮都是等概率抽取，各位置的计数向量的联合分布在位置置换下不变（可交换），
+    平局又按随机键打破，因此"次数最多的 k 个位置"（按次数从高到低排列）
+    恰好是一个均匀随机的有序 k 元组，与轮数无关。直接抽取该元组即可，
+    无需逐轮模拟计数；rounds 只为与配置项对应而保留。
+    """
+    rng = rng or _random
+    return rng.sample(range(n), min(k, n))
+
+
+def progressive_indices(n, k, rng=None):
+    """递进式抽取（按位置）：样本池层层减半，最终从最小的一层中随机取 k 个
+
+    每一层都是上一层的均匀随机子集，等价于同一随机置换的前 size 个位置，
+    因此各层只需按规模推算，不生成中间列表；不足 k 个时沿同一置换继续取，
+    补足部分天然与已选位置不重复（重复名字按位置区分，互不影响）。
+    """
+    rng = rng or _random
+    k = min(k, n)
+    size = n
+    while size > max(k, 2):
+        size = max(1, size // 2)
+    perm = LazyPermutation(n, rng)
+    current = perm.take(size)
+    if size >= k:
+        return rng.sample(current, k)
+    # 递进后不足 k 个，从原总体剩余位置中补充
+    return current + perm.take(k - size)
+
+
+def masked_sample_indices(n, k, rng, blocked):
+    """从 [0, n) 中 blocked(位置) 为假的位置等概率无放回抽取 k 个（按位置拒绝采样）
+
+    期望尝试次数约为 k·n / (未屏蔽数 − k)，调用方应只在屏蔽较少且 k 较小时使用。
+    """
+    randrange = rng.randrange
+    chosen = set()
+    out = []
+    while len(out) < k:
+        i = randrange(n)
+        if i in chosen or blocked(i):
+            continue
+        chosen.add(i)
+        out.append(i)
+    return out
+
+
+class IndexedMinHeap:
+    """带索引的二叉最小堆 — 元素为整数 id，可按 id 直接修改键值
+
+    pos[id] 记录 id 在堆中的位置（-1 表示不在堆中），因此 set（插入或改键）
+    与 pop 均为 O(log n)；键值可为任意可比较对象（如 (时刻, 随机数) 元组）。
+    """
+
+    __slots__ = ("heap", "pos", "keys")
+
+    def __init__(self, keys):
+        """由 id → 键值 的序列建堆（全部 id 入堆，O(n)）"""
+        self.keys = list(keys)
+        n = len(self.keys)
+        self.heap = list(range(n))
+        self.pos = list(range(n))
+        for i in range(n // 2 - 1, -1, -1):
+            self._sift_down(i)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, uid):
+        return self.pos[uid] >= 0
+
+    def _sift_up(self, i):
+        heap, pos, keys = self.heap, self.pos, self.keys
+        uid = heap[i]
+        key = keys[uid]
+        while i:
+            parent = (i - 1) >> 1
+            p_uid = heap[parent]
+            if not key < keys[p_uid]:
+                break
+            heap[i] = p_uid
+            pos[p_uid] = i
+            i = parent
+        heap[i] = uid
+        pos[uid] = i
+
+    def _sift_down(self, i):
+        heap, pos, keys = self.heap, self.pos, self.keys
+        n = len(heap)
+        uid = heap[i]
+        key = keys[uid]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            right = child + 1
+            if right < n and keys[heap[right]] < keys[heap[child]]:
+                child = right
+            c_uid = heap[child]
+            if not keys[c_uid] < key:
+                break
+            heap[i] = c_uid
+            pos[c_uid] = i
+            i = child
+        heap[i] = uid
+        pos[uid] = i
+
+    def pop(self):
+        """取出键值最小的 id"""
+        heap, pos = self.heap, self.pos
+        top = heap[0]
+        last = heap.pop()
+        pos[top] = -1
+        if heap:
+            heap[0] = last
+            pos[last] = 0
+            self._sift_down(0)
+        return top
+
+    def set(self, uid, key):
+        """设置 id 的键值（不在堆中时插入）"""
+        old = self.keys[uid]
+        self.keys[uid] = key
+        i = self.pos[uid]
+        if i < 0:
+            self.heap.append(uid)
+            self.pos[uid] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+        elif key < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+
+_NONZERO = re.compile(b"[^\x00]")
+
+
+class BitSet:
+    """定长位集合 — 元素为 [0, n) 的整数，加入/移除/查询均为 O(1)，每个元素只占 1 位
+
+    bits 为 bytearray，第 i 个元素对应 bits[i >> 3] 的第 (i & 7) 位；
+    热路径可直接按位读取 bits，count 随加入/移除增量维护。
+    """
+
+    __slots__ = ("n", "bits", "count")
+
+    def __init__(self, n):
+        self.n = n
+        self.bits = bytearray((n + 7) >> 3)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, i):
+        return type(i) is int and 0 <= i < self.n and bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def _check(self, i):
+        if not 0 <= i < self.n:
+            raise IndexError("位集合下标越界")
+
+    def add(self, i):
+        self._check(i)
+        mask = 1 << (i & 7)
+        b = self.bits[i >> 3]
+        if not b & mask:
+            self.bits[i >> 3] = b | mask
+            self.count += 1
+
+    def discard(self, i):
+        self._check(i)
+        mask = 1 << (i & 7)
+        b = self.bits[i >> 3]
+        if b & mask:
+            self.bits[i >> 3] = b & ~mask
+            self.count -= 1
+
+    def toggle(self, i):
+        """切换元素 i，返回切换后是否在集合中"""
+        self._check(i)
+        mask = 1 << (i & 7)
+        b = self.bits[i >> 3] ^ mask
+        self.bits[i >> 3] = b
+        present = bool(b & mask)
+        self.count += 1 if present else -1
+        return present
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+    def __iter__(self):
+        """按从小到大给出集合中的元素（跳过全零字节，代价与 n/8 的 C 级扫描 + 元素数成正比）"""
+        bits = self.bits
+        for m in _NONZERO.finditer(bits):
+            base = m.start() << 3
+            b = bits[m.start()]
+            for r in range(8):
+                if b >> r & 1:
+                    yield base + r
@@ -43,6 +43,7 @@ class MainApplication:
                 ("从样本库加载 (Ctrl+Shift+O)", lambda: self.call_tab.load_from_library() if self.call_tab else None),
                 ("重新加载当前文件 (Ctrl+R)", lambda: self.call_tab.reload_current_file() if self.call_tab else None),
                 ("自动加载默认样本 (Ctrl+D)", lambda: self.call_tab.auto_load_file() if self.call_tab else None),
+                ("流式抽取文件...", lambda: self.call_tab.stream_draw() if self.call_tab else None),
                 ("-", None),
                 ("导入样本到库 (Ctrl+I)", ApplicationFunctions.import_sample),
                 ("打开结果目录", self.open_result_dir),
@@ -56,6 +57,7 @@ class MainApplication:
                 ("保存结果 (Ctrl+S)", lambda: self.call_tab.save_current_result() if self.call_tab else None),
                 ("批量保存所有 (Ctrl+Shift+S)", lambda: self.call_tab.batch_save_all() if self.call_tab else None),
                 ("-", None),
+                ("排除名单 (Ctrl+E)", lambda: self.call_tab.open_exclusion_dialog() if self.call_tab else None),
                 ("清除历史 (Ctrl+W)", lambda: ApplicationFunctions.clear_all_history(self.call_tab)),
                 ("重置抽样历史 (Ctrl+Shift+R)", lambda: self.call_tab.reset_sampler_history() if self.call_tab else None),
             ],
@@ -101,6 +103,7 @@ class MainApplication:
         self.root.bind("<Control-Shift-S>", lambda e: ct.batch_save_all() if ct else None)
         self.root.bind("<Control-w>", lambda e: ct.clear_all_history() if ct else None)
         self.root.bind("<Control-Shift-R>", lambda e: ct.reset_sampler_history() if ct else None)
+        self.root.bind("<Control-e>", lambda e: ct.open_exclusion_dialog() if ct else None)
         self.root.bind("<Control-comma>", lambda e: self.open_config_window())
         self.root.bind("<Control-i>", lambda e: ApplicationFunctions.import_sample())
         self.root.bind("<Control-t>", lambda e: self.notebook.select(ct.frame) if ct else None)
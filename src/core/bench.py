@@ -0,0 +1,141 @@
+"""
+抽样性能基准 — 在 src 目录下运行：python -m core.bench [名称 ...]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+from core.sampler import SmartSampler
+from core.population import PreparedPopulation
+from core.rng import create_rng
+
+
+def _best_of(func, repeat=3):
+    """执行 repeat 次，返回最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = perf_counter()
+        func()
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+def bench_progressive(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), k=5, rounds=200):
+    """递进式抽取：各规模下单次抽取耗时（应随 n 至多线性增长）"""
+    rows = []
+    for n in sizes:
+        pop = PreparedPopulation(range(n))
+        sampler = SmartSampler(mode=SmartSampler.MODE_ADVANCED)
+        sampler.advanced_config.update(progressive_draw=True, smart_reduce_weight=False)
+
+        def run():
+            for _ in range(rounds):
+                sampler.smart_sample(pop, k)
+
+        per_draw = _best_of(run) / rounds
+        rows.append((n, per_draw))
+        print(f"progressive  n={n:>9,}  k={k}  {per_draw * 1e6:10.1f} µs/次"
+              f"  {per_draw * 1e9 / n:8.3f} ns/样本")
+    return rows
+
+
+def bench_rng(kinds=("mt", "os"), n=20000, k=500, rounds=20, calls=200000):
+    """随机源吞吐量：random()/randrange() 单次调用与大规模加权抽取，附与 MT 的倍数"""
+    rows = []
+    base = {}
+    pop = PreparedPopulation(range(n))
+    for kind in kinds:
+        rng = create_rng(kind)
+        t_float = _best_of(lambda: [rng.random() for _ in range(calls)]) / calls
+        t_int = _best_of(lambda: [rng.randrange(1000) for _ in range(calls)]) / calls
+
+        sampler = SmartSampler(mode=SmartSampler.MODE_SMART, rng_kind=kind)
+        sampler.use_numpy = False
+        sampler.use_fixed_weights = True
+        sampler.set_weight(0, 2.0)
+        t_draw = _best_of(lambda: [sampler.smart_sample(pop, k) for _ in range(rounds)]) / rounds
+
+        row = (kind, t_float, t_int, t_draw)
+        if kind == "mt":
+            base["mt"] = row
+        rows.append(row)
+        ref = base.get("mt", row)
+        print(f"rng {kind:>5}  random {t_float * 1e9:7.1f} ns ({t_float / ref[1]:4.2f}x)"
+              f"  randrange {t_int * 1e9:7.1f} ns ({t_int / ref[2]:4.2f}x)"
+              f"  加权抽 {k}/{n} {t_draw * 1e3:7.2f} ms ({t_draw / ref[3]:4.2f}x)")
+    return rows
+
+
+def bench_dispatch(cases=((50, 3), (2000, 10), (10 ** 5, 5), (10 ** 5, 5000)), rounds=50):
+    """自调度：各规模下基本/智能模式所选后端及单次抽取耗时"""
+    rows = []
+    for n, k in cases:
+        pop = PreparedPopulation(range(n))
+        for mode in (SmartSampler.MODE_BASIC, SmartSampler.MODE_SMART):
+            sampler = SmartSampler(mode=mode)
+            sampler.use_fixed_weights = True
+            sampler.set_weight(0, 2.0)
+            per_draw = _best_of(lambda: [sampler.smart_sample(pop, k) for _ in range(rounds)]) / rounds
+            backend = sampler.last_draw_info["backend"]
+            rows.append((n, k, mode, backend, per_draw))
+            print(f"dispatch n={n:>7,}  k={k:>5}  {SmartSampler.MODE_NAMES[mode]}"
+                  f"  {backend:>15}  {per_draw * 1e6:10.1f} µs/次")
+    return rows
+
+
+def _traced_bytes(build):
+    """build() 返回的对象常驻占用的字节数（tracemalloc 统计，构建期间的临时对象不计）"""
+    tracemalloc.start()
+    try:
+        obj = build()
+        current = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del obj
+    return current
+
+
+def bench_names(sizes=(10 ** 4, 10 ** 5, 10 ** 6)):
+    """名单存储：每个名字的常驻字节数（列表 + 字典 与 名字表总体对比）与构建耗时"""
+    rows = []
+    for n in sizes:
+        lines = [f"学生{i:07d}".encode("utf-8") for i in range(n)]
+
+        def as_dict():
+            names = [line.decode("utf-8") for line in lines]
+            return names, {name: i for i, name in enumerate(names)}
+
+        def as_table():
+            return PreparedPopulation([line.decode("utf-8") for line in lines])
+
+        old = _traced_bytes(as_dict) / n
+        total = _traced_bytes(as_table) / n
+        t0 = perf_counter()
+        pop = as_table()
+        t_build = perf_counter() - t0
+        table = pop.keys.nbytes / n
+        rows.append((n, old, table, total, t_build))
+        print(f"names n={n:>9,}  列表+字典 {old:6.1f} B/名  名字表 {table:5.1f} B/名"
+              f"  总体合计 {total:5.1f} B/名（含 id 与计数数组）  构建 {t_build * 1e3:8.1f} ms")
+    return rows
+
+
+BENCHMARKS = {
+    "progressive": bench_progressive,
+    "rng": bench_rng,
+    "dispatch": bench_dispatch,
+    "names": bench_names,
+}
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        func = BENCHMARKS.get(name)
+        if func is None:
+            print(f"未知基准: {name}（可选: {', '.join(BENCHMARKS)}）")
+            continue
+        func()
+
+
+if __name__ == "__main__":
+    main()
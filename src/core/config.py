@@ -38,9 +38,14 @@ class ConfigManager:
             "rct_default_mode": "group",   # 默认抽取方式: person=抽人, group=抽组
 
             # ── 抽样设置 ──
-            "sampler_mode": 1,             # 抽样模式: 0=基本, 1=智能, 2=高级
+            "sampler_mode": 1,             # 抽样模式: 0=基本, 1=智能, 2=高级, 3=最久未抽优先
             "smart_window": 3,             # 智能模式的记忆次数
+            "smart_decay": "off",          # 智能模式记忆方式: off=窗口式, draw=按次衰减, minute=按分钟衰减
+            "smart_decay_factor": 0.5,     # 衰减式每次/每分钟罚分保留比例 (0.1~0.9)
+            "lru_softness": 0.0,           # 最久未抽优先模式的随机宽松度（0=严格按最久未抽）
             "smart_use_fixed_weights": False,  # 智能模式是否使用固定权重
+            "sampler_rng": "mt",           # 随机源: mt=Mersenne Twister, pcg64=NumPy PCG64, os=系统熵源
+            "sampler_seed": None,          # 随机种子（None=使用系统熵，填整数可复现抽取结果）
 
             # ── 高级抽取设置 ──
             "adv_with_replacement": True,        # 放回式抽取
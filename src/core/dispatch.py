@@ -0,0 +1,335 @@
+"""
+抽样后端自调度 — 按 n、k 与权重偏斜度为每次抽取挑选最快的实现
+
+每个后端的耗时按代价模型 a + b·n + c·k·t 估计（t 为每抽中一项的相对步数：
+树状数组为 log₂n，拒绝采样为期望尝试次数，其余为 1），
+系数由微基准标定（约 0.1 s，在后台线程中进行，不阻塞抽取；标定完成前使用静态系数），
+按解释器/NumPy 版本与随机源类型缓存在 data/cache/dispatch.json，之后每次调度只是几次乘加比较。
+
+各后端消耗随机数的方式不同：随机源由用户种子确定（rng.seeded）时一律使用静态系数 DEFAULT_COSTS，
+后端只取决于 n、k 与权重，同一种子在任何机器上都得到相同的结果。
+
+    等概率：sample（rng.sample）、floyd（Floyd 算法）、numpy（Generator.choice）
+    带权重：fenwick（树状数组）、rejection（拒绝采样）、numpy（向量化指数键）、
+            alias（已缓存的别名表，免去 O(n) 预处理，仅固定权重可用）
+"""
+import os
+import sys
+import json
+import math
+import threading
+from time import perf_counter
+from core import npbackend
+from core.algos import (
+    weighted_sample_indices, floyd_sample_indices, rejection_weighted_indices,
+    AliasTable, alias_sample_indices,
+)
+from core.info import rct_cache_path
+from core.logman import rctlog
+from core.rng import create_rng
+
+DISPATCH_CACHE = os.path.join(rct_cache_path, "dispatch.json")
+
+# 标定格式版本（后端或代价模型变化时递增，旧缓存自动失效）
+CALIBRATION_VERSION = 3
+
+# 拒绝采样的适用条件：k·w_max 不超过总权重的该比例（保证期望尝试次数有界）
+REJECTION_MAX_MASS = 0.5
+
+# 未标定时使用的粗略系数（秒）：(固定开销, 每个样本, 每次尝试)
+DEFAULT_COSTS = {
+    "sample": (2e-6, 1e-9, 6e-7),
+    "floyd": (2e-6, 0.0, 9e-7),
+    "numpy": (2e-5, 1e-8, 2e-8),
+    "fenwick": (3e-6, 2e-7, 3e-7),
+    "rejection": (2e-6, 1e-8, 8e-7),
+    "numpy_weighted": (3e-5, 2e-8, 4e-8),
+    "alias": (1e-6, 0.0, 5e-7),
+}
+
+# 标定取样点 (n, k)：由 ①→② 求每个样本的代价，②→③ 求每次尝试的代价
+_POINTS = ((64, 4), (4096, 4), (4096, 256))
+
+
+def _cache_key():
+    numpy_version = npbackend.np.__version__ if npbackend.HAS_NUMPY else "none"
+    impl = sys.implementation.name
+    return f"v{CALIBRATION_VERSION}-{impl}-{sys.version_info[0]}.{sys.version_info[1]}-numpy-{numpy_version}"
+
+
+def rejection_trials(n, k, w_max, total):
+    """拒绝采样的期望尝试倍数（相对 k），不适用时返回 None"""
+    if w_max <= 0 or k * w_max > REJECTION_MAX_MASS * total:
+        return None
+    skew = w_max * n / total
+    return skew / (1.0 - k * w_max / total)
+
+
+def alias_trials(k, w_max, total):
+    """别名表重抽的期望尝试倍数（相对 k），不适用时返回 None"""
+    if w_max <= 0 or k * w_max > REJECTION_MAX_MASS * total:
+        return None
+    return 1.0 / (1.0 - k * w_max / total)
+
+
+def weight_bounds(weights):
+    """权重的 (最大值, 总和)，list 与 ndarray 均可"""
+    if not len(weights):
+        return 0.0, 0.0
+    if npbackend.HAS_NUMPY and isinstance(weights, npbackend.np.ndarray):
+        return float(weights.max()), float(weights.sum())
+    return max(weights), sum(weights)
+
+
+def fenwick_steps(n):
+    """树状数组每次定位的步数"""
+    return max(1.0, math.log2(n))
+
+
+# ── 后端实现（均返回位置列表） ─────────────────────────────
+
+def uniform_sample(rng, gen, n, k):
+    return rng.sample(range(n), k)
+
+
+def uniform_floyd(rng, gen, n, k):
+    return floyd_sample_indices(n, k, rng)
+
+
+def uniform_numpy(rng, gen, n, k):
+    return npbackend.sample_indices(n, k, gen)
+
+
+def weighted_fenwick(rng, gen, weights, k, w_max):
+    if npbackend.HAS_NUMPY and isinstance(weights, npbackend.np.ndarray):
+        weights = weights.tolist()
+    return weighted_sample_indices(weights, k, rng)
+
+
+def weighted_rejection(rng, gen, weights, k, w_max):
+    return rejection_weighted_indices(weights, k, w_max, rng)
+
+
+def weighted_numpy(rng, gen, weights, k, w_max):
+    return npbackend.weighted_sample_indices(weights, k, gen)
+
+
+UNIFORM_BACKENDS = {
+    "sample": uniform_sample,
+    "floyd": uniform_floyd,
+    "numpy": uniform_numpy,
+}
+
+WEIGHTED_BACKENDS = {
+    "fenwick": weighted_fenwick,
+    "rejection": weighted_rejection,
+    "numpy_weighted": weighted_numpy,
+}
+
+_NUMPY_BACKENDS = {"numpy", "numpy_weighted"}
+
+
+def _best_per_call(func, reps, repeat=3):
+    """执行 repeat 组、每组 reps 次，返回最短的单次耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = perf_counter()
+        for _ in range(reps):
+            func()
+        best = min(best, (perf_counter() - t0) / reps)
+    return best
+
+
+def calibrate(kind="mt"):
+    """对 kind 随机源运行微基准，返回 {后端: (a, b, c)}"""
+    rng = create_rng(kind, 0)
+    gen = rng.numpy_generator() if npbackend.HAS_NUMPY else None
+    weights_for = {}
+    costs = {}
+    names = list(UNIFORM_BACKENDS) + list(WEIGHTED_BACKENDS) + ["alias"]
+    for name in names:
+        if name in _NUMPY_BACKENDS and gen is None:
+            continue
+        times = []
+        trials = []
+        for n, k in _POINTS:
+            reps = max(1, 20000 // n)
+            if name == "alias":
+                if n not in weights_for:
+                    weights_for[n] = [0.5 + rng.random() for _ in range(n)]
+                table = AliasTable(weights_for[n])
+                times.append(_best_per_call(lambda: alias_sample_indices(table, k, rng), reps))
+                trials.append(alias_trials(k, table.w_max, table.total))
+                continue
+            if name in UNIFORM_BACKENDS:
+                func = UNIFORM_BACKENDS[name]
+                times.append(_best_per_call(lambda: func(rng, gen, n, k), reps))
+                trials.append(1.0)
+                continue
+            if n not in weights_for:
+                weights_for[n] = [0.5 + rng.random() for _ in range(n)]
+            weights = weights_for[n]
+            w_max = max(weights)
+            if name == "numpy_weighted":
+                weights = npbackend.np.asarray(weights)
+            func = WEIGHTED_BACKENDS[name]
+            times.append(_best_per_call(lambda: func(rng, gen, weights, k, w_max), reps))
+            if name == "rejection":
+                trials.append(rejection_trials(n, k, w_max, sum(weights_for[n])))
+            elif name == "fenwick":
+                trials.append(fenwick_steps(n))
+            else:
+                trials.append(1.0)
+
+        (n0, k0), (n1, _), (_, k1) = _POINTS
+        t1, t2, t3 = times
+        c = max(0.0, (t3 - t2) / (k1 * trials[2] - k0 * trials[1]))
+        b = max(0.0, (t2 - t1 - c * k0 * (trials[1] - trials[0])) / (n1 - n0))
+        a = max(0.0, t1 - b * n0 - c * k0 * trials[0])
+        costs[name] = (a, b, c)
+    return costs
+
+
+class Dispatcher:
+    """后端调度器 — 代价系数按随机源类型惰性标定并缓存（进程内共享一个实例即可）"""
+
+    def __init__(self, path=DISPATCH_CACHE, auto_calibrate=True):
+        self.path = path
+        self.auto_calibrate = auto_calibrate
+        self._costs = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._pending = set()       # 正在后台标定的随机源类型
+
+    def _load(self):
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            rctlog.warning(f"[抽样调度] 标定缓存读取失败: {e}")
+            return
+        if data.get("key") != _cache_key():
+            return
+        for kind, table in data.get("costs", {}).items():
+            self._costs[kind] = {name: tuple(v) for name, v in table.items()}
+
+    def _save(self):
+        if not self.path:
+            return
+        data = {
+            "key": _cache_key(),
+            "costs": {kind: {name: list(v) for name, v in table.items()}
+                      for kind, table in self._costs.items()},
+        }
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            rctlog.warning(f"[抽样调度] 标定缓存写入失败: {e}")
+
+    def costs(self, kind):
+        """kind 随机源的代价系数（首次使用时读缓存；尚未标定时返回静态系数，并转入后台标定）"""
+        table = self._costs.get(kind)
+        if table is not None:
+            return table
+        if not self._loaded:
+            self._load()
+            table = self._costs.get(kind)
+            if table is not None:
+                return table
+        if self.auto_calibrate:
+            self.calibrate_async(kind)
+        return DEFAULT_COSTS
+
+    def calibrate_async(self, kind):
+        """在后台线程中标定 kind 随机源（已有系数或正在标定时不重复），返回线程或 None"""
+        with self._lock:
+            if kind in self._costs or kind in self._pending:
+                return None
+            self._pending.add(kind)
+        thread = threading.Thread(target=self._calibrate, args=(kind,),
+                                  name=f"dispatch-calibrate-{kind}", daemon=True)
+        thread.start()
+        return thread
+
+    def _calibrate(self, kind):
+        t0 = perf_counter()
+        try:
+            table = calibrate(kind)
+        except Exception as e:  # 标定失败时继续使用静态系数
+            rctlog.warning(f"[抽样调度] {kind} 随机源标定失败: {e}")
+            return
+        with self._lock:
+            self._costs[kind] = table
+            self._pending.discard(kind)
+        rctlog.info(f"[抽样调度] 已标定 {kind} 随机源后端代价，用时 {(perf_counter() - t0) * 1e3:.0f} ms")
+        self._save()
+
+    def prepare(self, kind):
+        """读入缓存的系数，缺失时在后台开始标定（程序启动时调用，使首次抽取不等待标定）"""
+        self.costs(kind)
+
+    def recalibrate(self, kind):
+        """丢弃 kind 的系数并重新标定（同步执行）"""
+        if not self._loaded:
+            self._load()
+        table = calibrate(kind)
+        with self._lock:
+            self._costs[kind] = table
+        self._save()
+        return table
+
+    def _table(self, kind, seeded):
+        # 有种子时不使用本机标定结果，保证后端选择（从而抽取结果）与机器无关
+        return DEFAULT_COSTS if seeded else self.costs(kind)
+
+    @staticmethod
+    def _cheapest(table, candidates):
+        best, best_cost = None, float("inf")
+        for name, n, kt in candidates:
+            coef = table.get(name) or DEFAULT_COSTS[name]
+            cost = coef[0] + coef[1] * n + coef[2] * kt
+            if cost < best_cost:
+                best, best_cost = name, cost
+        return best
+
+    def choose_uniform(self, kind, n, k, use_numpy, seeded=False):
+        """等概率抽取的后端名（seeded 为真时按静态系数选择，结果可复现）"""
+        candidates = [("sample", n, k), ("floyd", 0, k)]
+        if use_numpy:
+            candidates.append(("numpy", n, k))
+        return self._cheapest(self._table(kind, seeded), candidates)
+
+    def choose_weighted(self, kind, n, k, w_max, total, use_numpy, alias=False, seeded=False):
+        """带权抽取的后端名（w_max / total 为权重最大值与总和；alias 表示已有可用的别名表；
+        seeded 为真时按静态系数选择）"""
+        candidates = [("fenwick", n, k * fenwick_steps(n))]
+        if alias:
+            trials = alias_trials(k, w_max, total)
+            if trials is not None:
+                candidates.append(("alias", 0, k * trials))
+        trials = rejection_trials(n, k, w_max, total)
+        if trials is not None:
+            candidates.append(("rejection", n, k * trials))
+        if use_numpy:
+            candidates.append(("numpy_weighted", n, k))
+        return self._cheapest(self._table(kind, seeded), candidates)
+
+
+_default = None
+
+
+def default_dispatcher():
+    """进程内共享的调度器"""
+    global _default
+    if _default is None:
+        _default = Dispatcher()
+    return _default
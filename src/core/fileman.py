@@ -9,6 +9,8 @@ from tkinter import messagebox
 from core.logman import rctlog
 from core.platutils import open_file_or_dir
 from core.config import ConfigManager
+from core import roster
+from core.roster import open_roster, should_map, split_names
 from core.info import rct_result_path, rct_desktop_result_path, rct_log_path, rct_appname, rct_rcplist_path, github, gitee, res_path, official_website, rct_version
 
 class FileManager:
@@ -260,6 +262,7 @@ class SampleLibrary:
         fp = os.path.join(rct_rcplist_path, f"{sample_name}.rcp")
         if os.path.exists(fp):
             os.remove(fp)
+            roster.forget(fp)
             rctlog.info(f"样本已删除: {fp}")
             return True
         return False
@@ -277,20 +280,27 @@ class SampleLibrary:
         if os.path.exists(new_fp):
             raise FileExistsError(f"样本名 {new_name} 已存在")
         os.rename(old_fp, new_fp)
+        roster.forget(old_fp)
         rctlog.info(f"样本已重命名: {old_name} -> {new_name}")
 
+    @classmethod
+    def count_names(cls, sample_name):
+        """样本中的名字数（超大样本只读取缓存的索引文件头，不保留内存映射）"""
+        fp = os.path.join(rct_rcplist_path, f"{sample_name}.rcp")
+        if not os.path.exists(fp):
+            return 0
+        if should_map(fp):
+            return roster.roster_size(fp, split=False, rcp=True)
+        return len(cls.load_names(sample_name))
+
     @classmethod
     def load_names(cls, sample_name):
-        """加载指定样本的名字列表"""
+        """加载指定样本的名字列表（每行一个名字；超大样本返回内存映射名单 MappedRoster，用法与列表相同）"""
         fp = os.path.join(rct_rcplist_path, f"{sample_name}.rcp")
         if not os.path.exists(fp):
             return []
+        if should_map(fp):
+            return open_roster(fp, split=False, rcp=True)
         with open(fp, "r", encoding="utf-8") as f:
             encoded = f.read()
-        decoded = base64decode(encoded)
-        names = []
-        for line in decoded.splitlines():
-            line = line.strip()
-            if line:
-                names.append(line)
-        return names
+        return split_names(base64decode(encoded), split=False)
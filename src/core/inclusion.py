@@ -0,0 +1,223 @@
+"""
+入选概率计算 — 带权不放回抽取中每个样本在下一次抽 k 个时被抽中的概率
+
+抽样器的加权抽取为逐次按剩余权重比例抽取（等价于 Efraimidis–Spirakis 指数键），
+每个样本的入选概率 π_i 没有简单闭式：
+
+- 小规模：按已抽集合逐层做精确动态规划（状态为已抽样本的位掩码），
+  工作量 Σ_{j<k} C(n, j)·(n − j) 不超过 EXACT_MAX_WORK 时使用
+- 大规模：Rosén 逐次抽样近似 π_i ≈ 1 − exp(−w_i·τ)，τ 满足 Σ π_i = k，
+  以牛顿法求解（f(τ) 为凹增函数，从 0 出发单调收敛），n 较大时误差很小
+"""
+import math
+from core import npbackend
+
+# 精确动态规划的工作量上限（约对应 100 ms 以内）
+EXACT_MAX_WORK = 100_000
+
+
+def _exact_work(n, k):
+    """精确动态规划需要展开的转移次数"""
+    work = 0
+    states = 1
+    for j in range(min(k, n)):
+        work += states * (n - j)
+        if work > EXACT_MAX_WORK:
+            break
+        states = states * (n - j) // (j + 1)
+    return work
+
+
+def exact_inclusion(weights, k):
+    """精确入选概率（位掩码动态规划，适用于小规模）
+
+    与 weighted_sample_indices 的行为一致：剩余权重耗尽时对剩余位置等概率抽取。
+    """
+    w = [max(0.0, float(x)) for x in weights]
+    n = len(w)
+    k = min(k, n)
+    probs = [0.0] * n
+    total = sum(w)
+    eps = total * 1e-12
+    layer = {0: [1.0, total]}       # 已抽位掩码 → [到达概率, 剩余权重]
+    for step in range(k):
+        nxt = {}
+        for mask, (p, rem) in layer.items():
+            avail = [i for i in range(n) if not mask >> i & 1]
+            if rem > eps:
+                choices = [(i, w[i] / rem) for i in avail if w[i] > 0]
+            else:
+                q = 1.0 / len(avail)
+                choices = [(i, q) for i in avail]
+            for i, q in choices:
+                pi = p * q
+                probs[i] += pi
+                key = mask | (1 << i)
+                state = nxt.get(key)
+                if state is None:
+                    nxt[key] = [pi, rem - w[i]]
+                else:
+                    state[0] += pi
+        layer = nxt
+    return probs
+
+
+def _solve_tau(w, k):
+    """牛顿法求 τ：Σ (1 − exp(−w_i·τ)) = k（w 均为正数）"""
+    exp = math.exp
+    tau = 0.0
+    for _ in range(100):
+        f = -k
+        df = 0.0
+        for x in w:
+            e = exp(-x * tau)
+            f += 1.0 - e
+            df += x * e
+        if df <= 0:
+            break
+        step = -f / df
+        tau += step
+        if step <= tau * 1e-12:
+            break
+    return tau
+
+
+def _solve_tau_np(w, k):
+    np = npbackend.np
+    tau = 0.0
+    for _ in range(100):
+        e = np.exp(-w * tau)
+        f = w.shape[0] - e.sum() - k
+        df = float((w * e).sum())
+        if df <= 0:
+            break
+        step = -f / df
+        tau += step
+        if step <= tau * 1e-12:
+            break
+    return tau
+
+
+def approx_inclusion(weights, k):
+    """近似入选概率（Rosén 逐次抽样近似，O(n) 每次迭代）"""
+    n = len(weights)
+    k = min(k, n)
+    if npbackend.HAS_NUMPY:
+        np = npbackend.np
+        w = np.maximum(np.asarray(weights, dtype=np.float64), 0.0)
+        positive = w > 0
+        m = int(positive.sum())
+        if m <= k:
+            zeros = n - m
+            return np.where(positive, 1.0, (k - m) / zeros if zeros else 0.0).tolist()
+        tau = _solve_tau_np(w[positive], k)
+        return (-np.expm1(-w * tau)).tolist()
+
+    w = [max(0.0, float(x)) for x in weights]
+    m = sum(1 for x in w if x > 0)
+    if m <= k:
+        fill = (k - m) / (n - m) if n > m else 0.0
+        return [1.0 if x > 0 else fill for x in w]
+    tau = _solve_tau([x for x in w if x > 0], k)
+    return [-math.expm1(-x * tau) for x in w]
+
+
+def inclusion_probabilities(weights, k):
+    """入选概率（小规模精确，大规模近似），返回 (概率列表, 是否精确)"""
+    n = len(weights)
+    if k >= n:
+        return [1.0] * n, True
+    if k <= 0:
+        return [0.0] * n, True
+    if _exact_work(n, k) <= EXACT_MAX_WORK:
+        return exact_inclusion(weights, k), True
+    return approx_inclusion(weights, k), False
+
+
+def next_draw_weights(sampler, population, fixed=None, use_fixed=None):
+    """下一次抽取实际使用的权重向量；等概率（或各样本对称）时返回 None
+
+    fixed / use_fixed 可传入尚未保存的固定权重与开关，用于"如果这样设置"的预览。
+    """
+    weights = sampler.weights if fixed is None else fixed
+    use_fixed = sampler.use_fixed_weights if use_fixed is None else use_fixed
+    get = weights.get
+
+    # 与抽样器相同的判断：权重全部为 1.0 时不走固定权重路径（高级模式随后回落到智能降权）
+    has_custom = sampler.has_custom_weights(fixed)
+
+    if sampler.mode == sampler.MODE_SMART:
+        fixed_on = bool(use_fixed and has_custom)
+        if not fixed_on and not sampler._has_smart_history():
+            return None
+        smart = sampler.get_smart_effective_weights(population)
+        if fixed_on:
+            return [s * get(item, 1.0) for s, item in zip(smart, population)]
+        return smart
+
+    if sampler.mode == sampler.MODE_ADVANCED:
+        cfg = sampler.advanced_config
+        # 随机定权重、递进式、多次取最值对各样本对称，打乱/预抽取不改变分布
+        if cfg["random_weights"] or cfg["progressive_draw"] or cfg["multi_draw_best"]:
+            return None
+        custom = cfg.get("custom_weights") or use_fixed
+        if custom and has_custom:
+            return [get(item, 1.0) for item in population]
+        if cfg.get("smart_reduce_weight", True):
+            return sampler.get_smart_effective_weights(population)
+    return None
+
+
+def sampler_inclusion(sampler, population, k, fixed=None, use_fixed=None):
+    """按抽样器当前设置计算下一次抽 k 个时各位置的入选概率
+
+    Returns:
+        (概率列表, 计算方式)；计算方式为 "exact" / "approx" / "uniform"。
+        最久未抽优先模式与不放回池不足 k 个时结果取决于抽取顺序，返回 None。
+    """
+    n = len(population)
+    if n == 0 or k <= 0:
+        return [0.0] * n, "exact"
+    # 排除名单中的位置概率为 0，其余位置按可抽取总数计算
+    blocked = sampler._blocked_for(population)
+    available = n if blocked is None else sampler._available(population, blocked)
+    if k >= available:
+        if blocked is None:
+            return [1.0] * n, "exact"
+        return [0.0 if blocked(i) else 1.0 for i in range(n)], "exact"
+
+    if sampler.mode == sampler.MODE_LRU:
+        return None
+    if sampler.mode == sampler.MODE_ADVANCED and not sampler.advanced_config["with_replacement"]:
+        # 与 _advanced_no_replace 的重载判断一致：新池 / 已抽空 / 比率式达到阈值时整池可取
+        pool = sampler._remaining_pool
+        method = sampler.advanced_config.get("no_replace_method", 0)
+        ratio = max(0.10, min(0.50, sampler.advanced_config.get("no_replace_ratio", 0.5)))
+        if (pool is None or pool.n != n or not pool.remaining
+                or (method == sampler.NO_REPLACE_METHOD_RATIO and pool.remaining <= int(n * ratio))):
+            remaining = range(n)
+        else:
+            remaining = pool.remaining_positions()
+        if blocked is not None:
+            remaining = [i for i in remaining if not blocked(i)]
+        if len(remaining) < k:
+            if method == sampler.NO_REPLACE_METHOD_CONTINUOUS:
+                return None     # 跨越重载的连续循环没有简单的逐项概率
+            # 整除式 / 比率式：剩余不足时先重载再抽取
+            remaining = range(n) if blocked is None else [i for i in range(n) if not blocked(i)]
+        probs = [0.0] * n
+        p = k / len(remaining)
+        for i in remaining:
+            probs[i] = p
+        return probs, "uniform"
+
+    weights = next_draw_weights(sampler, population, fixed, use_fixed)
+    if weights is None:
+        if blocked is None:
+            return [k / n] * n, "uniform"
+        p = k / available
+        return [0.0 if blocked(i) else p for i in range(n)], "uniform"
+    if blocked is not None:
+        weights = [0.0 if blocked(i) else w for i, w in enumerate(weights)]
+    probs, exact = inclusion_probabilities(weights, k)
+    return probs, "exact" if exact else "approx"
@@ -0,0 +1,181 @@
+"""
+蒙特卡洛分布预览 — 在进程池中用相互独立的随机子流模拟大量抽取，统计每个样本被抽中的频率
+
+模拟按位置进行（样本以 0..n-1 代替，固定权重按位置传入），与名单内容无关；
+每个任务从全新的抽样器状态开始连续抽取，得到"按此配置使用一段时间"的分布。
+按位置的总体与固定权重在每个工作进程初始化时建立一次，任务只返回被抽中位置的稀疏计数，
+Tk 线程合并时的工作量与抽中次数成正比，与总体规模无关。
+"""
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from core.sampler import SmartSampler
+from core.population import PreparedPopulation, VirtualPopulation
+from core.rng import restore_rng
+
+# 单个任务的模拟抽取次数（越小进度刷新越细，越大进程间开销越小）
+CHUNK_DRAWS = 2000
+
+# 预览的样本数上限：每个工作进程都要建立同规模的总体，抽组的虚拟总体最多可达 100 万
+PREVIEW_MAX_ITEMS = 100_000
+
+# 直方图分组数
+PREVIEW_BINS = 40
+
+# 工作进程内常驻的总体与固定权重（由 _init_worker 建立）
+_worker = {}
+
+
+def _init_worker(n, weights):
+    """进程池初始化：按位置建立总体与固定权重数组（每个工作进程一次）"""
+    _worker["population"] = PreparedPopulation(range(n))
+    if weights:
+        template = array("d", [1.0]) * n
+        for i, w in weights:
+            template[i] = w
+        _worker["weights"] = template
+    else:
+        _worker["weights"] = None
+
+
+def simulate_chunk(task):
+    """进程池任务：按给定配置连续模拟 task["draws"] 次抽取，返回 (被抽中的位置, 对应次数)"""
+    sampler = SmartSampler(mode=task["mode"], smart_window=task["smart_window"])
+    sampler._use_rng(restore_rng(task["rng_state"]))
+    sampler.advanced_config.update(task["config"])
+    sampler.use_fixed_weights = task["use_fixed"]
+    if task.get("decay_unit"):
+        sampler.set_decay(task["decay_unit"], task["decay_factor"])
+    # 重新绑定即清空上一个任务留在总体数组中的状态
+    population = _worker["population"]
+    sampler.bind_population(population)
+    template = _worker["weights"]
+    if template is not None:
+        population.weights = array("d", template)
+        sampler.weights.reload()
+        sampler.weights_version += 1
+
+    hits = Counter()
+    k = task["k"]
+    for _ in range(task["draws"]):
+        hits.update(sampler.smart_sample(population, k))
+    return array("I", hits.keys()), array("I", hits.values())
+
+
+def _fixed_weights(sampler, population):
+    """非默认固定权重 [(位置, 权重), ...]；虚拟总体只按已设置权重的样本反查位置，不逐个生成样本"""
+    if not sampler.weights:
+        return []
+    if isinstance(population, VirtualPopulation):
+        get, occurrences = population.index.get, population.occurrences
+        pairs = ((get(item), w) for item, w in sampler.weights.items())
+        return sorted((j, w) for i, w in pairs if i is not None for j in occurrences(i))
+    get = sampler.get_weight
+    return [(i, w) for i, w in enumerate(map(get, population)) if w != 1.0]
+
+
+class MonteCarloPreview:
+    """后台分布预览 — 提交任务后由调用方（Tk 的 after 回调）定期 poll 取回部分结果
+
+    每个任务使用抽样器随机源派生的独立子流；cancel() 取消尚未开始的任务并关闭进程池。
+    样本数超过 PREVIEW_MAX_ITEMS 时抛出 ValueError。
+    """
+
+    def __init__(self, sampler, population, k, config, total_draws, workers=None):
+        n = len(population)
+        if n > PREVIEW_MAX_ITEMS:
+            raise ValueError(f"样本数超过 {PREVIEW_MAX_ITEMS}，无法预览分布")
+        self.n = n
+        self.k = k
+        self.total_draws = total_draws
+        self.done_draws = 0
+        self.counts = array("Q", [0]) * n
+        self.bins = min(n, PREVIEW_BINS)
+        self.bin_counts = [0] * self.bins
+        self.cancelled = False
+        self.error = None
+
+        chunks = max(1, -(-total_draws // CHUNK_DRAWS))
+        base = {
+            "k": k,
+            "mode": sampler.MODE_ADVANCED,
+            "smart_window": config.get("smart_memory_count", sampler.smart_window),
+            "config": dict(config),
+            "use_fixed": sampler.use_fixed_weights or bool(config.get("custom_weights")),
+            "decay_unit": sampler.decay_unit,
+            "decay_factor": sampler.decay_factor,
+        }
+        rngs = sampler.spawn_rngs(chunks)
+        workers = workers or max(1, min(chunks, (os.cpu_count() or 2) - 1))
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(n, _fixed_weights(sampler, population)))
+        self._pending = []
+        remaining = total_draws
+        for rng in rngs:
+            draws = min(CHUNK_DRAWS, remaining)
+            remaining -= draws
+            task = dict(base, draws=draws, rng_state=rng.export_state())
+            self._pending.append((draws, self._pool.submit(simulate_chunk, task)))
+
+    @property
+    def finished(self):
+        return not self._pending
+
+    def poll(self):
+        """合并已完成任务的结果，返回本次新合并的任务数（不阻塞）"""
+        merged = 0
+        still = []
+        counts = self.counts
+        for draws, fut in self._pending:
+            if not fut.done():
+                still.append((draws, fut))
+                continue
+            if fut.cancelled():
+                continue
+            try:
+                result = fut.result()
+            except Exception as e:  # 子进程异常：停止预览并交由调用方提示
+                self.error = e
+                self.cancel()
+                return merged
+            bins, n, bin_counts = self.bins, self.n, self.bin_counts
+            for i, c in zip(*result):
+                counts[i] += c
+                bin_counts[((i + 1) * bins - 1) // n] += c
+            self.done_draws += draws
+            merged += 1
+        self._pending = still
+        if not still:
+            self._pool.shutdown(wait=False)
+        return merged
+
+    def cancel(self):
+        """取消尚未开始的任务并关闭进程池（正在运行的任务结束后进程自行退出）"""
+        self.cancelled = True
+        for _, fut in self._pending:
+            fut.cancel()
+        self._pending = []
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def frequencies(self):
+        """各位置的入选频率（每次抽取被抽中的比例）"""
+        if not self.done_draws:
+            return [0.0] * self.n
+        d = self.done_draws
+        return [c / d for c in self.counts]
+
+    def bin_frequencies(self):
+        """相邻位置分为 bins 组，各组的平均入选频率（第 b 组为位置 [b·n//bins, (b+1)·n//bins)）"""
+        d = self.done_draws
+        if not d:
+            return [0.0] * self.bins
+        n, bins = self.n, self.bins
+        return [c / d / ((b + 1) * n // bins - b * n // bins) for b, c in enumerate(self.bin_counts)]
+
+    def extremes(self):
+        """(最低入选频率, 最高入选频率)"""
+        d = self.done_draws
+        if not d or not self.n:
+            return 0.0, 0.0
+        return min(self.counts) / d, max(self.counts) / d
@@ -0,0 +1,142 @@
+"""
+NumPy 向量化抽样后端（可选）— 未安装 NumPy 时 HAS_NUMPY 为 False，调用方回退纯 Python 实现
+"""
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+def new_generator(seed=None):
+    """创建 NumPy 随机数生成器（PCG64）"""
+    return np.random.default_rng(seed)
+
+
+class UrandomGenerator:
+    """以 os.urandom 为熵源的 Generator 适配（仅实现本模块用到的方法，加密安全）"""
+
+    def random(self, size):
+        raw = np.frombuffer(os.urandom(8 * size), dtype=np.uint64)
+        return (raw >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+    def standard_exponential(self, size):
+        return -np.log1p(-self.random(size))
+
+    def uniform(self, low, high, size):
+        return low + (high - low) * self.random(size)
+
+    def choice(self, a, size, replace=False):
+        """无放回等概率抽取（随机键 + argpartition），与 Generator.choice 返回形式一致"""
+        pool = np.arange(a) if np.ndim(a) == 0 else np.asarray(a)
+        n = pool.shape[0]
+        keys = self.random(n)
+        part = np.argpartition(keys, size - 1)[:size] if size < n else np.arange(n)
+        return pool[part[np.argsort(keys[part])]]
+
+
+def sample_indices(n, k, gen):
+    """等概率无放回抽取 k 个位置"""
+    return gen.choice(n, size=min(k, n), replace=False).tolist()
+
+
+def weighted_sample_indices(weights, k, gen):
+    """带权重的无放回抽样（Efraimidis–Spirakis 指数键 + argpartition）
+
+    键值取对数空间 log(u)/w = -E/w（E ~ Exp(1)），极大/极小权重均不会下溢；
+    取键值最大的 k 项，并按键值排序得到与逐次抽取同分布的抽中顺序。
+    权重为 0 的位置仅在正权重项不足 k 个时等概率补足。
+    """
+    w = np.asarray(weights, dtype=np.float64)
+    n = w.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    positive = np.flatnonzero(w > 0)
+    m = min(k, positive.shape[0])
+    chosen = np.empty(0, dtype=np.int64)
+    if m:
+        keys = gen.standard_exponential(positive.shape[0]) / w[positive]
+        if m < keys.shape[0]:
+            part = np.argpartition(keys, m - 1)[:m]
+        else:
+            part = np.arange(keys.shape[0])
+        chosen = positive[part[np.argsort(keys[part], kind="stable")]]
+
+    if m < k:
+        zeros = np.flatnonzero(w <= 0)
+        fill = gen.choice(zeros, size=k - m, replace=False)
+        chosen = np.concatenate((chosen, fill))
+    return chosen.tolist()
+
+
+def multi_draw_best_indices(n, k, rounds, gen):
+    """多次取最值（numpy 随机源）：结果分布与轮数无关，等价于一次均匀无放回抽取（见 algos 同名函数）"""
+    return gen.choice(n, size=min(k, n), replace=False).tolist()
+
+
+def smart_weights(population, penalties, fixed=None, coef=0.35):
+    """智能有效权重数组：max(0.1, 1 - coef·罚分)，可叠乘固定权重
+
+    窗口式的罚分为近期次数（coef=0.35）；衰减式为存储值（coef 已乘以全局缩放因子）。
+    """
+    n = len(population)
+    get = penalties.get
+    counts = np.fromiter((get(item, 0) for item in population), dtype=np.float64, count=n)
+    w = np.maximum(0.1, 1.0 - counts * coef)
+    if fixed is not None:
+        w *= fixed_weights(population, fixed)
+    return w
+
+
+def fixed_weights(population, weights):
+    """用户固定权重数组（未设置的样本默认为 1.0）"""
+    get = weights.get
+    return np.fromiter((get(item, 1.0) for item in population),
+                       dtype=np.float64, count=len(population))
+
+
+def prepared_weights(prepared, smart=True, fixed=False, decay_scale=None):
+    """按 PreparedPopulation 的 id 数组直接索引出权重向量（无逐项 Python 循环）
+
+    decay_scale 不为 None 时使用衰减式罚分（存储值 × decay_scale）。
+    """
+    ids = np.frombuffer(prepared.ids, dtype=np.uint32)
+    if smart:
+        if decay_scale is None:
+            penalty = np.frombuffer(prepared.recent, dtype=np.uint32)[ids] * 0.35
+        else:
+            penalty = np.frombuffer(prepared.decay, dtype=np.float64)[ids] * (0.35 * decay_scale)
+        w = np.maximum(0.1, 1.0 - penalty)
+        if fixed:
+            w *= np.frombuffer(prepared.weights, dtype=np.float64)[ids]
+        return w
+    return np.frombuffer(prepared.weights, dtype=np.float64)[ids]
+
+
+def uniform_weights(n, low, high, gen):
+    """随机定权重：n 个 [low, high) 均匀分布权重"""
+    return gen.uniform(low, high, n)
+
+
+def probe_slots(hashes, size):
+    """线性探测哈希槽的向量化构建（NameTable 批量建表使用）
+
+    hashes 为各 id 依次的哈希值，size 为 2 的幂；返回 uint32 数组，槽内存 id + 1，0 为空槽。
+    每轮把仍未落位的 id 写入当前空槽（同槽冲突时只有一个写入生效），未落位的后移一格，
+    与逐个插入同样满足"从起始槽到所在槽之间均非空"，查找结果一致。
+    """
+    mask = size - 1
+    pos = np.asarray(hashes, dtype=np.int64) & mask
+    slots = np.zeros(size, dtype=np.uint32)
+    pending = np.arange(1, pos.shape[0] + 1, dtype=np.uint32)
+    while pending.shape[0]:
+        free = slots[pos] == 0
+        slots[pos[free]] = pending[free]
+        left = slots[pos] != pending
+        pending, pos = pending[left], (pos[left] + 1) & mask
+    return slots
@@ -0,0 +1,592 @@
+"""
+样本总体预处理 — 名字驻留为整数 id，权重与近期抽取次数按 id 存放在数组中；
+抽组使用的编号/字母总体为按下标计算的虚拟序列，不占用与规模成正比的内存
+
+名字名单的去重名字存放在 NameTable（一块连续 UTF-8 缓冲区 + 偏移数组 + 开放寻址哈希槽），
+抽样器的权重/累计次数/衰减罚分/最近抽中序号经 IdMap 按 id 存放在 PreparedPopulation 的数组中，
+历史记录以 NameList（id 数组）保存抽取结果，界面、抽样器与历史共用同一份名字表。
+"""
+import hashlib
+from array import array
+from bisect import bisect_left
+from itertools import islice, accumulate
+from collections.abc import Sequence, MutableMapping
+from core import npbackend
+
+
+class NameTable(Sequence):
+    """紧凑名字表 — 去重后的名字按 UTF-8 首尾相接存放，id → 名字按偏移解码
+
+    - buf     : bytearray，全部名字的 UTF-8 编码
+    - offsets : id → 起始偏移（array('I')，缓冲区超过 4 GiB 时改为 array('Q')），末尾多存一个结束偏移
+    - slots   : 名字 → id 的开放寻址哈希表（array('I')，存 id + 1，0 为空槽），按 UTF-8 字节哈希线性探测
+
+    每个名字的常驻开销约为编码长度 + 4 字节偏移 + 6～11 字节哈希槽，
+    而 list + dict 中的独立 str 对象约 100 字节。
+    """
+
+    __slots__ = ("buf", "offsets", "slots", "_mask")
+
+    # 哈希槽的最大装载率，超过时槽数翻倍
+    MAX_LOAD = 0.7
+    # 批量建表时名字数达到该值才用 NumPy 构建哈希槽
+    NUMPY_MIN_SIZE = 4096
+
+    def __init__(self, names=(), capacity=0):
+        self.buf = bytearray()
+        self.offsets = array("I", [0])
+        size = 8
+        while size * self.MAX_LOAD < capacity:
+            size *= 2
+        self.slots = array("I", [0]) * size
+        self._mask = size - 1
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def from_unique(cls, names):
+        """由互不重复的名字批量构建（整块拼接缓冲区，比逐个 add 快，加载名单时使用）"""
+        encoded = [name.encode("utf-8") for name in names]
+        table = cls(capacity=len(encoded))
+        table.buf = bytearray(b"".join(encoded))
+        ends = list(accumulate(map(len, encoded), initial=0))
+        table.offsets = array("I" if ends[-1] < 1 << 32 else "Q", ends)
+        if npbackend.HAS_NUMPY and len(encoded) >= cls.NUMPY_MIN_SIZE:
+            slots = npbackend.probe_slots(list(map(hash, encoded)), len(table.slots))
+            table.slots = array("I")
+            table.slots.frombytes(slots.tobytes())
+            return table
+        slots, mask = table.slots, table._mask
+        for uid, data in enumerate(encoded, 1):
+            i = hash(data) & mask
+            while slots[i]:
+                i = (i + 1) & mask
+            slots[i] = uid
+        return table
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, uid):
+        if isinstance(uid, slice):
+            return [self[i] for i in range(*uid.indices(len(self)))]
+        off = self.offsets
+        if uid < 0:
+            uid += len(off) - 1
+            if uid < 0:
+                raise IndexError("名字表下标越界")
+        return self.buf[off[uid]:off[uid + 1]].decode("utf-8")
+
+    def __iter__(self):
+        buf = self.buf
+        start = 0
+        for end in islice(self.offsets, 1, None):
+            yield buf[start:end].decode("utf-8")
+            start = end
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def encoded(self, uid):
+        """id 对应名字的 UTF-8 字节"""
+        off = self.offsets
+        return bytes(self.buf[off[uid]:off[uid + 1]])
+
+    def _find(self, data):
+        """按 UTF-8 字节查找，返回 (槽位, id)；不存在时 id 为 None，槽位为可插入的空槽"""
+        slots, mask, buf, off = self.slots, self._mask, self.buf, self.offsets
+        i = hash(data) & mask
+        while True:
+            s = slots[i]
+            if not s:
+                return i, None
+            uid = s - 1
+            if buf[off[uid]:off[uid + 1]] == data:
+                return i, uid
+            i = (i + 1) & mask
+
+    def get(self, name, default=None):
+        """名字对应的 id，不存在时返回 default（用法同 dict.get）"""
+        if type(name) is not str:
+            return default
+        uid = self._find(name.encode("utf-8"))[1]
+        return default if uid is None else uid
+
+    def index(self, name, start=0, stop=None):
+        uid = self.get(name)
+        if uid is None or uid < start or (stop is not None and uid >= stop):
+            raise ValueError(f"{name!r} 不在名字表中")
+        return uid
+
+    def count(self, name):
+        return int(name in self)
+
+    def add(self, name):
+        """加入名字并返回其 id（已存在时返回原 id）"""
+        data = name.encode("utf-8")
+        i, uid = self._find(data)
+        if uid is not None:
+            return uid
+        uid = len(self.offsets) - 1
+        self.buf += data
+        try:
+            self.offsets.append(len(self.buf))
+        except OverflowError:
+            self.offsets = array("Q", self.offsets)
+            self.offsets.append(len(self.buf))
+        self.slots[i] = uid + 1
+        if uid + 1 > len(self.slots) * self.MAX_LOAD:
+            self._grow()
+        return uid
+
+    def _grow(self):
+        size = len(self.slots) * 2
+        slots = array("I", [0]) * size
+        mask = size - 1
+        buf, off = self.buf, self.offsets
+        for uid in range(len(off) - 1):
+            i = hash(bytes(buf[off[uid]:off[uid + 1]])) & mask
+            while slots[i]:
+                i = (i + 1) & mask
+            slots[i] = uid + 1
+        self.slots, self._mask = slots, mask
+
+    @property
+    def nbytes(self):
+        """名字表占用的字节数（缓冲区 + 偏移 + 哈希槽）"""
+        return (len(self.buf) + self.offsets.itemsize * len(self.offsets)
+                + self.slots.itemsize * len(self.slots))
+
+
+class NameList(Sequence):
+    """名字表中若干 id 组成的只读序列（历史记录按 id 保存抽取结果，不另存字符串）"""
+
+    __slots__ = ("table", "ids")
+
+    def __init__(self, table, ids):
+        self.table = table
+        self.ids = array("I", ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            table = self.table
+            return [table[uid] for uid in self.ids[i]]
+        return self.table[self.ids[i]]
+
+    def __iter__(self):
+        table = self.table
+        for uid in self.ids:
+            yield table[uid]
+
+
+class PreparedPopulation(Sequence):
+    """预处理样本总体（加载名单时构建一次，之后每次抽取直接复用）
+
+    - keys    : id → 去重后的样本；index 为反向映射 样本 → id
+                （全部为字符串时两者是同一个 NameTable，否则为 list 与 dict）
+    - ids     : 位置 → id（array('I')），重复名字共享同一 id；第 i 个样本为 keys[ids[i]]
+    - weights : id → 固定权重（array('d')）
+    - recent  : id → 智能模式近期窗口内的出现次数（array('I')）
+    - selected: id → 累计被抽中次数（array('I')）
+    - decay   : id → 衰减式智能模式的罚分存储值（array('d')，需乘以抽样器的全局缩放因子）
+    - last    : id → 最近一次被抽中的抽取序号（array('I')，0 为从未抽中）
+
+    绑定 SmartSampler 后，weights / recent / selected / decay / last 即为抽样器对应映射（IdMap）的存储；
+    抽取与更新历史时按 id 直接索引，无需对字符串做哈希查找。
+    dirty 为上次保存快照以来 selected / decay / last 有改动的 id 集合（None 表示需要整体保存）。
+    """
+
+    __slots__ = ("keys", "index", "ids", "weights", "recent", "selected", "decay", "last",
+                 "owner", "dirty", "_fingerprint", "_counts", "_first")
+
+    def __init__(self, items):
+        # 先用临时字典去重并分配 id，字符串名单随后转为名字表（字典随即释放）
+        index = {}
+        setdefault = index.setdefault
+        self.ids = array("I", [setdefault(item, len(index)) for item in items])
+        if index and all(type(item) is str for item in index):
+            self.keys = self.index = NameTable.from_unique(index)
+        else:
+            self.keys = list(index)
+            self.index = index
+        n = len(self.keys)
+        for attr, (typecode, default) in ID_ARRAYS.items():
+            setattr(self, attr, array(typecode, [default]) * n)
+        self.owner = None
+        self.dirty = None
+        self._fingerprint = None
+        self._counts = None
+        self._first = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            keys = self.keys
+            return [keys[uid] for uid in self.ids[i]]
+        return self.keys[self.ids[i]]
+
+    def __iter__(self):
+        keys = self.keys
+        for uid in self.ids:
+            yield keys[uid]
+
+    def __contains__(self, item):
+        return self.index.get(item) is not None
+
+    def bind(self, sampler):
+        """与抽样器绑定：抽样器的各 IdMap 改为存放在本总体的数组中，原有记录按样本迁移过来
+        （只涉及非默认项，每个名单仅一次）"""
+        for mapping in (sampler.weights, sampler._recent_counts, sampler.selection_history,
+                        sampler._decay_stored, sampler._last_called):
+            mapping.rebind(self)
+        self.owner = sampler
+
+    @property
+    def fingerprint(self):
+        """名单指纹（按顺序对全部样本做 SHA-1），用于关联持久化的抽样状态"""
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            h.update(str(len(self.ids)).encode("ascii"))
+            keys = self.keys
+            if isinstance(keys, NameTable):
+                encoded = [keys.encoded(uid) for uid in range(len(keys))]
+            else:
+                encoded = [str(key).encode("utf-8") for key in keys]
+            for uid in self.ids:
+                h.update(b"\n")
+                h.update(encoded[uid])
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def id_of(self, item):
+        """返回样本对应的 id，不存在时返回 None"""
+        return self.index.get(item)
+
+    @property
+    def has_duplicates(self):
+        return len(self.keys) != len(self.ids)
+
+    def multiplicity(self, uid):
+        """id 在名单中出现的次数（无重名时恒为 1；有重名时首次调用统计一次）"""
+        if not self.has_duplicates:
+            return 1
+        if self._counts is None:
+            counts = array("I", [0]) * len(self.keys)
+            for u in self.ids:
+                counts[u] += 1
+            self._counts = counts
+        return self._counts[uid]
+
+    def first_positions(self):
+        """id → 该样本首次出现的位置（array('I')，首次调用时构建；无重名时即 0..n-1）"""
+        if self._first is None:
+            first = array("I", [0]) * len(self.keys)
+            ids = self.ids
+            for i in range(len(ids) - 1, -1, -1):
+                first[ids[i]] = i
+            self._first = first
+        return self._first
+
+    def name_list(self, items):
+        """抽取结果 → 按 id 保存的只读序列（名字表总体）；其余总体复制为列表"""
+        if isinstance(self.keys, NameTable):
+            return NameList(self.keys, map(self.index.get, items))
+        return list(items)
+
+
+# IdMap 可使用的数组属性：属性名 → (类型码, 默认值)
+ID_ARRAYS = {
+    "weights": ("d", 1.0),
+    "recent": ("I", 0),
+    "selected": ("I", 0),
+    "decay": ("d", 0.0),
+    "last": ("I", 0),
+}
+
+# 快照按 id 保存的数组：改动的 id 记入 PreparedPopulation.dirty，保存快照时只提交这些 id
+DIRTY_TRACKED = frozenset(("selected", "decay", "last"))
+
+
+class IdMap(MutableMapping):
+    """样本 → 数值映射：绑定总体内的样本按 id 存放在 PreparedPopulation 的数组属性中，其余样本存放在字典
+
+    值等于默认值即视为不存在（读取不存在的键返回默认值，不会插入），
+    因此 len / 迭代只涉及非默认项，与原先只记录非零项的字典一致。
+    """
+
+    __slots__ = ("attr", "typecode", "default", "population", "extra", "tracked", "_count")
+
+    def __init__(self, attr):
+        self.attr = attr
+        self.typecode, self.default = ID_ARRAYS[attr]
+        self.population = None
+        self.extra = {}
+        self.tracked = attr in DIRTY_TRACKED
+        self._count = 0     # 数组中的非默认项数
+
+    def _mark(self, uids):
+        """记录改动的 id（整体替换数组时 uids 为 None）"""
+        if self.tracked:
+            pp = self.population
+            if uids is None:
+                pp.dirty = None
+            elif pp.dirty is not None:
+                pp.dirty.update(uids)
+
+    def _uid(self, key):
+        pp = self.population
+        return None if pp is None else pp.index.get(key)
+
+    def __getitem__(self, key):
+        uid = self._uid(key)
+        if uid is None:
+            return self.extra.get(key, self.default)
+        return getattr(self.population, self.attr)[uid]
+
+    def get(self, key, default=None):
+        value = self[key]
+        return default if value == self.default else value
+
+    def __contains__(self, key):
+        return self[key] != self.default
+
+    def __setitem__(self, key, value):
+        uid = self._uid(key)
+        if uid is None:
+            if value == self.default:
+                self.extra.pop(key, None)
+            else:
+                self.extra[key] = value
+            return
+        arr = getattr(self.population, self.attr)
+        old = arr[uid]
+        arr[uid] = value
+        self._count += (value != self.default) - (old != self.default)
+        self._mark((uid,))
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self[key] = self.default
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        return self._count + len(self.extra)
+
+    def items(self):
+        """全部非默认项 [(样本, 值), ...]（返回列表，遍历时可修改映射）"""
+        pairs = []
+        pp = self.population
+        if pp is not None and self._count:
+            keys, d = pp.keys, self.default
+            pairs.extend((keys[uid], v) for uid, v in enumerate(getattr(pp, self.attr)) if v != d)
+        pairs.extend(self.extra.items())
+        return pairs
+
+    def add_ids(self, uids, delta):
+        """按 id 逐个累加 delta（抽取热路径直接索引数组，不做样本 → id 查找），返回各项的原值"""
+        arr = getattr(self.population, self.attr)
+        d = self.default
+        olds = []
+        changed = 0
+        for uid in uids:
+            old = arr[uid]
+            new = old + delta
+            arr[uid] = new
+            changed += (new != d) - (old != d)
+            olds.append(old)
+        self._count += changed
+        self._mark(uids)
+        return olds
+
+    def set_ids(self, uids, value):
+        """将这些 id 的值设为 value"""
+        arr = getattr(self.population, self.attr)
+        d = self.default
+        changed = 0
+        for uid in uids:
+            old = arr[uid]
+            arr[uid] = value
+            changed += (value != d) - (old != d)
+        self._count += changed
+        self._mark(uids)
+
+    def clear(self):
+        pp = self.population
+        if pp is not None:
+            setattr(pp, self.attr, array(self.typecode, [self.default]) * len(pp.keys))
+            self._mark(None)
+        self.extra.clear()
+        self._count = 0
+
+    def rebind(self, population):
+        """改为存放在 population 的数组中（原有非默认项按样本迁移，名单外的留在字典）"""
+        pairs = self.items()
+        setattr(population, self.attr, array(self.typecode, [self.default]) * len(population.keys))
+        self.population = population
+        self.extra = {}
+        self._count = 0
+        self._mark(None)
+        for key, value in pairs:
+            self[key] = value
+
+    def reload(self):
+        """数组被整体替换后（恢复快照）重新统计非默认项，并丢弃名单外的键"""
+        arr = getattr(self.population, self.attr)
+        self._count = len(arr) - arr.count(self.default)
+        self.extra.clear()
+        self._mark(None)
+
+
+class VirtualPopulation(Sequence):
+    """虚拟总体基类 — 第 i 个样本按下标计算得到，可由 position 反查下标
+
+    抽样器对虚拟总体只按下标抽取（Floyd 算法 / 稀疏权重的拒绝采样），不会复制整个序列。
+    样本可以重复（未合并重名的内存映射名单）：此时 has_duplicates 为真，position 给出首次出现的位置。
+    """
+
+    __slots__ = ("n",)
+
+    def __init__(self, n):
+        self.n = max(0, int(n))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._item(j) for j in range(*i.indices(self.n))]
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError("虚拟总体下标越界")
+        return self._item(i)
+
+    def __contains__(self, item):
+        return self.position(item) is not None
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.n == self.n
+
+    def __hash__(self):
+        return hash((type(self), self.n))
+
+    @property
+    def index(self):
+        """样本 → 下标的只读映射（按需计算，用法同 PreparedPopulation.index.get）"""
+        return PositionIndex(self)
+
+    @property
+    def has_duplicates(self):
+        return False
+
+    def first_positions(self):
+        """各不同样本首次出现的位置（升序）；样本互不重复时返回 None"""
+        return None
+
+    def occurrences(self, i):
+        """与首次出现位置 i 同名的全部位置（样本互不重复时即 (i,)）"""
+        return (i,)
+
+    def _item(self, i):
+        raise NotImplementedError
+
+    def position(self, item):
+        """样本所在下标，不属于该总体时返回 None"""
+        raise NotImplementedError
+
+
+class PositionIndex:
+    """虚拟总体的 样本 → 下标 映射接口（只实现 get）"""
+
+    __slots__ = ("_position",)
+
+    def __init__(self, population):
+        self._position = population.position
+
+    def get(self, item, default=None):
+        i = self._position(item)
+        return default if i is None else i
+
+
+class SubsetIndex:
+    """含重名的虚拟总体按名字去重后的视图：第 uid 个样本位于 positions[uid]（升序的首次出现位置）
+
+    既可按 uid 取样本，也可按 get 由样本反查 uid（position 给出首次出现位置，再二分查找）。
+    """
+
+    __slots__ = ("population", "positions")
+
+    def __init__(self, population, positions):
+        self.population = population
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, uid):
+        return self.population[self.positions[uid]]
+
+    def get(self, item, default=None):
+        i = self.population.position(item)
+        if i is None:
+            return default
+        positions = self.positions
+        uid = bisect_left(positions, i)
+        return uid if uid < len(positions) and positions[uid] == i else default
+
+
+class NumberPopulation(VirtualPopulation):
+    """编号总体 1..n（等价于 range(1, n + 1)）"""
+
+    __slots__ = ()
+
+    def _item(self, i):
+        return i + 1
+
+    def position(self, item):
+        if type(item) is int and 1 <= item <= self.n:
+            return item - 1
+        return None
+
+
+def spreadsheet_label(i):
+    """第 i 个（0 起）表格式字母标签：A…Z, AA…AZ, BA…ZZ, AAA…"""
+    chars = []
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        chars.append(chr(65 + r))
+    return "".join(reversed(chars))
+
+
+def spreadsheet_index(label):
+    """spreadsheet_label 的逆运算，非法标签返回 None"""
+    if not isinstance(label, str) or not label.isascii() or not label.isalpha() \
+            or not label.isupper():
+        return None
+    i = 0
+    for ch in label:
+        i = i * 26 + (ord(ch) - 64)
+    return i - 1
+
+
+class LabelPopulation(VirtualPopulation):
+    """字母总体 A, B, …, Z, AA, AB, …（前 n 个表格式标签）"""
+
+    __slots__ = ()
+
+    def _item(self, i):
+        return spreadsheet_label(i)
+
+    def position(self, item):
+        i = spreadsheet_index(item)
+        return i if i is not None and i < self.n else None
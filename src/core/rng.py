@@ -0,0 +1,275 @@
+"""
+抽样随机源 — 可播种、可序列化、可派生独立子流的随机数生成器
+
+- mt    : Mersenne Twister（random.Random），可播种
+- pcg64 : NumPy PCG64（需安装 NumPy），可播种，与向量化后端共用同一随机流
+- os    : 操作系统熵源（os.urandom，加密安全），按大块缓冲读取，不可播种；
+          适用于抽奖、考场分配等需要审计级随机性的场合
+
+三者均为 random.Random 的子类，sample/shuffle/uniform/randrange 等方法可直接使用。
+seeded 表示随机流由用户种子确定（由其派生的子流亦然）：此时抽样后端按固定规则选择，
+保证同一种子在任何机器上得到相同结果。
+"""
+import os
+import hashlib
+from array import array
+from random import Random
+from core import npbackend
+
+RNG_KINDS = {"mt": "Mersenne Twister", "pcg64": "PCG64 (NumPy)", "os": "系统熵源"}
+
+
+def _fresh_entropy():
+    """128 位随机熵（用于未指定种子时）"""
+    return int.from_bytes(os.urandom(16), "little")
+
+
+def _derive_seed(entropy, spawn_key):
+    """由根熵与派生路径计算子流种子（SHA-256，不同路径互不相关）"""
+    data = repr((entropy, tuple(spawn_key))).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(data).digest(), "little")
+
+
+class MersenneRNG(Random):
+    """Mersenne Twister 随机源（可播种、可派生子流）"""
+
+    kind = "mt"
+
+    def __init__(self, seed=None, spawn_key=()):
+        self.seeded = seed is not None
+        self.entropy = _fresh_entropy() if seed is None else seed
+        self.spawn_key = tuple(spawn_key)
+        self._spawned = 0
+        self._np_gen = None
+        super().__init__(_derive_seed(self.entropy, self.spawn_key))
+
+    def spawn(self, n):
+        """派生 n 个相互独立的子随机流（用于并行任务）"""
+        children = [
+            MersenneRNG(self.entropy, self.spawn_key + (self._spawned + i,))
+            for i in range(n)
+        ]
+        for child in children:
+            child.seeded = self.seeded
+        self._spawned += n
+        return children
+
+    def advance(self, draws):
+        """跳过约 draws 次抽取所需的随机数（一次 getrandbits 调用，不分配结果）"""
+        self.getrandbits(32 * draws)
+        if self._np_gen is not None:
+            self._np_gen.bit_generator.advance(draws)
+
+    def numpy_generator(self):
+        """向量化后端使用的 NumPy 生成器（由本随机流播种，保证可复现）"""
+        if self._np_gen is None:
+            self._np_gen = npbackend.new_generator(self.getrandbits(128))
+        return self._np_gen
+
+    def export_state(self):
+        """导出可 JSON 序列化的完整状态"""
+        version, internal, gauss = self.getstate()
+        return {
+            "kind": self.kind,
+            "seeded": self.seeded,
+            "entropy": self.entropy,
+            "spawn_key": list(self.spawn_key),
+            "spawned": self._spawned,
+            "state": [version, list(internal), gauss],
+            "numpy": self._np_gen.bit_generator.state if self._np_gen is not None else None,
+        }
+
+    def import_state(self, data):
+        self.seeded = data.get("seeded", True)
+        self.entropy = data["entropy"]
+        self.spawn_key = tuple(data["spawn_key"])
+        self._spawned = data["spawned"]
+        version, internal, gauss = data["state"]
+        self.setstate((version, tuple(internal), gauss))
+        self._np_gen = None
+        if data.get("numpy") is not None and npbackend.HAS_NUMPY:
+            self._np_gen = npbackend.new_generator()
+            self._np_gen.bit_generator.state = data["numpy"]
+
+
+_MASK64 = (1 << 64) - 1
+
+
+class _BufferedWordRNG(Random):
+    """以 64 位字块为单位缓冲的随机源基类（子类实现 _refill）"""
+
+    BLOCK_WORDS = 4096
+    secure = False
+    seeded = False
+
+    def seed(self, a=None, version=2):
+        self._it = iter(())
+
+    def _refill(self):
+        raise NotImplementedError
+
+    def _word(self):
+        for w in self._it:
+            return w
+        self._it = iter(self._refill())
+        return next(self._it)
+
+    def random(self):
+        """[0, 1) 均匀浮点数（取 53 位有效位）"""
+        for w in self._it:
+            return (w >> 11) * (1.0 / 9007199254740992.0)
+        return (self._word() >> 11) * (1.0 / 9007199254740992.0)
+
+    def _randbelow(self, n):
+        """[0, n) 均匀整数 — Lemire 乘法映射 + 拒绝区间，无取模偏差，多数情况下零除法"""
+        if n > _MASK64:
+            k = n.bit_length()
+            r = self.getrandbits(k)
+            while r >= n:
+                r = self.getrandbits(k)
+            return r
+        m = self._word() * n
+        low = m & _MASK64
+        if low < n:
+            threshold = (_MASK64 + 1 - n) % n
+            while low < threshold:
+                m = self._word() * n
+                low = m & _MASK64
+        return m >> 64
+
+    def getrandbits(self, k):
+        """k 位随机整数；randrange/sample 经此做拒绝采样，无取模偏差"""
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        if k <= 64:
+            return self._word() >> (64 - k) if k else 0
+        words = (k + 63) // 64
+        x = 0
+        for _ in range(words):
+            x = (x << 64) | self._word()
+        return x >> (words * 64 - k)
+
+    def _pending(self):
+        """取出尚未消费的缓冲字（不改变后续输出）"""
+        rest = list(self._it)
+        self._it = iter(rest)
+        return rest
+
+    def getstate(self):
+        return (self.kind, self._pending())
+
+    def setstate(self, state):
+        self._it = iter(list(state[1]))
+
+
+class PCG64RNG(_BufferedWordRNG):
+    """NumPy PCG64 随机源（可播种、可派生子流，向量化后端共用同一生成器）"""
+
+    kind = "pcg64"
+
+    def __init__(self, seed=None, _seed_seq=None):
+        if not npbackend.HAS_NUMPY:
+            raise RuntimeError("PCG64 随机源需要安装 NumPy")
+        np = npbackend.np
+        self.seeded = seed is not None
+        self._seed_seq = _seed_seq or np.random.SeedSequence(seed)
+        self._gen = np.random.Generator(np.random.PCG64(self._seed_seq))
+        super().__init__()
+
+    def _refill(self):
+        return self._gen.bit_generator.random_raw(self.BLOCK_WORDS).tolist()
+
+    def advance(self, draws):
+        """PCG64 原生跳跃：丢弃缓冲并将底层状态推进 draws 步"""
+        self._it = iter(())
+        self._gen.bit_generator.advance(draws)
+
+    def spawn(self, n):
+        """派生 n 个相互独立的子随机流（SeedSequence.spawn）"""
+        children = [PCG64RNG(_seed_seq=child) for child in self._seed_seq.spawn(n)]
+        for child in children:
+            child.seeded = self.seeded
+        return children
+
+    def numpy_generator(self):
+        return self._gen
+
+    def export_state(self):
+        ss = self._seed_seq
+        return {
+            "kind": self.kind,
+            "seeded": self.seeded,
+            "entropy": ss.entropy,
+            "spawn_key": list(ss.spawn_key),
+            "spawned": ss.n_children_spawned,
+            "state": self._gen.bit_generator.state,
+            "buffer": self._pending(),
+        }
+
+    def import_state(self, data):
+        np = npbackend.np
+        self.seeded = data.get("seeded", True)
+        self._seed_seq = np.random.SeedSequence(
+            data["entropy"], spawn_key=tuple(data["spawn_key"]),
+            n_children_spawned=data["spawned"],
+        )
+        self._gen = np.random.Generator(np.random.PCG64(self._seed_seq))
+        self._gen.bit_generator.state = data["state"]
+        self._it = iter(list(data["buffer"]))
+
+
+class EntropyRNG(_BufferedWordRNG):
+    """操作系统熵源（加密安全 CSPRNG）
+
+    os.urandom 每次读取 64 KiB 并缓冲为 64 位字，避免逐次系统调用；
+    浮点数取 53 位、有界整数走 Lemire 无偏映射，所有抽样模式均可使用。
+    """
+
+    kind = "os"
+    BLOCK_WORDS = 8192
+    secure = True
+
+    def _refill(self):
+        words = array("Q")
+        words.frombytes(os.urandom(8 * self.BLOCK_WORDS))
+        return words.tolist()
+
+    def advance(self, draws):
+        """熵源无内部状态可推进，跳过即可"""
+
+    def spawn(self, n):
+        """系统熵源天然相互独立，直接创建新实例"""
+        return [EntropyRNG() for _ in range(n)]
+
+    def numpy_generator(self):
+        """向量化后端同样直接取自 os.urandom（不经过非加密的 PCG64）"""
+        if getattr(self, "_np_gen", None) is None:
+            self._np_gen = npbackend.UrandomGenerator()
+        return self._np_gen
+
+    def export_state(self):
+        # 熵源不可复现，仅记录类型
+        return {"kind": self.kind}
+
+    def import_state(self, data):
+        self.seed()
+
+
+_RNG_CLASSES = {"mt": MersenneRNG, "pcg64": PCG64RNG, "os": EntropyRNG}
+
+
+def create_rng(kind="mt", seed=None):
+    """按类型创建随机源；seed 为 None 时使用系统熵播种"""
+    cls = _RNG_CLASSES.get(kind)
+    if cls is None:
+        raise ValueError(f"未知随机源类型: {kind}")
+    if cls is EntropyRNG:
+        return EntropyRNG()
+    return cls(seed)
+
+
+def restore_rng(data):
+    """由 export_state() 的结果恢复随机源"""
+    rng = create_rng(data["kind"], data.get("entropy"))
+    rng.import_state(data)
+    return rng
@@ -0,0 +1,454 @@
+"""
+内存映射名单 — 超大名单文件只建立名字的字节偏移索引，抽中时才解码对应的名字
+
+名单文件的切分规则（split_line / split_names，读入列表、流式抽取与本模块共用）：逐行去除首尾空白
+（str.strip，含全角空格），跳过空行，行内含 , ; 制表符（按此优先级取第一个出现的）时按该分隔符拆分；
+UTF-8 解码失败时按 GBK 逐行读取（不拆分）。样本库的 .rcp 样本每行即一个名字（split=False，不按分隔符拆分），
+先流式 Base64 解码到缓存文件，再对解码结果建立索引。
+
+重名与读入列表的处理一致：merge=True 时只保留首次出现的一个；否则全部保留，
+并为每个位置记录同名首次出现的位置（position 给出该位置，最久未抽优先按名字去重）。
+
+索引为 array('Q')，每个名字 8 字节：低 62 位为名字在文件中的起始偏移，高 2 位为所在行的分隔符编号；
+取名字时从起始偏移读到分隔符或换行即可。保留重名时另存 array('I')，每个位置 4 字节。
+索引按文件路径、大小与修改时间缓存在 data/cache/roster，再次加载同一文件时整块读入，无需重新扫描；
+缓存文件名以路径摘要为前缀，打开时删除同一文件的旧缓存，样本删除或重命名时由 forget 清理。
+"""
+import os
+import sys
+import mmap
+import codecs
+import struct
+import hashlib
+import binascii
+from array import array
+from core import npbackend
+from core.info import rct_cache_path
+from core.logman import rctlog
+from core.population import VirtualPopulation
+
+ROSTER_CACHE_DIR = os.path.join(rct_cache_path, "roster")
+
+# 文件达到该大小（字节）时才使用内存映射名单，小文件仍整体读入为列表
+ROSTER_MIN_BYTES = 8 * 1024 * 1024
+
+_MAGIC = b"RCTR"
+_VERSION = 3
+_HEADER = struct.Struct("<4sHBBQ")
+_ENCODINGS = ("utf-8", "gbk")
+
+_OFFSET_MASK = (1 << 62) - 1
+_SEP_SHIFT = 62
+# 分隔符编号（0 表示整行为一个名字）
+_SEPARATORS = (b",", b";", b"\t")
+_SEP_BYTES = (None,) + _SEPARATORS
+_TEXT_SEPARATORS = (",", ";", "\t")
+
+_FLAG_DUPLICATES = 1
+_FLAG_FIRST = 2
+
+
+def split_line(line):
+    """拆分一行（已去除首尾空白），返回 (名字列表, 使用的分隔符或 None)"""
+    for sep in _TEXT_SEPARATORS:
+        if sep in line:
+            return [n.strip() for n in line.split(sep) if n.strip()], sep
+    return [line], None
+
+
+def split_names(text, split=True):
+    """文本 → 名字列表（跳过空行；split=True 时逐行按 split_line 拆分，否则每行一个名字）"""
+    names = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            if split:
+                names.extend(split_line(line)[0])
+            else:
+                names.append(line)
+    return names
+
+
+def _u64_bytes(arr):
+    if sys.byteorder != "little":
+        arr = array("Q", arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def detect_encoding(path, chunk_size=1 << 20):
+    """按块增量校验是否为合法 UTF-8（不整体读入），否则视为 GBK"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    decoder.decode(b"", final=True)
+                    return "utf-8"
+                decoder.decode(chunk)
+    except UnicodeDecodeError:
+        return "gbk"
+
+
+def decode_rcp_file(src, dest, chunk_size=1 << 20):
+    """流式 Base64 解码 .rcp 文件到 dest（忽略换行等非 Base64 字符，与 b64decode 默认行为一致）"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    keep = bytes(range(256)).translate(
+        None, b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+    rest = b""
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            data = rest + chunk.translate(None, keep)
+            cut = len(data) - len(data) % 4
+            fout.write(binascii.a2b_base64(data[:cut]))
+            rest = data[cut:]
+        if rest.strip(b"="):
+            fout.write(binascii.a2b_base64(rest + b"=" * (-len(rest) % 4)))
+    os.replace(tmp, dest)
+
+
+def _read_name(mm, off, encoding):
+    """按索引项从映射中解码一个名字（读到分隔符或换行，去除首尾空白）"""
+    start = off & _OFFSET_MASK
+    end = mm.find(b"\n", start)
+    if end < 0:
+        end = len(mm)
+    sep = _SEP_BYTES[off >> _SEP_SHIFT]
+    if sep is not None:
+        cut = mm.find(sep, start, end)
+        if cut >= 0:
+            end = cut
+    return mm[start:end].decode(encoding, "replace").strip()
+
+
+def _first_occurrences(path, encoding, offsets, hashes):
+    """每个位置同名首次出现的位置（array('I')）；没有重名时返回 None
+
+    先按 64 位哈希分组，哈希相同的再解码比较实际名字，哈希碰撞不会误合并不同的名字。
+    """
+    n = len(offsets)
+    if npbackend.HAS_NUMPY:
+        np = npbackend.np
+        h = np.frombuffer(hashes, dtype=np.uint64)
+        _, first_idx, inverse = np.unique(h, return_index=True, return_inverse=True)
+        if first_idx.shape[0] == n:
+            return None
+        heads = first_idx[inverse.reshape(-1)]
+        first = array("I")
+        first.frombytes(heads.astype(np.uint32).tobytes())
+        candidates = np.flatnonzero(heads != np.arange(n)).tolist()
+    else:
+        seen = {}
+        first = None
+        candidates = []
+        for i, hv in enumerate(hashes):
+            f = seen.setdefault(hv, i)
+            if f != i:
+                if first is None:
+                    first = array("I", range(n))
+                first[i] = f
+                candidates.append(i)
+        if first is None:
+            return None
+
+    # 逐个核对哈希相同的名字；碰撞时改按名字精确分组（候选按位置升序处理，得到的仍是首次出现位置）
+    exact = {}
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for i in candidates:
+                head = first[i]
+                group = exact.get(head)
+                name = _read_name(mm, offsets[i], encoding)
+                if group is None:
+                    if name == _read_name(mm, offsets[head], encoding):
+                        continue
+                    group = exact[head] = {_read_name(mm, offsets[head], encoding): head}
+                first[i] = group.setdefault(name, i)
+        finally:
+            mm.close()
+    if all(first[i] == i for i in candidates):
+        return None
+    return first
+
+
+def build_index(path, encoding, merge=False, split=True):
+    """扫描文件建立名字偏移索引，返回 (offsets, 是否存在重复名字, 同名首次出现位置或 None)
+
+    名字按 str.strip 去除首尾空白后比较（与读入列表一致）；merge=True 时去除重复名字（保留首次出现），
+    否则保留全部位置并返回首次出现位置数组。split=False 时每行即一个名字（样本库）。
+    """
+    offsets = array("Q")
+    append = offsets.append
+    split = split and encoding == "utf-8"
+    hashes = array("Q")
+    h_append = hashes.append
+    mask64 = (1 << 64) - 1
+    pos = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            line_start = pos
+            pos += len(raw)
+            line = raw.decode(encoding, "replace").strip()
+            if not line:
+                continue
+            code = 0
+            if split:
+                for i, sep in enumerate(_TEXT_SEPARATORS, 1):
+                    if sep in line:
+                        code = i
+                        break
+            if not code:
+                append(line_start)
+                h_append(hash(line) & mask64)
+                continue
+            sep = _SEP_BYTES[code]
+            tag = code << _SEP_SHIFT
+            start = 0
+            while True:
+                end = raw.find(sep, start)
+                seg = raw[start:] if end < 0 else raw[start:end]
+                name = seg.decode(encoding, "replace").strip()
+                if name:
+                    append((line_start + start) | tag)
+                    h_append(hash(name) & mask64)
+                if end < 0:
+                    break
+                start = end + 1
+
+    first = _first_occurrences(path, encoding, offsets, hashes)
+    if first is None:
+        return offsets, False, None
+    if merge:
+        kept = array("Q", (off for i, off in enumerate(offsets) if first[i] == i))
+        return kept, True, None
+    return offsets, True, first
+
+
+class MappedRoster(VirtualPopulation):
+    """内存映射名单 — 第 i 个名字按偏移从映射中解码，常驻内存约为每个名字 8 字节（保留重名时 12 字节）
+
+    position 只认识已经取出过的名字（抽中、权重对话框读取过的），
+    抽样器只会对这些名字反查下标，因此无需为全部名字建立反向索引。
+    保留重名时 first[i] 为第 i 个名字首次出现的位置，position 给出该位置。
+    """
+
+    __slots__ = ("path", "source", "encoding", "offsets", "duplicates", "key", "first",
+                 "_file", "_mm", "_positions", "_unique", "_repeats")
+
+    def __init__(self, path, encoding, offsets, duplicates=False, source=None, key=None, first=None):
+        super().__init__(len(offsets))
+        self.path = path
+        self.source = source or path
+        self.encoding = encoding
+        self.offsets = offsets
+        self.duplicates = duplicates
+        self.key = key
+        self.first = first
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(path) else b""
+        self._positions = {}
+        self._unique = None
+        self._repeats = None
+
+    def __eq__(self, other):
+        return other is self
+
+    def __hash__(self):
+        return id(self)
+
+    def _item(self, i):
+        name = _read_name(self._mm, self.offsets[i], self.encoding)
+        first = self.first
+        self._positions.setdefault(name, i if first is None else first[i])
+        return name
+
+    def position(self, item):
+        return self._positions.get(item)
+
+    @property
+    def has_duplicates(self):
+        return self.first is not None
+
+    def first_positions(self):
+        """各不同名字首次出现的位置（升序 array('I')，首次调用时构建）；没有保留重名时返回 None"""
+        first = self.first
+        if first is None:
+            return None
+        if self._unique is None:
+            unique = array("I")
+            if npbackend.HAS_NUMPY:
+                np = npbackend.np
+                f = np.frombuffer(first, dtype=np.uint32)
+                unique.frombytes(np.flatnonzero(f == np.arange(f.shape[0])).astype(np.uint32).tobytes())
+            else:
+                unique.extend(i for i, f in enumerate(first) if f == i)
+            self._unique = unique
+        return self._unique
+
+    def occurrences(self, i):
+        if self.first is None:
+            return (i,)
+        if self._repeats is None:
+            # 只为重名建立 首次出现位置 → 其余位置 的映射，规模与重名数成正比
+            repeats = {}
+            for j, f in enumerate(self.first):
+                if f != j:
+                    repeats.setdefault(f, [f]).append(j)
+            self._repeats = repeats
+        return self._repeats.get(i, (i,))
+
+    def close(self):
+        """关闭映射与文件"""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+
+def _source_prefix(path):
+    """缓存文件名前缀：由名单文件的绝对路径决定，同一文件的各版本缓存共用"""
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_key(path, rcp, merge, split):
+    st = os.stat(path)
+    raw = f"{_VERSION}|{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{int(rcp)}|{int(merge)}|{int(split)}"
+    return f"{_source_prefix(path)}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _evict(prefix, keep=None):
+    """删除同一名单文件除 keep 以外的缓存（文件已修改、设置已变化后留下的旧解码副本与索引）
+
+    正在使用的文件（Windows 上仍被映射）删除失败时跳过，下次打开时再清理。
+    """
+    try:
+        entries = os.listdir(ROSTER_CACHE_DIR)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.startswith(prefix + "-") and os.path.splitext(entry)[0] != keep:
+            try:
+                os.remove(os.path.join(ROSTER_CACHE_DIR, entry))
+            except OSError:
+                pass
+
+
+def forget(path):
+    """删除名单文件的全部缓存（样本被删除或重命名时调用）"""
+    _evict(_source_prefix(path))
+
+
+def _load_index(index_path):
+    try:
+        with open(index_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        rctlog.warning(f"[名单索引] 读取失败: {e}")
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, enc, flags, count = _HEADER.unpack_from(data, 0)
+    extra = 4 * count if flags & _FLAG_FIRST else 0
+    if magic != _MAGIC or version != _VERSION or enc >= len(_ENCODINGS) \
+            or len(data) != _HEADER.size + 8 * count + extra:
+        return None
+    body = _HEADER.size + 8 * count
+    offsets = array("Q")
+    offsets.frombytes(data[_HEADER.size:body])
+    first = None
+    if extra:
+        first = array("I")
+        first.frombytes(data[body:])
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        if first is not None:
+            first.byteswap()
+    return _ENCODINGS[enc], offsets, bool(flags & _FLAG_DUPLICATES), first
+
+
+def _save_index(index_path, encoding, offsets, duplicates, first):
+    flags = (_FLAG_DUPLICATES if duplicates else 0) | (_FLAG_FIRST if first is not None else 0)
+    header = _HEADER.pack(_MAGIC, _VERSION, _ENCODINGS.index(encoding), flags, len(offsets))
+    tmp = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(_u64_bytes(offsets))
+            if first is not None:
+                if sys.byteorder != "little":
+                    first = array("I", first)
+                    first.byteswap()
+                f.write(first.tobytes())
+        os.replace(tmp, index_path)
+    except OSError as e:
+        rctlog.warning(f"[名单索引] 写入失败: {e}")
+
+
+def open_roster(path, merge=False, split=True, rcp=None):
+    """打开名单文件为 MappedRoster（索引命中缓存时不扫描文件）
+
+    Args:
+        path: 名单文件路径
+        merge: 是否去除重复名字（与读入列表时的"合并重名"设置一致）
+        split: 是否按 , ; 制表符拆分行内名字（样本库的 .rcp 样本为 False，每行一个名字）
+        rcp: 是否为 Base64 编码的 .rcp 样本，None 时按扩展名判断
+    """
+    if rcp is None:
+        rcp = path.endswith(".rcp")
+    key = _cache_key(path, rcp, merge, split)
+    _evict(key.split("-", 1)[0], keep=key)
+    data_path = path
+    if rcp:
+        data_path = os.path.join(ROSTER_CACHE_DIR, f"{key}.txt")
+        if not os.path.exists(data_path):
+            decode_rcp_file(path, data_path)
+    index_path = os.path.join(ROSTER_CACHE_DIR, f"{key}.idx")
+    cached = _load_index(index_path)
+    if cached is None:
+        encoding = "utf-8" if rcp else detect_encoding(data_path)
+        offsets, duplicates, first = build_index(data_path, encoding, merge, split)
+        _save_index(index_path, encoding, offsets, duplicates, first)
+        rctlog.info(f"[名单索引] 已为 {os.path.basename(path)} 建立索引，共 {len(offsets)} 个名字")
+    else:
+        encoding, offsets, duplicates, first = cached
+    return MappedRoster(data_path, encoding, offsets, duplicates, source=path, key=key, first=first)
+
+
+def roster_size(path, merge=False, split=True, rcp=None):
+    """名单文件中的名字数：索引已缓存时只读文件头，否则建立索引后立即关闭（不保留映射与文件句柄）"""
+    if rcp is None:
+        rcp = path.endswith(".rcp")
+    index_path = os.path.join(ROSTER_CACHE_DIR, f"{_cache_key(path, rcp, merge, split)}.idx")
+    try:
+        with open(index_path, "rb") as f:
+            head = f.read(_HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+    except OSError:
+        head = b""
+    if len(head) == _HEADER.size:
+        magic, version, _, flags, count = _HEADER.unpack(head)
+        extra = 4 * count if flags & _FLAG_FIRST else 0
+        if magic == _MAGIC and version == _VERSION and size == _HEADER.size + 8 * count + extra:
+            return count
+    mapped = open_roster(path, merge, split, rcp)
+    try:
+        return len(mapped)
+    finally:
+        mapped.close()
+
+
+def should_map(path):
+    """文件是否大到值得使用内存映射名单"""
+    try:
+        return os.path.getsize(path) >= ROSTER_MIN_BYTES
+    except OSError:
+        return False
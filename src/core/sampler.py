@@ -1,60 +1,177 @@
 """
-底层随机抽取逻辑 — 三档抽样模式（基本/智能/高级）
+底层随机抽取逻辑 — 四档抽样模式（基本/智能/高级/最久未抽优先）
 """
-from random import sample, shuffle, choices, random, uniform
-from collections import defaultdict, Counter
+import time
+from collections import Counter, deque
+from core.algos import (
+    progressive_indices, LazyPermutation, BitSet, masked_sample_indices,
+    IndexedMinHeap, AliasTable, alias_sample_indices, SparseWeights, rejection_weighted_indices,
+)
+from core import npbackend
+from core.population import PreparedPopulation, VirtualPopulation, SubsetIndex, IdMap
+from core.stats import SelectionStats
+from core.strategy import compile_strategy
+from core.dispatch import (
+    default_dispatcher, weight_bounds, rejection_trials, UNIFORM_BACKENDS, WEIGHTED_BACKENDS,
+)
+from core.rng import create_rng, restore_rng
+
+
+_MISSING = object()
+
+
+class _ConfigDict(dict):
+    """高级配置字典 — 任何修改都会通知抽样器丢弃已编译的策略"""
+
+    __slots__ = ("_on_change",)
+
+    def __init__(self, data, on_change):
+        super().__init__(data)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._on_change()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_change()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
 
 
 class SmartSampler:
-    """智能抽样器 — 三档抽样模式
+    """智能抽样器 — 四档抽样模式
 
     模式 0 - 基本抽样 (BASIC) : random.sample，简单随机
     模式 1 - 智能抽样 (SMART) : 跟踪近期抽取历史，自动降低刚被选中项的权重；
-                               支持"使用固定权重"子选项，整合原加权功能
+                               支持"使用固定权重"子选项，整合原加权功能；
+                               近期历史可为窗口式（最近 N 次）或衰减式（罚分按次/按分钟衰减）
     模式 2 - 高级抽样 (ADVANCED) : 开放全部高级抽取选项（放回/不放回、抽取优化等）
+    模式 3 - 最久未抽优先 (LRU) : 优先抽取距上次被抽中最久的样本（索引最小堆，O(k log n)），
+                               平局随机打破，可设置随机宽松度
+
+    等概率与带权抽取由调度器（core.dispatch）按 n、k 与权重偏斜度逐次挑选后端
+    （rng.sample / Floyd / 拒绝采样 / 树状数组 / NumPy 向量化），代价系数经一次微基准标定。
+    每次抽取后 last_draw_info 记录模式、所用后端、规模与耗时，backend_usage 累计各后端次数。
+
+    总体可为虚拟总体（core.population.NumberPopulation / LabelPopulation）：按下标抽取，
+    带权时只对权重不为 1 的少数样本建稀疏表，不展开整个序列（最久未抽优先模式除外）。
+
+    排除名单（exclude / toggle_excluded …）是绑定名单 id 上的位集合：各模式抽取时跳过被排除的样本
+    （等概率按位置拒绝、带权置零、最久未抽优先暂不出堆、不放回池留待下一次），
+    不复制总体，也不重置不放回进度；切换名单时按名字迁移，不写入快照。
     """
 
     MODE_BASIC = 0
     MODE_SMART = 1
     MODE_ADVANCED = 2
+    MODE_LRU = 3
+
+    MODE_NAMES = {0: "基本抽样", 1: "智能抽样", 2: "高级抽样", 3: "最久未抽优先"}
 
-    MODE_NAMES = {0: "基本抽样", 1: "智能抽样", 2: "高级抽样"}
+    # 样本数量达到该值时才启用 NumPy 向量化后端（小样本下 Python 实现更快）
+    NUMPY_MIN_SIZE = 256
+    # 抽取时按需建别名表的规模上限（更大的总体建表明显卡顿，只在空闲时由 prepare_alias_table 预建）
+    ALIAS_LAZY_MAX_SIZE = 50000
 
     # ── 高级模式：不放回调整方法 ──
     NO_REPLACE_METHOD_CONTINUOUS = 0   # 连续循环样本
     NO_REPLACE_METHOD_DIVISIBLE = 1    # 整除式重载
     NO_REPLACE_METHOD_RATIO = 2        # 比率式调整
 
+    # ── 智能模式：罚分衰减单位（None=窗口式） ──
+    DECAY_UNITS = (None, "draw", "minute")
+    # 全局缩放因子低于该值时重新归一化（避免存储值溢出）
+    DECAY_RENORM_SCALE = 1e-100
+
     NO_REPLACE_METHOD_NAMES = {
         0: "连续循环样本",
         1: "整除式重载",
         2: "比率式调整",
     }
 
-    def __init__(self, mode=MODE_BASIC, smart_window=3):
+    def __init__(self, mode=MODE_BASIC, smart_window=3, rng_kind="mt", seed=None):
         """
         Args:
-            mode: 抽样模式 (MODE_BASIC / MODE_SMART / MODE_ADVANCED)
+            mode: 抽样模式 (MODE_BASIC / MODE_SMART / MODE_ADVANCED / MODE_LRU)
             smart_window: 智能模式下追踪的历史抽取次数
+            rng_kind: 随机源类型（见 core.rng.RNG_KINDS）
+            seed: 随机种子，None 表示使用系统熵
         """
         self.mode = mode
         self.smart_window = smart_window
 
-        # 智能模式：最近几次抽取记录（list of set，最新在前）
-        self._recent_history = []
+        # 智能模式：最近几次抽取记录（环形缓冲，最新在前），每条为 (总体, 成员集合)：
+        # 总体为 PreparedPopulation 时成员为其 id，为 None 时成员为样本本身
+        self._recent_history = deque()
+        # 智能模式：近期窗口内各样本的出现次数（随 _recent_history 增量维护）
+        self._recent_counts = IdMap("recent")
+
+        # 智能模式（衰减式）：罚分 = 存储值 × 全局缩放因子 decay_factor^(时钟 - 基准)
+        # 每次抽取只需改动被抽中的 k 项，衰减本身只推进时钟
+        self.decay_unit = None              # None=窗口式, "draw"=每次抽取衰减, "minute"=每分钟衰减
+        self.decay_factor = 0.5             # 每个单位后罚分保留的比例 (0, 1)
+        self._decay_stored = IdMap("decay") # item → 存储值（仅被抽中过的样本）
+        self._decay_t0 = 0.0                # 全局缩放基准时刻
+        self._decay_draws = 0               # 按次衰减的时钟
+
+        # 最久未抽优先模式：item → 最近一次被抽中的抽取序号（0 表示从未抽中）
+        self._last_called = IdMap("last")
+        # 宽松度：键值 = 上次抽中序号 + 宽松度 × Exp(1)，0 为严格按最久未抽排序
+        self.lru_softness = 0.0
+        self._lru_heap = None               # IndexedMinHeap（按 id），随总体切换重建
+        self._lru_source = None             # 堆对应的总体（PreparedPopulation 或样本元组）
+        self._lru_index = None              # 样本 → id
+        self._lru_items = None              # id → 样本
+        self._lru_positions = None          # id → 首次出现的位置（None 表示与 id 相同）
 
         # 智能模式：是否使用固定权重（用户自定义权重）
         self.use_fixed_weights = False
 
-        # 权重字典 {item: float}（智能模式固定权重 + 高级模式自定义权重共用）
-        self.weights = {}
+        # 权重映射 {item: float}（智能模式固定权重 + 高级模式自定义权重共用）
+        self.weights = IdMap("weights")
+        # 权重版本号：set_weight / set_weights_batch / reset_weights 时递增
+        self.weights_version = 0
+        # 固定权重的别名表缓存 (总体, 权重版本, AliasTable)，版本不变时重复抽取免去 O(n) 预处理；
+        # 表为 _MISSING 表示该版本已抽取过一次但尚未建表
+        self._alias_cache = None
 
         # 统计
-        self.selection_history = defaultdict(int)
+        self.selection_history = IdMap("selected")
         self.total_selections = 0
+        # 次数分布与公平性指标（随 _update_history 增量维护；只统计当前总体，切换总体时重建）
+        self.stats = SelectionStats()
+        self._stats_source = None
 
-        # ── 高级模式配置 ──
-        self.advanced_config = {
+        # ── 高级模式配置（修改后由 apply_advanced_config 编译为抽取策略） ──
+        self._strategy = None
+        self.advanced_config = _ConfigDict({
             # 抽取方式
             "with_replacement": True,        # True=放回式, False=不放回式
             "no_replace_method": self.NO_REPLACE_METHOD_CONTINUOUS,  # 不放回调整方法
@@ -82,54 +199,247 @@ class SmartSampler:
             "smart_reduce_weight": True,     # 智能降权/配权
             "smart_memory_count": 5,         # 记忆次数
             "custom_weights": False,         # 自定义权重
-        }
+        }, self._invalidate_strategy)
+
+        # 抽样器专用随机源（与全局 random 模块相互独立，可播种/序列化）
+        self.rng = create_rng(rng_kind, seed)
+
+        # 向量化后端：NumPy 可用时默认启用
+        self.use_numpy = npbackend.HAS_NUMPY
+
+        # 后端调度器（进程内共享，代价系数缓存在 data/cache/dispatch.json）
+        self.dispatcher = default_dispatcher()
+        # 运行信息：最近一次抽取 {"mode", "backend", "n", "k", "elapsed"}，以及各后端累计使用次数
+        self.last_draw_info = None
+        self.backend_usage = Counter()
+        self._backend = None
+
+        # 当前绑定的预处理总体（PreparedPopulation）：上面的 weights / selection_history /
+        # _decay_stored / _last_called 均为 IdMap，名单内的样本直接存放在其 id 数组中
+        self._prepared = None
+
+        # 排除名单（今日缺席 / 已点过）：绑定总体 id 上的位集合，随绑定总体按名字迁移
+        self._excluded = None
+        self._excluded_positions = 0        # 被排除的位置数（名单含重名时多于被排除的名字数）
 
         # 高级模式：不放回状态跟踪
-        self._remaining_pool = []           # 当前剩余可抽取池
+        self._remaining_pool = None         # 当前剩余可抽取池（LazyPermutation，按位置）
         self._shuffle_done_once = False     # "仅启动时"打乱是否已执行
         self._pre_draw_done_once = False    # "仅启动时"预抽取是否已执行
 
     # ── 模式切换 ──────────────────────────────────────────
 
+    def _numpy_for(self, n):
+        """返回 NumPy 生成器（当前规模适合向量化时），否则返回 None"""
+        if not self.use_numpy or n < self.NUMPY_MIN_SIZE:
+            return None
+        return self.rng.numpy_generator()
+
+    def _advance_rng(self, draws):
+        """将随机流推进约 draws 次抽取所消耗的随机数（预抽取平衡使用）
+
+        Mersenne Twister 一次 getrandbits 调用即可跳过所需的 32 位字；
+        NumPy 的 PCG64 直接 advance，均不分配抽样结果。
+        """
+        if draws > 0:
+            self.rng.advance(draws)
+
+    # ── 随机源 ────────────────────────────────────────────
+
+    def set_rng(self, kind="mt", seed=None):
+        """切换随机源（kind 见 core.rng.RNG_KINDS；seed 为 None 时使用系统熵）"""
+        self._use_rng(create_rng(kind, seed))
+
+    def _use_rng(self, rng):
+        self.rng = rng
+        if self._remaining_pool is not None:
+            self._remaining_pool._rng = rng
+
+    def spawn_rngs(self, n):
+        """派生 n 个与当前随机源相互独立的子随机流（供并行任务使用）"""
+        return self.rng.spawn(n)
+
+    def get_rng_state(self):
+        """导出随机源状态（可 JSON 序列化，用于会话恢复）"""
+        return self.rng.export_state()
+
+    def set_rng_state(self, state):
+        """由 get_rng_state() 的结果恢复随机源，之后的抽取与保存时完全一致"""
+        self._use_rng(restore_rng(state))
+
     def set_mode(self, mode):
-        if mode in (self.MODE_BASIC, self.MODE_SMART, self.MODE_ADVANCED):
+        if mode in self.MODE_NAMES:
             self.mode = mode
             # 切换到高级模式时，重置不放回状态
             if mode == self.MODE_ADVANCED:
-                self._remaining_pool = []
+                self._remaining_pool = None
                 self._shuffle_done_once = False
                 self._pre_draw_done_once = False
 
+    # ── 智能模式衰减 ──────────────────────────────────────
+
+    def set_decay(self, unit=None, factor=0.5):
+        """设置智能模式的近期历史方式
+
+        Args:
+            unit: None=窗口式（最近 smart_window 次），"draw"=每次抽取衰减，"minute"=每分钟衰减
+            factor: 每个单位后罚分保留的比例，须在 (0, 1) 之间
+        """
+        if unit not in self.DECAY_UNITS:
+            raise ValueError(f"未知衰减单位: {unit}")
+        factor = float(factor)
+        if not 0.0 < factor < 1.0:
+            raise ValueError(f"衰减系数须在 (0, 1) 之间: {factor}")
+        if unit != self.decay_unit or factor != self.decay_factor:
+            self.decay_unit = unit
+            self.decay_factor = factor
+            self._reset_decay()
+
+    def _decay_clock(self):
+        if self.decay_unit == "minute":
+            return time.time() / 60.0
+        return float(self._decay_draws)
+
+    def _decay_scale(self):
+        """全局缩放因子（罚分 = 存储值 × 缩放因子）"""
+        return self.decay_factor ** max(0.0, self._decay_clock() - self._decay_t0)
+
+    def _reset_decay(self):
+        self._decay_stored.clear()
+        self._decay_draws = 0
+        self._decay_t0 = self._decay_clock()
+
+    def _renormalize_decay(self, scale):
+        """将缩放因子并入存储值并重置基准（O(n)，每数百次抽取才发生一次）"""
+        stored = self._decay_stored
+        for item, v in stored.items():
+            v *= scale
+            stored[item] = v if v >= 1e-9 else 0.0
+        self._decay_t0 = self._decay_clock()
+
+    def _decay_tick(self):
+        """推进时钟，返回本次抽中者应加的存储值（即 1 分罚分除以当前缩放因子）"""
+        if self.decay_unit == "draw":
+            self._decay_draws += 1
+        scale = self._decay_scale()
+        if scale < self.DECAY_RENORM_SCALE:
+            self._renormalize_decay(scale)
+            scale = 1.0
+        return 1.0 / scale
+
+    def _decay_add(self, selected_items):
+        """推进时钟并为本次抽中的样本各加 1 分罚分（只改动这 k 项）"""
+        inc = self._decay_tick()
+        stored = self._decay_stored
+        get = stored.get
+        for item in selected_items:
+            stored[item] = get(item, 0.0) + inc
+
+    def _has_smart_history(self):
+        if self.decay_unit is None:
+            return bool(self._recent_history)
+        return bool(self._decay_stored)
+
     # ── 权重设置 ──────────────────────────────────────────
 
     def set_weight(self, item, weight):
         """设置单个样本的权重（智能模式固定权重 / 高级模式自定义权重）"""
         self.weights[item] = max(0.0, float(weight))
+        self.weights_version += 1
 
     def get_weight(self, item):
         """获取单个样本的权重，未设置时默认为 1.0"""
         return self.weights.get(item, 1.0)
 
+    def has_custom_weights(self, weights=None):
+        """是否设置了非默认（≠ 1.0）的固定权重；全部为 1.0 时各处都不走固定权重路径
+
+        weights 可传入尚未保存的 样本 → 权重 字典（权重对话框的预览），默认检查已保存的权重。
+        """
+        if weights is None or weights is self.weights:
+            return bool(self.weights)   # IdMap 只保留非默认项
+        return any(w != 1.0 for w in weights.values())
+
+    def _smart_penalties(self):
+        """返回 (罚分映射, 系数)：有效权重 = max(0.1, 1 - 罚分 × 系数)"""
+        if self.decay_unit is None:
+            return self._recent_counts, 0.35
+        return self._decay_stored, 0.35 * self._decay_scale()
+
     def get_smart_effective_weight(self, item):
         """获取智能模式下某样本的有效权重（即智能算法计算出的动态权重）"""
-        if not self._recent_history:
+        penalties, coef = self._smart_penalties()
+        p = penalties.get(item, 0)
+        if not p:
             return 1.0
-        recent_counts = Counter()
-        for hist_set in self._recent_history:
-            for i in hist_set:
-                recent_counts[i] += 1
-        count = recent_counts.get(item, 0)
-        w = 1.0 - (count * 0.35)
-        return max(0.1, w)
+        return max(0.1, 1.0 - p * coef)
+
+    def get_smart_effective_weights(self, population):
+        """批量获取智能有效权重（单次 O(n) 遍历）"""
+        penalties, coef = self._smart_penalties()
+        if not penalties:
+            return [1.0] * len(population)
+        get = penalties.get
+        return [max(0.1, 1.0 - get(item, 0) * coef) for item in population]
+
+    def iter_smart_effective_weights(self, items):
+        """惰性逐项给出智能有效权重（缩放因子只计算一次，供权重对话框按需读取）"""
+        penalties, coef = self._smart_penalties()
+        get = penalties.get
+        for item in items:
+            p = get(item, 0)
+            yield max(0.1, 1.0 - p * coef) if p else 1.0
 
     def set_weights_batch(self, items_with_weights):
         """批量设置权重 items_with_weights: [(item, weight), ...]"""
         for item, w in items_with_weights:
-            self.weights[item] = max(0.0, float(w))
+            self.set_weight(item, w)
 
     def reset_weights(self):
         """重置所有权重"""
         self.weights.clear()
+        self.weights_version += 1
+
+    def _weight_vector(self, population, smart=True, fixed=False):
+        """计算整个总体的权重向量（智能降权 smart × 固定权重 fixed）
+
+        绑定的 PreparedPopulation 直接按 id 数组索引；
+        大样本且 NumPy 可用时返回 ndarray，否则返回 list。
+        """
+        vectorized = self._numpy_for(len(population)) is not None
+        if population is self._prepared:
+            if vectorized:
+                decay_scale = None if self.decay_unit is None else self._decay_scale()
+                return npbackend.prepared_weights(population, smart, fixed, decay_scale)
+            ids = population.ids
+            fw = population.weights
+            if smart:
+                if self.decay_unit is None:
+                    pen, coef = population.recent, 0.35
+                else:
+                    pen, coef = population.decay, 0.35 * self._decay_scale()
+                if fixed:
+                    return [max(0.1, 1.0 - pen[u] * coef) * fw[u] for u in ids]
+                return [max(0.1, 1.0 - pen[u] * coef) for u in ids]
+            return [fw[u] for u in ids]
+
+        if vectorized:
+            if smart:
+                penalties, coef = self._smart_penalties()
+                return npbackend.smart_weights(
+                    population, penalties, self.weights if fixed else None, coef
+                )
+            return npbackend.fixed_weights(population, self.weights)
+
+        if not smart:
+            get = self.weights.get
+            return [get(item, 1.0) for item in population]
+        smart_weights = self.get_smart_effective_weights(population)
+        if fixed:
+            # 叠加用户固定权重（乘积方式）
+            get = self.weights.get
+            return [w * get(item, 1.0) for w, item in zip(smart_weights, population)]
+        return smart_weights
 
     # ── 核心抽样入口 ──────────────────────────────────────
 
@@ -147,287 +457,707 @@ class SmartSampler:
         if not population or k <= 0:
             return []
 
-        pop_list = list(population)
+        pop_list = self._as_population(population)
+        return self._draw_once(self._mode_sampler(), pop_list, k)
 
-        # 抽取数量 >= 总数 → 打乱后返回
-        if k >= len(pop_list):
-            result = pop_list.copy()
-            shuffle(result)
-            self._update_history(result)
-            return result[:k] if k > len(pop_list) else result
+    def sample_rounds(self, population, k, rounds):
+        """
+        批量抽样：连续执行 rounds 次抽取，逐轮产出结果（生成器）
 
-        if self.mode == self.MODE_BASIC:
-            result = self._basic_sample(pop_list, k)
-        elif self.mode == self.MODE_SMART:
-            result = self._smart_sample(pop_list, k)
-        else:  # MODE_ADVANCED
-            result = self._advanced_sample(pop_list, k)
+        与循环调用 smart_sample 的历史/降权语义完全一致（每轮抽完立即计入历史），
+        但总体只复制一次、模式分派只做一次；结果按需产出，内存占用不随轮数增长。
+        迭代过程中修改抽样模式不会影响已开始的批次。
 
-        self._update_history(result)
+        Args:
+            population: 样本总体（列表或可迭代对象）
+            k: 每轮抽取数量
+            rounds: 抽取轮数
+
+        Yields:
+            每轮的抽取结果列表
+        """
+        if not population or k <= 0 or rounds <= 0:
+            return
+
+        pop_list = self._as_population(population)
+        draw = self._mode_sampler()
+        for _ in range(rounds):
+            yield self._draw_once(draw, pop_list, k)
+
+    def bind_population(self, population):
+        """绑定预处理总体（加载名单时调用，之后的抽取直接复用其 id 数组）"""
+        self._as_population(population)
+
+    def _as_population(self, population):
+        """规范化总体：PreparedPopulation 原样使用（必要时绑定），虚拟总体原样使用，其余复制为列表"""
+        if isinstance(population, VirtualPopulation):
+            if population != self._stats_source:
+                self._rebuild_stats(population)
+            return population
+        if isinstance(population, PreparedPopulation):
+            if population is not self._prepared or population.owner is not self:
+                old = self._prepared
+                population.bind(self)
+                self._prepared = population
+                self._rebind_exclusions(old)
+            if population is not self._stats_source:
+                self._rebuild_stats(population)
+            return population
+        pop_list = list(population)
+        if population is not self._stats_source:
+            self._rebuild_stats(population, pop_list)
+        return pop_list
+
+    def _rebuild_stats(self, source, items=None):
+        """按 source 总体内样本的累计次数重建统计（切换总体时调用，混合抽人/抽组时指标不串用）"""
+        history = self.selection_history
+        labels = None
+        if isinstance(source, PreparedPopulation):
+            # 绑定总体的统计以 id 为键，抽取时按 id 批量更新
+            counts = {uid: c for uid, c in enumerate(source.selected) if c}
+            size = len(source.keys)
+            labels = source.keys
+        elif isinstance(source, VirtualPopulation):
+            counts = {item: c for item, c in history.items() if item in source}
+            unique = source.first_positions()
+            size = len(source) if unique is None else len(unique)
+        else:
+            unique = set(source if items is None else items)
+            counts = {item: history[item] for item in unique}
+            size = len(unique)
+        self.stats.rebuild(counts, labels)
+        self.stats.set_population_size(size)
+        self._stats_source = source
+
+    def _mode_sampler(self):
+        """返回当前模式对应的抽样实现"""
+        if self.mode == self.MODE_BASIC:
+            return self._basic_sample
+        if self.mode == self.MODE_SMART:
+            return self._smart_sample
+        if self.mode == self.MODE_LRU:
+            return self._lru_sample
+        return self._advanced_sample  # MODE_ADVANCED
+
+    def _draw_once(self, draw, pop_list, k):
+        """执行一次抽取并计入历史（pop_list 不会被修改）
+
+        各模式实现只返回抽中的位置；样本在此处一次性取出，
+        绑定总体的历史、近期窗口、最久未抽优先堆与统计均按 id 更新，不再逐项反查。
+        """
+        n = len(pop_list)
+        t0 = time.perf_counter()
+        blocked = self._blocked_for(pop_list)
+        available = n if blocked is None else self._available(pop_list, blocked)
+        # 抽取数量 >= 可抽取总数 → 打乱后返回
+        if k >= available:
+            idx = list(range(n)) if blocked is None else self._unblocked_positions(pop_list, blocked)
+            self.rng.shuffle(idx)
+            self._backend = "shuffle"
+        else:
+            self._backend = None
+            idx = draw(pop_list, k)
+        self._record_draw(n, k, time.perf_counter() - t0)
+        if pop_list is self._prepared:
+            ids = pop_list.ids
+            uids = [ids[i] for i in idx]
+            keys = pop_list.keys
+            result = [keys[uid] for uid in uids]
+            self._update_history(result, uids)
+        else:
+            result = [pop_list[i] for i in idx]
+            self._update_history(result)
         return result
 
-    # ── 各模式实现 ────────────────────────────────────────
+    def _record_draw(self, n, k, elapsed):
+        """记录最近一次抽取的运行信息（后端由各实现写入 _backend）"""
+        backend = self._backend or "unknown"
+        self.backend_usage[backend] += 1
+        self.last_draw_info = {
+            "mode": self.mode,
+            "backend": backend,
+            "n": n,
+            "k": k,
+            "elapsed": elapsed,
+        }
+
+    # ── 各模式实现（均返回抽中的位置列表，样本由 _draw_once 统一取出） ──
 
     def _basic_sample(self, population, k):
-        """模式 0：纯随机抽样"""
-        return sample(population, k)
+        """模式 0：纯随机抽样（后端由调度器选择）"""
+        blocked = self._blocked_for(population)
+        if blocked is not None:
+            return self._unblocked_sample(population, k, blocked)
+        n = len(population)
+        rng = self.rng
+        name = self.dispatcher.choose_uniform(rng.kind, n, k, self.use_numpy and npbackend.HAS_NUMPY, rng.seeded)
+        self._backend = name
+        gen = rng.numpy_generator() if name == "numpy" else None
+        return UNIFORM_BACKENDS[name](rng, gen, n, k)
 
     def _smart_sample(self, population, k):
         """模式 1：智能抽样 — 根据近期历史调整权重，避免连续选中相同项；
         如果启用了固定权重，则在智能权重基础上叠加用户自定义权重。
         """
-        # 计算智能动态权重
-        smart_weights = []
-        for item in population:
-            smart_weights.append(self.get_smart_effective_weight(item))
+        use_fixed = self.use_fixed_weights and self.has_custom_weights()
+
+        # 无历史时智能权重全为 1：仅智能权重 → 纯随机；叠加固定权重 → 直接按固定权重抽取
+        if not self._has_smart_history():
+            if use_fixed:
+                return self._fixed_weighted_select(population, k)
+            return self._basic_sample(population, k)
+
+        # 智能动态权重（启用固定权重时叠乘用户权重）
+        return self._select_by_weights(population, k, smart=True, fixed=use_fixed)
+
+    def _lru_key(self, draw_no):
+        """堆键值：(上次抽中序号 [+ 宽松噪声], 随机平局键)"""
+        rng = self.rng
+        if self.lru_softness > 0:
+            return (draw_no + self.lru_softness * rng.expovariate(1.0), rng.random())
+        return (draw_no, rng.random())
+
+    def _lru_heap_for(self, population):
+        """返回与总体对应的最小堆；总体变化时按 _last_called 重建（O(n)，每个名单一次）"""
+        positions = None
+        if isinstance(population, PreparedPopulation):
+            if self._lru_source is population and self._lru_heap is not None:
+                return self._lru_heap
+            source, index, items = population, population.index, population.keys
+            if population.has_duplicates:
+                positions = population.first_positions()
+        elif isinstance(population, VirtualPopulation):
+            if self._lru_source == population and self._lru_heap is not None:
+                return self._lru_heap
+            source, index, items = population, population.index, population
+            if population.has_duplicates:
+                # 保留重名的内存映射名单：堆按不同名字的首次出现位置建立，仍然只按需解码
+                positions = population.first_positions()
+                index = items = SubsetIndex(population, positions)
+        else:
+            source = tuple(population)
+            if self._lru_source == source and self._lru_heap is not None:
+                return self._lru_heap
+            index, items, positions = {}, [], []
+            for i, item in enumerate(source):
+                if item not in index:
+                    index[item] = len(items)
+                    items.append(item)
+                    positions.append(i)
+        if source is self._prepared:
+            last = population.last
+        elif isinstance(population, VirtualPopulation):
+            # 虚拟总体的堆按下标建立，只回填有记录的样本，不逐个生成（内存映射名单无需解码全部名字）
+            last = [0] * len(items)
+            for item, d in self._last_called.items():
+                i = index.get(item)
+                if i is not None:
+                    last[i] = d
+        else:
+            get = self._last_called.get
+            last = [get(item, 0) for item in items]
+        self._lru_heap = IndexedMinHeap([self._lru_key(d) for d in last])
+        self._lru_source, self._lru_index, self._lru_items = source, index, items
+        self._lru_positions = positions
+        return self._lru_heap
 
-        if self.use_fixed_weights and self.weights:
-            # 叠加用户固定权重（乘积方式）
-            final_weights = []
-            for i, item in enumerate(population):
-                user_w = self.weights.get(item, 1.0)
-                final_weights.append(smart_weights[i] * user_w)
-            return self._weighted_select(population, k, final_weights)
+    def _lru_sample(self, population, k):
+        """模式 3：最久未抽优先 — 从堆顶依次取出 k 个不同样本（O(k log n)）
 
-        # 仅智能权重（如无历史则纯随机）
-        if not self._recent_history:
-            return sample(population, k)
-        return self._weighted_select(population, k, smart_weights)
+        取出的样本在 _update_history 中以本次抽取序号重新入堆。
+        """
+        heap = self._lru_heap_for(population)
+        self._backend = "lru_heap"
+        skip = self._lru_skip()
+        if skip is None:
+            chosen = [heap.pop() for _ in range(min(k, len(heap)))]
+        else:
+            # 被排除的样本暂时出堆，取完后按原键值放回（不改变其最久未抽顺序）
+            chosen, held = [], []
+            while len(chosen) < k and len(heap):
+                uid = heap.pop()
+                if skip(uid):
+                    held.append(uid)
+                else:
+                    chosen.append(uid)
+            for uid in held:
+                heap.set(uid, heap.keys[uid])
+        positions = self._lru_positions
+        result = chosen if positions is None else [positions[uid] for uid in chosen]
+        if len(result) < k:
+            # 去重后的样本不足 k 个（名单含重名）：按位置随机补足
+            items = self._lru_items
+            taken = {items[uid] for uid in chosen}
+            blocked = self._blocked_for(population)
+            rest = [i for i in range(len(population))
+                    if population[i] not in taken and not (blocked and blocked(i))]
+            result.extend(self.rng.sample(rest, min(k - len(result), len(rest))))
+        return result
+
+    def _lru_skip(self):
+        """最久未抽优先堆中 id 是否被排除的判定函数（没有排除时返回 None）"""
+        mask = self._excluded
+        if not mask or isinstance(self._lru_source, VirtualPopulation):
+            return None
+        if self._lru_source is self._prepared:
+            return mask.__contains__
+        get, items = self._prepared.index.get, self._lru_items
+        return lambda uid: get(items[uid]) in mask
+
+    def _invalidate_strategy(self):
+        self._strategy = None
+
+    def apply_advanced_config(self, cfg=None):
+        """更新高级配置并编译为抽取策略（配置未变化时复用已编译的策略）"""
+        if cfg:
+            changed = any(self.advanced_config.get(key, _MISSING) != value
+                          for key, value in cfg.items())
+            if changed:
+                self.advanced_config.update(cfg)
+        if self._strategy is None:
+            self._strategy = compile_strategy(self.advanced_config)
+        return self._strategy
 
     def _advanced_sample(self, population, k):
-        """模式 2：高级抽样 — 支持放回/不放回、抽取优化、加权等"""
-        cfg = self.advanced_config
-        pop = population.copy()
-
-        # ── 不放回模式 ──
-        if not cfg["with_replacement"]:
-            return self._advanced_no_replace(pop, k)
-
-        # ── 放回模式：应用抽取优化 ──
-
-        # 1) 随机定权重
-        if cfg["random_weights"]:
-            w_min = cfg.get("random_weight_min", 0.10)
-            w_max = cfg.get("random_weight_max", 2.00)
-            temp_weights = {item: uniform(w_min, w_max) for item in pop}
-            return self._weighted_select(
-                pop, k, [temp_weights.get(item, 1.0) for item in pop]
-            )
-
-        # 2) 递进式抽取
-        if cfg["progressive_draw"]:
-            return self._progressive_draw(pop, k)
-
-        # 3) 抽取前打乱
-        should_shuffle = False
-        if cfg["shuffle_before"]:
-            if cfg.get("shuffle_frequency", "each") == "each":
-                should_shuffle = True
-            elif cfg.get("shuffle_frequency") == "once" and not self._shuffle_done_once:
-                should_shuffle = True
-                self._shuffle_done_once = True
-
-        if should_shuffle:
-            sc = max(1, min(10, cfg.get("shuffle_count", 1)))
-            for _ in range(sc):
-                shuffle(pop)
-
-        # 4) 预抽取平衡
-        should_pre_draw = False
-        if cfg["pre_draw_balance"]:
-            if cfg.get("pre_draw_frequency", "each") == "each":
-                should_pre_draw = True
-            elif cfg.get("pre_draw_frequency") == "once" and not self._pre_draw_done_once:
-                should_pre_draw = True
-                self._pre_draw_done_once = True
-
-        if should_pre_draw:
-            pd_count = max(1, min(10, cfg.get("pre_draw_count", 1)))
-            for _ in range(pd_count):
-                # 后台静默预抽取
-                sample(pop, min(k, len(pop)))
-
-        # 5) 多次取最值
-        if cfg["multi_draw_best"]:
-            mc = max(2, min(len(pop), cfg.get("multi_draw_count", 3)))
-            counter = Counter()
-            for _ in range(mc):
-                drawn = sample(pop, k)
-                for item in drawn:
-                    counter[item] += 1
-            # 按被抽次数降序，取前k个
-            sorted_items = sorted(counter.items(), key=lambda x: (-x[1], x[0]))
-            result = [item for item, _ in sorted_items[:k]]
-            if len(result) < k:
-                # 补足：从未被抽到的样本中随机选取
-                remaining = [item for item in pop if item not in result]
-                result.extend(sample(remaining, k - len(result)))
-            return result
-
-        # 6) 加权模式（自定义权重 / 智能降权）
-        # 同时认 advanced_config["custom_weights"]（高级配置窗口）
-        # 和 self.use_fixed_weights（权重对话框/智能模式）
-        _use_custom = cfg.get("custom_weights") or self.use_fixed_weights
-
-        if _use_custom and self.weights:
-            return self._weighted_select(
-                pop, k, [self.weights.get(item, 1.0) for item in pop]
-            )
-
-        if cfg.get("smart_reduce_weight", True):
-            # 智能降权
-            smart_weights = [self.get_smart_effective_weight(item) for item in pop]
-            if self.weights and _use_custom:
-                smart_weights = [
-                    smart_weights[i] * self.weights.get(item, 1.0)
-                    for i, item in enumerate(pop)
-                ]
-            return self._weighted_select(pop, k, smart_weights)
-
-        # 默认：纯随机
-        return sample(pop, k)
-
-    def _advanced_no_replace(self, population, k):
-        """不放回式抽取"""
-        cfg = self.advanced_config
-
-        # 初始化或检查剩余池
-        if not self._remaining_pool:
-            self._remaining_pool = population.copy()
-            shuffle(self._remaining_pool)
-
-        remaining = self._remaining_pool
+        """模式 2：高级抽样 — 执行编译后的策略流水线（见 core.strategy）"""
+        strategy = self._strategy or self.apply_advanced_config()
+        return strategy(self, population, k)
+
+    def _advanced_no_replace(self, population, k, method, ratio):
+        """不放回式抽取（method 为调整方法，ratio 为比率式阈值，均已在策略编译时确定）"""
+        n = len(population)
+        self._backend = "lazy_permutation"
+
+        # 初始化或检查剩余池（总体规模变化时视为新样本）
+        pool = self._remaining_pool
+        if pool is None or pool.n != n:
+            pool = self._remaining_pool = LazyPermutation(n, self.rng)
+        elif not pool.remaining:
+            pool.reset()
 
         # 比率式调整
-        if cfg.get("no_replace_method") == self.NO_REPLACE_METHOD_RATIO:
-            ratio = max(0.10, min(0.50, cfg.get("no_replace_ratio", 0.5)))
-            if len(remaining) <= int(len(population) * ratio):
-                remaining = population.copy()
-                shuffle(remaining)
-                self._remaining_pool = remaining
-
-        if k <= len(remaining):
+        if method == self.NO_REPLACE_METHOD_RATIO:
+            if pool.remaining <= int(n * ratio):
+                pool.reset()
+
+        # 有排除时只取未被排除的位置，被排除的留在池中，恢复后仍可在本轮抽到
+        blocked = self._blocked_for(population)
+        if blocked is None:
+            take = pool.take
+            idx = pool.take(k) if k <= pool.remaining else None
+        else:
+            def take(m):
+                return pool.take_where(m, blocked)
+            idx = take(k)
+        if idx is not None and len(idx) == k:
             # 足够抽取
-            result = remaining[:k]
-            self._remaining_pool = remaining[k:]
-            return result
+            return idx
 
         # 不够抽取，根据调整方法处理
-        method = cfg.get("no_replace_method", self.NO_REPLACE_METHOD_CONTINUOUS)
-
         if method == self.NO_REPLACE_METHOD_CONTINUOUS:
             # 连续循环：先取剩余的，再重载补足
-            result = list(remaining)
-            need = k - len(result)
+            if idx is None:
+                idx = take(pool.remaining)
+            need = k - len(idx)
             while need > 0:
-                new_pool = population.copy()
-                shuffle(new_pool)
-                take = min(need, len(new_pool))
-                result.extend(new_pool[:take])
-                need -= take
-            self._remaining_pool = new_pool[take:]
-            return result[:k]
-
-        elif method == self.NO_REPLACE_METHOD_DIVISIBLE:
-            # 整除式重载：直接重载进入下一次循环
-            new_pool = population.copy()
-            shuffle(new_pool)
-            result = new_pool[:k]
-            self._remaining_pool = new_pool[k:]
-            return result
-
-        else:
-            # 比率式（已在上方处理，这里作为fallback）
-            new_pool = population.copy()
-            shuffle(new_pool)
-            result = new_pool[:k]
-            self._remaining_pool = new_pool[k:]
-            return result
+                pool.reset()
+                got = take(need)
+                if not got:
+                    break
+                idx.extend(got)
+                need -= len(got)
+            return idx
+
+        # 整除式重载 / 比率式 fallback：直接重载进入下一次循环
+        pool.reset()
+        return take(k)
 
     def _progressive_draw(self, population, k):
         """递进式抽取：样本中以一半数量层层递进式抽取
         例：50→25→13→7→4→2→1
-        最终从最小的集合中随机取 k 个
+        最终从最小的集合中随机取 k 个（基于位置置换，见 progressive_indices）
         """
-        current = population.copy()
-        shuffle(current)
-        while len(current) > max(k, 2):
-            half = max(1, len(current) // 2)
-            current = sample(current, half)
-        if len(current) >= k:
-            return sample(current, k)
-        # 递进后不足 k 个，从原总体中补充
-        remaining = [x for x in population if x not in current]
-        shuffle(remaining)
-        need = k - len(current)
-        return current + sample(remaining, min(need, len(remaining)))
+        self._backend = "progressive"
+        blocked = self._blocked_for(population)
+        if blocked is None:
+            return progressive_indices(len(population), k, self.rng)
+        avail = self._unblocked_positions(population, blocked)
+        return [avail[i] for i in progressive_indices(len(avail), k, self.rng)]
 
     def _weighted_select(self, population, k, weights):
         """带权重的无放回抽样（通用实现）
-        使用 (索引, 项) 元组避免重复项的 index() 查找错误。
+        后端由调度器选择：树状数组（构建 O(n)，每次抽取 O(log n)）、
+        拒绝采样（k 远小于 n 且权重偏斜小时免建表）或 NumPy 指数键；按位置选取，重复项互不干扰。
+        """
+        rng = self.rng
+        blocked = self._blocked_for(population)
+        if blocked is not None:
+            # 被排除的位置权重置零（权重向量为本次抽取新建，原地修改）
+            positions = self._masked_positions(population, blocked)
+            if npbackend.HAS_NUMPY and isinstance(weights, npbackend.np.ndarray):
+                weights[positions] = 0.0
+            else:
+                for i in positions:
+                    weights[i] = 0.0
+        w_max, total = weight_bounds(weights)
+        name = self.dispatcher.choose_weighted(
+            rng.kind, len(population), k, w_max, total, self.use_numpy and npbackend.HAS_NUMPY,
+            seeded=rng.seeded,
+        )
+        self._backend = name
+        gen = rng.numpy_generator() if name == "numpy_weighted" else None
+        idx = WEIGHTED_BACKENDS[name](rng, gen, weights, k, w_max)
+        if blocked is not None:
+            idx = [i for i in idx if not blocked(i)]
+            if len(idx) < k:
+                # 权重为正的可抽样本不足 k 个：从其余未被排除的位置等概率补足
+                taken = set(idx)
+                rest = [i for i in self._unblocked_positions(population, blocked) if i not in taken]
+                idx.extend(rng.sample(rest, min(k - len(idx), len(rest))))
+        return idx
+
+    def alias_table(self, population):
+        """返回绑定总体按固定权重（按位置）构建的别名表，权重版本不变时复用缓存
+
+        总体不是当前绑定的 PreparedPopulation 或权重全为 0 时返回 None。
+        """
+        if population is not self._prepared:
+            return None
+        cache = self._alias_cache
+        if cache is not None and cache[0] is population and cache[1] == self.weights_version \
+                and cache[2] is not _MISSING:
+            return cache[2]
+        fw = population.weights
+        try:
+            table = AliasTable([fw[u] for u in population.ids])
+        except ValueError:
+            table = None
+        self._alias_cache = (population, self.weights_version, table)
+        return table
+
+    def prepare_alias_table(self, population):
+        """预先构建固定权重的别名表（保存权重后于空闲时调用，下一次抽取即可直接使用）"""
+        if self.has_custom_weights() and (self.use_fixed_weights or self.advanced_config.get("custom_weights")):
+            self.alias_table(population)
+
+    def _fixed_weighted_select(self, population, k):
+        """按固定权重带权抽取：绑定总体可使用缓存的别名表，由调度器与其他后端比较代价
+
+        新版本权重的第一次抽取走常规后端；权重自上次抽取后未变化时才建表（或由
+        prepare_alias_table 在空闲时预先建好），只用一次的权重不付出建表代价。
         """
-        result = []
-        # 用 [(idx, item), ...] 跟踪索引，避免重复项时 index() 返回错误位置
-        temp_pop = list(enumerate(population))
-        temp_w = weights.copy()
-
-        for _ in range(k):
-            if not temp_pop:
-                break
-            total = sum(temp_w)
-            if total <= 0:
-                sel_idx = sample(range(len(temp_pop)), 1)[0]
+        table = None
+        # 有排除时别名表（按全部样本构建）不适用，走常规后端并将被排除者权重置零
+        if population is self._prepared and not self._excluded:
+            cache = self._alias_cache
+            if cache is not None and cache[0] is population and cache[1] == self.weights_version:
+                if cache[2] is not _MISSING or len(population) <= self.ALIAS_LAZY_MAX_SIZE:
+                    table = self.alias_table(population)
             else:
-                norm = [w / total for w in temp_w]
-                sel_idx = choices(range(len(temp_pop)), weights=norm, k=1)[0]
+                self._alias_cache = (population, self.weights_version, _MISSING)
+        if table is None:
+            return self._select_by_weights(population, k, smart=False, fixed=True)
+        rng = self.rng
+        name = self.dispatcher.choose_weighted(
+            rng.kind, len(population), k, table.w_max, table.total,
+            self.use_numpy and npbackend.HAS_NUMPY, alias=True, seeded=rng.seeded,
+        )
+        self._backend = name
+        if name == "alias":
+            return alias_sample_indices(table, k, rng)
+        weights = self._weight_vector(population, smart=False, fixed=True)
+        gen = rng.numpy_generator() if name == "numpy_weighted" else None
+        return WEIGHTED_BACKENDS[name](rng, gen, weights, k, table.w_max)
+
+    def _select_by_weights(self, population, k, smart=True, fixed=False):
+        """按智能降权 / 固定权重带权抽取
+
+        虚拟总体只对出现在近期历史或权重字典中的样本计算权重（其余为 1），
+        满足拒绝采样条件时直接按下标抽取，不展开整个总体。
+        """
+        if isinstance(population, VirtualPopulation):
+            weights = self._sparse_weights(population, smart, fixed)
+            w_max, total = weights.bounds()
+            if rejection_trials(len(population), k, w_max, total) is not None:
+                self._backend = "sparse_rejection"
+                return rejection_weighted_indices(weights, k, w_max, self.rng)
+        return self._weighted_select(population, k, self._weight_vector(population, smart, fixed))
+
+    def _sparse_weights(self, population, smart, fixed):
+        """虚拟总体的稀疏权重（SparseWeights，仅含权重可能不为 1 的下标）"""
+        penalties, coef = self._smart_penalties() if smart else ({}, 0.0)
+        fw = self.weights if fixed else {}
+        p_get, f_get = penalties.get, fw.get
+        position, occurrences = population.position, population.occurrences
+        values = {}
+        for source in (penalties, fw):
+            for item in source:
+                i = position(item)
+                if i is None or i in values:
+                    continue
+                p = p_get(item, 0)
+                w = max(0.1, 1.0 - p * coef) if p else 1.0
+                w *= f_get(item, 1.0)
+                for j in occurrences(i):
+                    values[j] = w
+        return SparseWeights(len(population), values)
+
+    # ── 排除名单 ──────────────────────────────────────────
+
+    def _rebind_exclusions(self, old):
+        """绑定新总体时重建排除位集合，并按名字迁移原名单中被排除的样本"""
+        previous = self._excluded
+        pp = self._prepared
+        self._excluded = BitSet(len(pp.keys))
+        self._excluded_positions = 0
+        if previous and old is not None:
+            keys = old.keys
+            for uid in previous:
+                self.exclude(keys[uid])
+
+    def exclude(self, item, excluded=True):
+        """将当前名单中的样本标记为排除（excluded=False 为取消排除），O(1)
 
-            idx, item = temp_pop[sel_idx]
-            result.append(item)
-            temp_pop.pop(sel_idx)
-            temp_w.pop(sel_idx)
+        Returns:
+            样本不在当前绑定的名单中时返回 False
+        """
+        pp = self._prepared
+        uid = None if pp is None else pp.index.get(item)
+        if uid is None:
+            return False
+        mask = self._excluded
+        if (uid in mask) != excluded:
+            if excluded:
+                mask.add(uid)
+                self._excluded_positions += pp.multiplicity(uid)
+            else:
+                mask.discard(uid)
+                self._excluded_positions -= pp.multiplicity(uid)
+        return True
+
+    def include(self, item):
+        """取消排除"""
+        return self.exclude(item, False)
+
+    def toggle_excluded(self, item):
+        """切换样本的排除状态，返回切换后是否被排除（不在当前名单中时返回 None）"""
+        pp = self._prepared
+        uid = None if pp is None else pp.index.get(item)
+        if uid is None:
+            return None
+        now = self._excluded.toggle(uid)
+        delta = pp.multiplicity(uid)
+        self._excluded_positions += delta if now else -delta
+        return now
+
+    def is_excluded(self, item):
+        pp = self._prepared
+        return bool(self._excluded) and pp.index.get(item) in self._excluded
+
+    def set_excluded(self, items):
+        """整体替换排除名单，返回实际被排除的样本数"""
+        self.clear_exclusions()
+        return sum(1 for item in items if self.exclude(item))
+
+    def clear_exclusions(self):
+        if self._excluded is not None:
+            self._excluded.clear()
+        self._excluded_positions = 0
+
+    def excluded_items(self):
+        """当前被排除的样本（按名单 id 顺序）"""
+        if not self._excluded:
+            return []
+        keys = self._prepared.keys
+        return [keys[uid] for uid in self._excluded]
 
-        return result
+    @property
+    def excluded_count(self):
+        """被排除的样本数（按去重后的名字计）"""
+        return len(self._excluded) if self._excluded is not None else 0
+
+    def available_count(self, population):
+        """总体中未被排除、可被抽取的位置数"""
+        blocked = self._blocked_for(population)
+        return len(population) if blocked is None else self._available(population, blocked)
+
+    def _blocked_for(self, population):
+        """该总体上"位置是否被排除"的判定函数；没有排除或不适用（虚拟总体）时返回 None
+
+        绑定总体按 id 数组直接读位集合；由其复制出的列表（如抽取前打乱）按样本反查 id。
+        """
+        mask = self._excluded
+        if not mask or isinstance(population, VirtualPopulation):
+            return None
+        pp = self._prepared
+        bits = mask.bits
+        if population is pp:
+            ids = pp.ids
+
+            def blocked(i):
+                u = ids[i]
+                return bits[u >> 3] >> (u & 7) & 1
+        else:
+            get = pp.index.get
+
+            def blocked(i):
+                u = get(population[i])
+                return u is not None and bits[u >> 3] >> (u & 7) & 1
+        return blocked
+
+    def _available(self, population, blocked):
+        if population is self._prepared:
+            return len(population) - self._excluded_positions
+        return sum(1 for i in range(len(population)) if not blocked(i))
+
+    def _masked_positions(self, population, blocked):
+        """被排除的位置列表：无重名的绑定总体中位置即 id（O(排除数)），否则逐位置判定（O(n)）"""
+        pp = self._prepared
+        if population is pp and not pp.has_duplicates:
+            return list(self._excluded)
+        return [i for i in range(len(population)) if blocked(i)]
+
+    def _unblocked_positions(self, population, blocked):
+        return [i for i in range(len(population)) if not blocked(i)]
+
+    def _unblocked_sample(self, population, k, blocked):
+        """未被排除的位置中等概率抽 k 个：排除不多且 k 较小时按位置拒绝采样，否则列出可抽位置后抽取"""
+        n = len(population)
+        available = self._available(population, blocked)
+        if 2 * available >= n and 2 * k <= available:
+            self._backend = "masked_rejection"
+            return masked_sample_indices(n, k, self.rng, blocked)
+        self._backend = "masked_scan"
+        return self.rng.sample(self._unblocked_positions(population, blocked), k)
 
     # ── 高级模式：重置不放回状态 ──────────────────────────
 
     def reset_no_replace_pool(self):
         """重置不放回抽取池（切换样本或手动重置时调用）"""
-        self._remaining_pool = []
+        self._remaining_pool = None
         self._shuffle_done_once = False
         self._pre_draw_done_once = False
 
     # ── 历史与统计 ────────────────────────────────────────
 
-    def _update_history(self, selected_items):
-        """更新抽取历史（智能模式使用 + 统计计数）"""
-        self._recent_history.insert(0, set(selected_items))
-        if len(self._recent_history) > self.smart_window:
-            self._recent_history.pop()
+    def _update_history(self, selected_items, uids=None):
+        """更新抽取历史（智能模式使用 + 统计计数）
 
-        for item in selected_items:
-            self.selection_history[item] += 1
+        uids 为抽中样本在绑定总体中的 id（与 selected_items 一一对应）时，
+        累计次数、衰减罚分与最近抽中序号直接按 id 写入数组。
+        """
+        if uids is None:
+            if self.decay_unit is not None:
+                self._decay_add(set(selected_items))
+            else:
+                self._update_recent(selected_items)
+            history = self.selection_history
+            add = self.stats.add
+            for item in selected_items:
+                c = history[item]
+                add(item, c)
+                history[item] = c + 1
+            self._touch_last_called(selected_items)
+        else:
+            if self.decay_unit is not None:
+                self._decay_stored.add_ids(set(uids), self._decay_tick())
+            else:
+                self._update_recent(selected_items, uids)
+            # 统计以 id 为键（_as_population 已按绑定总体重建）
+            self.stats.add_many(uids, self.selection_history.add_ids(uids, 1))
+            self._touch_last_called_ids(uids, selected_items)
         self.total_selections += 1
 
-    def get_selection_stats(self):
-        """获取选中统计"""
-        stats = {
-            "total_selections": self.total_selections,
-            "selection_counts": dict(self.selection_history),
-        }
-        if self.selection_history:
-            items = list(self.selection_history.items())
-            stats["most_selected"] = max(items, key=lambda x: x[1])
-            stats["least_selected"] = min(items, key=lambda x: x[1])
+    def _touch_last_called(self, selected_items):
+        """记录本次抽中样本的抽取序号，并同步最久未抽优先堆（每项 O(log n)）"""
+        draw_no = self.total_selections + 1
+        last = self._last_called
+        heap = self._lru_heap
+        index = self._lru_index if heap is not None else None
+        for item in selected_items:
+            last[item] = draw_no
+            if index is not None:
+                uid = index.get(item)
+                if uid is not None:
+                    heap.set(uid, self._lru_key(draw_no))
+
+    def _touch_last_called_ids(self, uids, selected_items):
+        """_touch_last_called 的按 id 版本（最久未抽优先堆建在绑定总体上时同样按 id 更新）"""
+        draw_no = self.total_selections + 1
+        self._last_called.set_ids(uids, draw_no)
+        heap = self._lru_heap
+        if heap is None:
+            return
+        if self._lru_source is self._prepared:
+            for uid in uids:
+                heap.set(uid, self._lru_key(draw_no))
+            return
+        get = self._lru_index.get
+        for item in selected_items:
+            uid = get(item)
+            if uid is not None:
+                heap.set(uid, self._lru_key(draw_no))
+
+    def _update_recent(self, selected_items, uids=None):
+        """窗口式近期历史：追加本次记录并淘汰超出窗口的旧记录（给出 uids 时按 id 计数）"""
+        counts = self._recent_counts
+        if uids is None:
+            entry = (None, set(selected_items))
+            for item in entry[1]:
+                counts[item] += 1
         else:
-            stats["most_selected"] = None
-            stats["least_selected"] = None
+            entry = (self._prepared, set(uids))
+            counts.add_ids(entry[1], 1)
+        self._recent_history.appendleft(entry)
+        # smart_window 可能被外部调小，循环淘汰直到满足窗口
+        while len(self._recent_history) > self.smart_window:
+            self._evict_recent(self._recent_history.pop())
+
+    def _evict_recent(self, entry):
+        """从近期计数中移除一条过期记录（记录所属总体已不是当前绑定总体时按样本回退）"""
+        source, members = entry
+        counts = self._recent_counts
+        if source is not None and source is counts.population:
+            rec = source.recent
+            counts.add_ids([uid for uid in members if rec[uid]], -1)
+            return
+        if source is not None:
+            keys = source.keys
+            members = [keys[uid] for uid in members]
+        for item in members:
+            c = counts[item]
+            if c:
+                counts[item] = c - 1
+
+    def get_selection_stats(self):
+        """获取选中统计
+
+        除原有的 total_selections / selection_counts（次数字典的副本）/ most_selected / least_selected 外，
+        还包含均值、方差、基尼系数与对等概率期望的卡方检验（chi_square / dof / p_value）。
+        各指标只针对最近一次抽取所用的总体。
+        """
+        stats = self.get_selection_summary()
+        stats["selection_counts"] = dict(self.selection_history.items())
+        return stats
+
+    def get_selection_summary(self):
+        """get_selection_stats 去掉次数字典后的部分（O(1)，供每次抽取后刷新的统计面板使用）"""
+        stats = self.stats.summary()
+        stats["total_selections"] = self.total_selections
         return stats
 
     def reset_history(self):
         """重置所有历史记录（智能模式的近期记录 + 统计计数 + 高级模式不放回状态）"""
         self._recent_history.clear()
+        self._recent_counts.clear()
+        self._reset_decay()
+        self._last_called.clear()
+        self._lru_heap = self._lru_source = self._lru_index = self._lru_items = None
         self.selection_history.clear()
         self.total_selections = 0
-        self._remaining_pool = []
+        population_size = self.stats.population_size
+        self.stats.reset()
+        self.stats.set_population_size(population_size)
+        self._remaining_pool = None
         self._shuffle_done_once = False
         self._pre_draw_done_once = False
@@ -0,0 +1,368 @@
+"""
+抽样器状态快照 — 按名单指纹保存/恢复 SmartSampler 的历史与不放回进度
+
+快照采用按 id 索引的紧凑二进制布局（小端）：
+
+    头部      4s H H I I Q   魔数 b"RCTS"、版本、标志位、名单去重数、名单长度、总抽取次数
+    累计次数  u32 × 去重数    id → 被抽中次数
+    近期窗口  u32 组数，每组 u32 个数 + u32 id 列表（最新在前）
+    不放回池  u8 是否存在；存在时 u32 n、u32 游标、u32 交换数 + u32 键列表 + u32 值列表
+    衰减罚分  u8 单位（0=无）；非 0 时 d 系数、d 基准时刻、Q 抽取时钟 + f64 × 去重数（版本 2 起）
+    最近抽中  u32 × 去重数    id → 最近一次被抽中的抽取序号（版本 3 起）
+
+10 万人名单的快照只是几段连续数组，读写均为整块 frombytes/tobytes，毫秒级完成。
+每次抽取后只在调用线程采集改动过的 id（见 PreparedPopulation.dirty），完整数组的合并与编码在写入线程进行。
+"""
+import os
+import sys
+import struct
+import threading
+from array import array
+from collections import deque
+from core.algos import LazyPermutation
+from core.info import rct_cache_path
+from core.logman import rctlog
+
+SNAPSHOT_DIR = os.path.join(rct_cache_path, "state")
+
+_MAGIC = b"RCTS"
+_VERSION = 3
+_HEADER = struct.Struct("<4sHHIIQ")
+_U32 = struct.Struct("<I")
+_POOL = struct.Struct("<III")
+_DECAY = struct.Struct("<ddQ")
+_DECAY_UNITS = {None: 0, "draw": 1, "minute": 2}
+
+_FLAG_SHUFFLE_ONCE = 1
+_FLAG_PRE_DRAW_ONCE = 2
+
+
+def _u32_bytes(values):
+    """u32 数组 → 小端字节"""
+    arr = values if isinstance(values, array) else array("I", values)
+    if sys.byteorder != "little":
+        arr = array("I", arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _u32_array(data, offset, count):
+    """小端字节 → u32 数组，返回 (数组, 新偏移)"""
+    end = offset + 4 * count
+    if end > len(data):
+        raise ValueError("快照数据不完整")
+    arr = array("I")
+    arr.frombytes(data[offset:end])
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr, end
+
+
+def snapshot_path(fingerprint):
+    """名单指纹对应的快照文件路径"""
+    return os.path.join(SNAPSHOT_DIR, f"{fingerprint}.rcs")
+
+
+class StateDelta:
+    """一次保存提交的快照内容（在调用线程采集，编码为文件在后台线程完成）
+
+    head / middle / decay_head 为已编码的小段（头部、近期窗口与不放回池、衰减参数）；
+    uids 为 None 时 selected / decay / last 为完整数组的副本，否则只含这些 id 的新值。
+    """
+
+    __slots__ = ("source", "head", "middle", "decay_head", "uids", "selected", "decay", "last")
+
+    def __init__(self, source, head, middle, decay_head, uids, selected, decay, last):
+        self.source = source
+        self.head = head
+        self.middle = middle
+        self.decay_head = decay_head
+        self.uids = uids
+        self.selected = selected
+        self.decay = decay
+        self.last = last
+
+
+def _sections(sampler, prepared):
+    """编码按 id 数组以外的各段，返回 (头部, 近期窗口 + 不放回池, 衰减参数)"""
+    index = prepared.index
+    flags = 0
+    if sampler._shuffle_done_once:
+        flags |= _FLAG_SHUFFLE_ONCE
+    if sampler._pre_draw_done_once:
+        flags |= _FLAG_PRE_DRAW_ONCE
+    head = _HEADER.pack(_MAGIC, _VERSION, flags, len(prepared.keys), len(prepared),
+                        sampler.total_selections)
+
+    parts = [_U32.pack(len(sampler._recent_history))]
+    for source, members in sampler._recent_history:
+        if source is prepared:
+            ids = list(members)
+        else:
+            if source is not None:
+                members = [source.keys[uid] for uid in members]
+            ids = [uid for uid in map(index.get, members) if uid is not None]
+        parts.append(_U32.pack(len(ids)))
+        parts.append(_u32_bytes(ids))
+
+    pool = sampler._remaining_pool
+    if pool is not None and pool.n == len(prepared):
+        swaps = pool._swaps
+        parts.append(b"\x01")
+        parts.append(_POOL.pack(pool.n, pool.cursor, len(swaps)))
+        parts.append(_u32_bytes(swaps.keys()))
+        parts.append(_u32_bytes(swaps.values()))
+    else:
+        parts.append(b"\x00")
+
+    unit = _DECAY_UNITS[sampler.decay_unit]
+    decay_head = bytes((unit,))
+    if unit:
+        decay_head += _DECAY.pack(sampler.decay_factor, sampler._decay_t0, sampler._decay_draws)
+    return head, b"".join(parts), decay_head
+
+
+def capture_state(sampler, prepared):
+    """采集待保存的状态：只复制上次采集以来改动过的 id（prepared.dirty），O(改动数)
+
+    dirty 为 None（刚加载、恢复快照或整体重置之后）时复制完整数组。
+    """
+    head, middle, decay_head = _sections(sampler, prepared)
+    dirty = prepared.dirty
+    if dirty is None:
+        uids = None
+        selected = array("I", prepared.selected)
+        decay = array("d", prepared.decay)
+        last = array("I", prepared.last)
+    else:
+        uids = array("I", dirty)
+        sel, dec, lst = prepared.selected, prepared.decay, prepared.last
+        selected = array("I", [sel[uid] for uid in uids])
+        decay = array("d", [dec[uid] for uid in uids])
+        last = array("I", [lst[uid] for uid in uids])
+    prepared.dirty = set()
+    return StateDelta(id(prepared), head, middle, decay_head, uids, selected, decay, last)
+
+
+def _join(delta):
+    """完整的 StateDelta → 快照字节串"""
+    parts = [delta.head, _u32_bytes(delta.selected), delta.middle, delta.decay_head]
+    if delta.decay_head[0]:
+        decay = delta.decay
+        if sys.byteorder != "little":
+            decay = array("d", decay)
+            decay.byteswap()
+        parts.append(decay.tobytes())
+    parts.append(_u32_bytes(delta.last))
+    return b"".join(parts)
+
+
+def _apply(base, delta):
+    """把增量合并到完整状态上（base 为 None 或 delta 为完整状态时直接采用 delta），返回合并结果"""
+    if delta.uids is None or base is None:
+        return delta
+    for arr, values in ((base.selected, delta.selected), (base.decay, delta.decay),
+                        (base.last, delta.last)):
+        for uid, value in zip(delta.uids, values):
+            arr[uid] = value
+    base.head, base.middle, base.decay_head = delta.head, delta.middle, delta.decay_head
+    base.source = delta.source
+    return base
+
+
+def encode_state(sampler, prepared):
+    """将抽样器中与该名单相关的状态编码为字节串（只记录名单内的样本）"""
+    head, middle, decay_head = _sections(sampler, prepared)
+    return _join(StateDelta(id(prepared), head, middle, decay_head, None,
+                            prepared.selected, prepared.decay, prepared.last))
+
+
+def decode_state(sampler, prepared, data):
+    """将快照恢复到抽样器（prepared 须已与 sampler 绑定）；格式或名单不符时抛出 ValueError"""
+    if len(data) < _HEADER.size:
+        raise ValueError("快照数据不完整")
+    magic, version, flags, n_keys, n_items, total = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or not 1 <= version <= _VERSION:
+        raise ValueError("快照格式不受支持")
+    if n_keys != len(prepared.keys) or n_items != len(prepared):
+        raise ValueError("快照与当前名单不一致")
+
+    keys = prepared.keys
+    selected, offset = _u32_array(data, _HEADER.size, n_keys)
+    (n_recent,), offset = _U32.unpack_from(data, offset), offset + 4
+    recent_sets = []
+    for _ in range(n_recent):
+        (size,), offset = _U32.unpack_from(data, offset), offset + 4
+        ids, offset = _u32_array(data, offset, size)
+        recent_sets.append(ids)
+
+    pool = None
+    has_pool = data[offset:offset + 1] == b"\x01"
+    offset += 1
+    if has_pool:
+        n, cursor, n_swaps = _POOL.unpack_from(data, offset)
+        offset += _POOL.size
+        swap_keys, offset = _u32_array(data, offset, n_swaps)
+        swap_vals, offset = _u32_array(data, offset, n_swaps)
+        if n == n_items and cursor <= n:
+            pool = LazyPermutation(n, sampler.rng)
+            pool.cursor = cursor
+            pool._swaps = dict(zip(swap_keys, swap_vals))
+
+    # 衰减罚分：仅当衰减方式与当前设置一致时恢复
+    decay = None
+    unit = data[offset] if version >= 2 and offset < len(data) else 0
+    if unit:
+        factor, t0, draws = _DECAY.unpack_from(data, offset + 1)
+        offset += 1 + _DECAY.size
+        end = offset + 8 * n_keys
+        if end > len(data):
+            raise ValueError("快照数据不完整")
+        if unit == _DECAY_UNITS[sampler.decay_unit] and factor == sampler.decay_factor:
+            decay = array("d")
+            decay.frombytes(data[offset:end])
+            if sys.byteorder != "little":
+                decay.byteswap()
+        offset = end
+    elif version >= 2:
+        offset += 1
+
+    last_called = None
+    if version >= 3:
+        last_called, offset = _u32_array(data, offset, n_keys)
+
+    # 累计次数等按 id 的数组直接替换，抽样器的 IdMap 随之重新统计
+    prepared.selected = selected
+    sampler.selection_history.reload()
+    sampler.total_selections = total
+    sampler._rebuild_stats(prepared)
+
+    # 近期窗口：按 id 重建记录与计数数组
+    rec = array("I", [0]) * n_keys
+    history = deque()
+    for ids in recent_sets:
+        members = set(ids)
+        for uid in members:
+            rec[uid] += 1
+        history.append((prepared, members))
+    prepared.recent = rec
+    sampler._recent_counts.reload()
+    sampler._recent_history = history
+    while len(history) > sampler.smart_window:
+        sampler._evict_recent(history.pop())
+
+    if decay is not None:
+        prepared.decay = decay
+        sampler._decay_stored.reload()
+        sampler._decay_t0 = t0
+        sampler._decay_draws = draws
+
+    if last_called is not None:
+        prepared.last = last_called
+        sampler._last_called.reload()
+        sampler._lru_heap = sampler._lru_source = None
+
+    sampler._remaining_pool = pool
+    sampler._shuffle_done_once = bool(flags & _FLAG_SHUFFLE_ONCE)
+    sampler._pre_draw_done_once = bool(flags & _FLAG_PRE_DRAW_ONCE)
+
+
+def load_snapshot(sampler, prepared):
+    """读取并恢复该名单的快照，成功返回 True（无快照或快照无效时返回 False）"""
+    path = snapshot_path(prepared.fingerprint)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        rctlog.warning(f"[抽样快照] 读取失败: {e}")
+        return False
+    try:
+        decode_state(sampler, prepared, data)
+    except (ValueError, struct.error, IndexError) as e:
+        rctlog.warning(f"[抽样快照] 快照无效，已忽略: {e}")
+        return False
+    return True
+
+
+def _write_file(path, data):
+    """先写临时文件再原子替换，避免中途退出留下半个快照"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SnapshotWriter:
+    """后台快照写入器 — 调用方只提交改动（StateDelta），合并与编码、文件写入都在后台线程完成
+
+    每个路径在后台线程保留一份完整状态，同一路径的多次提交按顺序合并后只写最新的一份；
+    没有待写数据时线程自行退出，下次提交时再按需启动。线程为非守护线程，程序退出前会写完最后一份快照。
+    """
+
+    def __init__(self):
+        self._pending = {}      # 路径 → 待合并的 StateDelta 列表
+        self._sources = {}      # 路径 → 最近一次提交来自的名单对象（id）
+        self._states = {}       # 路径 → 合并后的完整状态（仅后台线程访问）
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def source(self, path):
+        """该路径最近一次提交来自的名单对象 id（未提交过时为 None）"""
+        with self._lock:
+            return self._sources.get(path)
+
+    def submit(self, path, delta):
+        with self._lock:
+            if delta.uids is None:
+                self._pending[path] = [delta]
+            else:
+                self._pending.setdefault(path, []).append(delta)
+            self._sources[path] = delta.source
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rct-snapshot")
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                path, deltas = self._pending.popitem()
+            state = self._states.get(path)
+            for delta in deltas:
+                state = _apply(state, delta)
+            self._states[path] = state
+            try:
+                _write_file(path, _join(state))
+            except OSError as e:
+                rctlog.warning(f"[抽样快照] 写入失败: {e}")
+
+    def flush(self):
+        """等待所有待写快照落盘"""
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return
+            thread.join()
+
+
+_writer = SnapshotWriter()
+
+
+def save_snapshot(sampler, prepared):
+    """采集改动并交给后台线程合并、编码与写入（调用线程只做 O(改动数) 的工作）"""
+    path = snapshot_path(prepared.fingerprint)
+    if _writer.source(path) != id(prepared):
+        # 该路径上一次提交来自其他名单对象（或尚未提交）：后台没有可合并的基础，整体提交
+        prepared.dirty = None
+    _writer.submit(path, capture_state(sampler, prepared))
+
+
+def flush_snapshots():
+    """等待后台写入完成"""
+    _writer.flush()
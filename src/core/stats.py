@@ -0,0 +1,225 @@
+"""
+抽取统计 — 随每次抽取增量维护的计数分布与公平性指标，查询 O(1)
+"""
+import math
+from core.algos import FenwickTree
+
+
+class SelectionStats:
+    """被抽中次数分布的增量统计
+
+    - 次数桶：次数 → 样本集合，配合最大/最小次数，O(1) 给出最多/最少被抽中者
+    - Σc、Σc²：均值、方差与均匀分布卡方统计量（期望次数 = Σc / N）
+    - D = Σ_{i<j}|c_i − c_j|：基尼系数 G = D / (N·Σc)；
+      某样本次数 c → c+1 时 D 的变化只取决于次数 ≤ c 的样本数，
+      由按次数值索引的树状数组给出（O(log 最大次数)）
+
+    N 为样本总体的去重数量（未被抽中过的样本次数为 0，同样计入各项指标）。
+    键可以是样本本身，也可以是名单 id（此时由 labels[id] 给出最多/最少被抽中者的名字）。
+    """
+
+    def __init__(self):
+        self.labels = None
+        self.reset()
+
+    def reset(self):
+        self.population_size = 0
+        self._seen = 0              # 被抽中过的样本数
+        self._sum = 0               # Σc
+        self._sum_sq = 0            # Σc²
+        self._diff = 0              # 已抽中样本间的 Σ|c_i − c_j|
+        self._buckets = {}          # 次数 → 样本集合（仅 ≥1）
+        self._max = 0
+        self._min = 0
+        self._by_count = FenwickTree([0.0] * 16)    # 次数值 → 该次数的样本数
+
+    def set_population_size(self, n):
+        """设置样本总体大小（不少于已被抽中过的样本数）"""
+        self.population_size = n
+
+    def _grow(self, count):
+        """次数超出树状数组容量时按倍数扩容（均摊 O(1)）"""
+        ft = self._by_count
+        if count < ft.n:
+            return
+        size = ft.n
+        while size <= count:
+            size *= 2
+        self._by_count = FenwickTree(ft.weights + [0.0] * (size - ft.n))
+
+    def add(self, item, old_count):
+        """样本 item 的被抽中次数由 old_count 增加 1"""
+        c = old_count
+        buckets = self._buckets
+        ft = self._by_count
+        if c:
+            # 其余已抽中样本中次数 ≤ c 的每个 +1，≥ c+1 的每个 −1
+            le = int(ft.prefix(c + 1))
+            self._diff += 2 * le - self._seen - 1
+            bucket = buckets[c]
+            bucket.discard(item)
+            if not bucket:
+                del buckets[c]
+                if self._min == c:
+                    self._min = c + 1
+            ft.add(c, -1.0)
+        else:
+            # 新样本（次数 1）与每个已抽中样本的差为 c_y − 1
+            self._diff += self._sum - self._seen
+            self._seen += 1
+            self._min = 1
+        c += 1
+        bucket = buckets.get(c)
+        if bucket is None:
+            bucket = buckets[c] = set()
+        bucket.add(item)
+        if c > self._max:
+            self._max = c
+        self._grow(c)
+        self._by_count.add(c, 1.0)
+        self._sum += 1
+        self._sum_sq += 2 * c - 1
+
+    def add_many(self, keys, old_counts):
+        """一次抽取中多个样本各 +1（按原次数分组批量更新，结果与逐个 add 相同）
+
+        同一键可出现多次（名单含重名时），其原次数依次为 c, c+1, …，按原次数升序处理即可。
+        """
+        groups = {}
+        for key, c in zip(keys, old_counts):
+            group = groups.get(c)
+            if group is None:
+                groups[c] = [key]
+            else:
+                group.append(key)
+        for c in sorted(groups):
+            self._add_group(groups[c], c)
+
+    def _add_group(self, keys, c):
+        """原次数同为 c 的 m 个不同样本各 +1"""
+        m = len(keys)
+        buckets = self._buckets
+        ft = self._by_count
+        if c:
+            # 第 j 个样本移动时次数 ≤ c 的样本比第一个少 j 个，逐个 add 的增量之和为闭式
+            le = int(ft.prefix(c + 1))
+            self._diff += m * (2 * le - self._seen - 1) - m * (m - 1)
+            bucket = buckets[c]
+            bucket.difference_update(keys)
+            if not bucket:
+                del buckets[c]
+                if self._min == c:
+                    self._min = c + 1
+            ft.add(c, -float(m))
+        else:
+            self._diff += m * (self._sum - self._seen)
+            self._seen += m
+            self._min = 1
+        c += 1
+        bucket = buckets.get(c)
+        if bucket is None:
+            bucket = buckets[c] = set()
+        bucket.update(keys)
+        if c > self._max:
+            self._max = c
+        self._grow(c)
+        self._by_count.add(c, float(m))
+        self._sum += m
+        self._sum_sq += m * (2 * c - 1)
+
+    def rebuild(self, counts, labels=None):
+        """由完整的次数字典重建（会话恢复、切换总体时使用，O(n log n)）；labels 见类说明"""
+        population_size = self.population_size
+        self.reset()
+        self.population_size = population_size
+        self.labels = labels
+        ordered = sorted(((c, item) for item, c in counts.items() if c > 0),
+                         key=lambda x: x[0])
+        m = len(ordered)
+        if not m:
+            return
+        buckets = self._buckets
+        freq = [0.0] * (ordered[-1][0] + 1)
+        diff = 0
+        for i, (c, item) in enumerate(ordered):
+            buckets.setdefault(c, set()).add(item)
+            freq[c] += 1.0
+            diff += c * (2 * i - m + 1)
+            self._sum += c
+            self._sum_sq += c * c
+        self._seen = m
+        self._diff = diff
+        self._min = ordered[0][0]
+        self._max = ordered[-1][0]
+        self._by_count = FenwickTree(freq + [0.0] * len(freq))
+
+    @property
+    def size(self):
+        return max(self.population_size, self._seen)
+
+    def _label(self, key):
+        return key if self.labels is None else self.labels[key]
+
+    def most_selected(self):
+        if not self._max:
+            return None
+        return self._label(next(iter(self._buckets[self._max]))), self._max
+
+    def least_selected(self):
+        if not self._min:
+            return None
+        return self._label(next(iter(self._buckets[self._min]))), self._min
+
+    def variance(self):
+        """各样本被抽中次数的总体方差"""
+        n = self.size
+        if not n:
+            return 0.0
+        mean = self._sum / n
+        return max(0.0, self._sum_sq / n - mean * mean)
+
+    def gini(self):
+        """基尼系数（0 = 完全均匀，趋近 1 = 集中在少数样本）"""
+        n = self.size
+        if not n or not self._sum:
+            return 0.0
+        zeros = n - self._seen
+        return (self._diff + zeros * self._sum) / (n * self._sum)
+
+    def chi_square(self):
+        """对等概率期望次数的卡方统计量，返回 (χ², 自由度, p 值)"""
+        n = self.size
+        s = self._sum
+        if n < 2 or not s:
+            return 0.0, max(0, n - 1), 1.0
+        chi2 = n * self._sum_sq / s - s
+        dof = n - 1
+        return chi2, dof, _chi2_sf(chi2, dof)
+
+    def summary(self):
+        """全部指标（O(1)）"""
+        n = self.size
+        chi2, dof, p = self.chi_square()
+        var = self.variance()
+        return {
+            "population_size": n,
+            "picked_total": self._sum,
+            "mean": self._sum / n if n else 0.0,
+            "variance": var,
+            "stddev": math.sqrt(var),
+            "gini": self.gini(),
+            "chi_square": chi2,
+            "dof": dof,
+            "p_value": p,
+            "most_selected": self.most_selected(),
+            "least_selected": self.least_selected(),
+        }
+
+
+def _chi2_sf(x, k):
+    """卡方分布上尾概率（Wilson–Hilferty 正态近似，k 较大时误差很小）"""
+    if x <= 0:
+        return 1.0
+    t = 2.0 / (9.0 * k)
+    z = ((x / k) ** (1.0 / 3.0) - (1.0 - t)) / math.sqrt(t)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
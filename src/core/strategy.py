@@ -0,0 +1,276 @@
+"""
+高级抽样策略 — 将 advanced_config 编译为不可变的预绑定阶段流水线
+
+配置只在变化时编译一次：取值的读取、截断与各开关的判断都在编译期完成，
+每次抽取只需依次调用预处理阶段，再调用终结阶段：
+
+    population = stage(sampler, population, k)   # 打乱、预抽取平衡 ...
+    return terminal(sampler, population, k)      # 不放回、随机定权重、递进式、多次取最值、加权、纯随机
+
+终结阶段返回抽中的位置列表；改变样本顺序的预处理阶段返回 ReorderedPopulation，
+其 perm 记录新位置 → 原位置，策略据此把位置换算回调用方的总体。
+
+新增阶段只需编写构建函数并 register_stage，无需改动抽取热路径。
+构建函数接收配置字典，返回阶段对象（可调用）或 None（该阶段未启用）。
+"""
+from core import npbackend
+from core.algos import multi_draw_best_indices
+
+
+# ── 预处理阶段 ────────────────────────────────────────────
+
+class ReorderedPopulation(list):
+    """重新排列后的样本列表，perm[i] 为第 i 个样本在原总体中的位置"""
+
+    __slots__ = ("perm",)
+
+    def __init__(self, population, perm):
+        super().__init__(population[i] for i in perm)
+        self.perm = perm
+
+    def original_positions(self, idx):
+        perm = self.perm
+        return [perm[i] for i in idx]
+
+
+class ShuffleStage:
+    """抽取前打乱（每次 / 仅启动时一次）"""
+
+    __slots__ = ("count", "once")
+
+    def __init__(self, count, once):
+        self.count = count
+        self.once = once
+
+    def __call__(self, sampler, population, k):
+        if self.once:
+            if sampler._shuffle_done_once:
+                return population
+            sampler._shuffle_done_once = True
+        # 打乱位置而非样本（随机数消耗相同），以便把抽中位置换算回原总体；不修改调用方的总体
+        perm = list(range(len(population)))
+        shuffle = sampler.rng.shuffle
+        for _ in range(self.count):
+            shuffle(perm)
+        return ReorderedPopulation(population, perm)
+
+
+class PreDrawStage:
+    """预抽取平衡：后台静默预抽取，只推进随机流，不生成并丢弃抽样结果"""
+
+    __slots__ = ("count", "once")
+
+    def __init__(self, count, once):
+        self.count = count
+        self.once = once
+
+    def __call__(self, sampler, population, k):
+        if self.once:
+            if sampler._pre_draw_done_once:
+                return population
+            sampler._pre_draw_done_once = True
+        sampler._advance_rng(self.count * min(k, len(population)))
+        return population
+
+
+# ── 终结阶段 ──────────────────────────────────────────────
+
+class NoReplaceStage:
+    """不放回式抽取（调整方法与比率已在编译期确定）"""
+
+    __slots__ = ("method", "ratio")
+
+    def __init__(self, method, ratio):
+        self.method = method
+        self.ratio = ratio
+
+    def __call__(self, sampler, population, k):
+        return sampler._advanced_no_replace(population, k, self.method, self.ratio)
+
+
+class RandomWeightsStage:
+    """随机定权重：每次为每个样本生成 [low, high) 均匀分布的临时权重"""
+
+    __slots__ = ("low", "high")
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __call__(self, sampler, population, k):
+        gen = sampler._numpy_for(len(population))
+        if gen is not None:
+            weights = npbackend.uniform_weights(len(population), self.low, self.high, gen)
+            return sampler._weighted_select(population, k, weights)
+        uniform = sampler.rng.uniform
+        low, high = self.low, self.high
+        temp_weights = {item: uniform(low, high) for item in population}
+        return sampler._weighted_select(
+            population, k, [temp_weights.get(item, 1.0) for item in population]
+        )
+
+
+def _progressive(sampler, population, k):
+    """递进式抽取"""
+    return sampler._progressive_draw(population, k)
+
+
+class MultiDrawBestStage:
+    """多次取最值：后台抽取 count 次，取被抽中次数最多的 k 个（按闭式解直接抽取，不逐轮模拟）"""
+
+    __slots__ = ("count",)
+
+    def __init__(self, count):
+        self.count = count
+
+    def __call__(self, sampler, population, k):
+        # 有排除名单时只在未被排除的位置上抽取
+        blocked = sampler._blocked_for(population)
+        avail = None if blocked is None else sampler._unblocked_positions(population, blocked)
+        n = len(population) if avail is None else len(avail)
+        if not n:
+            return []
+        k = min(k, n)
+        mc = max(2, min(n, self.count))
+        gen = sampler._numpy_for(n)
+        if gen is not None:
+            sampler._backend = "numpy_multi_draw"
+            idx = npbackend.multi_draw_best_indices(n, k, mc, gen)
+        else:
+            sampler._backend = "multi_draw"
+            idx = multi_draw_best_indices(n, k, mc, sampler.rng)
+        if avail is not None:
+            return [avail[i] for i in idx]
+        return idx
+
+
+class WeightedStage:
+    """加权模式（自定义权重 / 智能降权）
+
+    是否使用自定义权重同时取决于 advanced_config["custom_weights"]（编译期确定）
+    与抽样器的 use_fixed_weights、权重字典（运行期状态，每次抽取检查）。
+    """
+
+    __slots__ = ("custom", "smart_reduce")
+
+    def __init__(self, custom, smart_reduce):
+        self.custom = custom
+        self.smart_reduce = smart_reduce
+
+    def __call__(self, sampler, population, k):
+        use_custom = self.custom or sampler.use_fixed_weights
+        if use_custom and sampler.has_custom_weights():
+            return sampler._fixed_weighted_select(population, k)
+        if self.smart_reduce:
+            return sampler._select_by_weights(population, k, smart=True, fixed=False)
+        return sampler._basic_sample(population, k)
+
+
+# ── 构建函数 ──────────────────────────────────────────────
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def build_no_replace(cfg):
+    if cfg["with_replacement"]:
+        return None
+    ratio = _clamp(cfg.get("no_replace_ratio", 0.5), 0.10, 0.50)
+    return NoReplaceStage(cfg.get("no_replace_method", 0), ratio)
+
+
+def build_random_weights(cfg):
+    if not cfg["random_weights"]:
+        return None
+    return RandomWeightsStage(cfg.get("random_weight_min", 0.10), cfg.get("random_weight_max", 2.00))
+
+
+def build_progressive(cfg):
+    return _progressive if cfg["progressive_draw"] else None
+
+
+def build_shuffle(cfg):
+    if not cfg["shuffle_before"]:
+        return None
+    freq = cfg.get("shuffle_frequency", "each")
+    if freq not in ("each", "once"):
+        return None
+    return ShuffleStage(_clamp(cfg.get("shuffle_count", 1), 1, 10), freq == "once")
+
+
+def build_pre_draw(cfg):
+    if not cfg["pre_draw_balance"]:
+        return None
+    freq = cfg.get("pre_draw_frequency", "each")
+    if freq not in ("each", "once"):
+        return None
+    return PreDrawStage(_clamp(cfg.get("pre_draw_count", 1), 1, 10), freq == "once")
+
+
+def build_multi_draw_best(cfg):
+    if not cfg["multi_draw_best"]:
+        return None
+    return MultiDrawBestStage(cfg.get("multi_draw_count", 3))
+
+
+def build_weighted(cfg):
+    return WeightedStage(bool(cfg.get("custom_weights")), bool(cfg.get("smart_reduce_weight", True)))
+
+
+# 终结阶段按顺序匹配，第一个启用者生效；以下三者先于预处理阶段判断（与原 if 链顺序一致）
+PRE_EMPTIVE_TERMINALS = [build_no_replace, build_random_weights, build_progressive]
+# 预处理阶段按顺序执行
+STAGES = [build_shuffle, build_pre_draw]
+# 预处理之后的终结阶段（build_weighted 总是启用，作为兜底）
+TERMINALS = [build_multi_draw_best, build_weighted]
+
+
+def register_stage(builder, terminal=False, index=None):
+    """注册新阶段的构建函数
+
+    terminal=True 时加入预处理之后的终结阶段候选，默认位于兜底的加权阶段之前；
+    已编译的策略不受影响，抽样器下次编译时生效。
+    """
+    if terminal:
+        TERMINALS.insert(len(TERMINALS) - 1 if index is None else index, builder)
+    else:
+        STAGES.insert(len(STAGES) if index is None else index, builder)
+
+
+class DrawStrategy:
+    """编译后的抽取策略（不可变）— stages 依次执行，terminal 给出结果"""
+
+    __slots__ = ("stages", "terminal")
+
+    def __init__(self, stages, terminal):
+        object.__setattr__(self, "stages", tuple(stages))
+        object.__setattr__(self, "terminal", terminal)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DrawStrategy 不可修改")
+
+    def __call__(self, sampler, population, k):
+        reordered = []
+        for stage in self.stages:
+            result = stage(sampler, population, k)
+            if result is not population and isinstance(result, ReorderedPopulation):
+                reordered.append(result)
+            population = result
+        idx = self.terminal(sampler, population, k)
+        for pop in reversed(reordered):
+            idx = pop.original_positions(idx)
+        return idx
+
+
+def compile_strategy(cfg):
+    """将高级配置编译为 DrawStrategy"""
+    for build in PRE_EMPTIVE_TERMINALS:
+        terminal = build(cfg)
+        if terminal is not None:
+            return DrawStrategy((), terminal)
+    stages = [stage for stage in (build(cfg) for build in STAGES) if stage is not None]
+    for build in TERMINALS:
+        terminal = build(cfg)
+        if terminal is not None:
+            return DrawStrategy(stages, terminal)
+    raise ValueError("没有可用的终结阶段")
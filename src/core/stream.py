@@ -0,0 +1,293 @@
+"""
+流式抽取 — 单遍扫描文件或管道，用蓄水池抽样直接得到 k 个名字，不读入、不索引整个名单
+
+    等概率：Algorithm L（Li, 1994），按几何分布跳过不会被替换的名字，随机数消耗 O(k·log(n/k))
+    带权重：A-ExpJ（Efraimidis–Spirakis 指数跳跃），权重列存在时使用
+
+名字的解码与切分规则与读入列表一致（roster.split_line）：逐行去除首尾空白、跳过空行，
+行内按 , ; 制表符中第一个出现的拆分；非 UTF-8 文件按 GBK 逐行读取、不再拆分。文件的编码先用
+roster.detect_encoding 增量校验；标准输入无法回看，从第一行无法按 UTF-8 解码的行起改为 GBK。
+.rcp 流先按块 Base64 解码。内存只与 k 有关，因此不做重名合并（重复的名字按不同条目计）。
+
+命令行（无界面）：python rctool.py draw <文件|-> -k 5 [--weight-column N] [--seed S]
+"""
+import sys
+import math
+import heapq
+import argparse
+import binascii
+from core.rng import create_rng
+from core.roster import detect_encoding, split_line
+
+# 带权重时自动识别权重列所检查的行数
+WEIGHT_SNIFF_LINES = 20
+
+_B64_DROP = bytes(range(256)).translate(
+    None, b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+
+
+class StreamResult:
+    """流式抽取结果"""
+
+    __slots__ = ("names", "total", "weighted", "encoding")
+
+    def __init__(self, names, total, weighted, encoding):
+        self.names = names          # 抽中的名字（按抽中顺序）
+        self.total = total          # 流中的名字（条目）总数
+        self.weighted = weighted    # 是否按权重列抽取
+        self.encoding = encoding    # 最终使用的编码（"utf-8" / "gbk"）
+
+
+def _rcp_lines(raw):
+    """Base64 编码的字节流 → 解码后的字节行"""
+    rest = b""
+    pending = b""
+    while True:
+        chunk = raw.read(1 << 16)
+        if not chunk:
+            break
+        data = rest + chunk.translate(None, _B64_DROP)
+        cut = len(data) - len(data) % 4
+        rest = data[cut:]
+        lines = (pending + binascii.a2b_base64(data[:cut])).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if rest.strip(b"="):
+        pending += binascii.a2b_base64(rest + b"=" * (-len(rest) % 4))
+    if pending:
+        yield pending
+
+
+class LineDecoder:
+    """逐行解码：UTF-8 行按分隔符拆分；首次解码失败后改为 GBK、不拆分（与整体读入的回退一致）"""
+
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+
+    def decode(self, raw):
+        if self.encoding == "utf-8":
+            try:
+                return raw.decode("utf-8")
+            except UnicodeDecodeError:
+                self.encoding = "gbk"
+        return raw.decode("gbk", "replace")
+
+
+def iter_lines(raw, rcp=False, decoder=None):
+    """字节流 → (去除首尾空白的文本行, 是否按分隔符拆分)"""
+    decoder = decoder or LineDecoder()
+    lines = _rcp_lines(raw) if rcp else raw
+    for line in lines:
+        text = decoder.decode(line).strip()
+        if text:
+            yield text, decoder.encoding == "utf-8"
+
+
+def iter_names(lines):
+    """iter_lines 的结果 → 逐个名字"""
+    for line, split in lines:
+        if split:
+            yield from split_line(line)[0]
+        else:
+            yield line
+
+
+def _parse_weight(text):
+    try:
+        w = float(text)
+    except ValueError:
+        return None
+    return w if math.isfinite(w) else None
+
+
+def detect_weight_column(lines):
+    """前若干行字段数相同（≥2）且末列均为数字时，返回末列下标，否则返回 None"""
+    width = None
+    for line in lines:
+        fields, sep = split_line(line)
+        if sep is None or len(fields) < 2 or (width is not None and len(fields) != width):
+            return None
+        if _parse_weight(fields[-1]) is None:
+            return None
+        width = len(fields)
+    return None if width is None else width - 1
+
+
+def iter_weighted(lines, column):
+    """文本行 → (名字, 权重)；名字为权重列以外的字段（以原分隔符连接），权重无效的行跳过"""
+    for line, split in lines:
+        fields, sep = split_line(line) if split else ([line], None)
+        if sep is None or len(fields) <= column:
+            continue
+        w = _parse_weight(fields[column])
+        if w is None:
+            continue
+        name = sep.join(fields[:column] + fields[column + 1:])
+        if name:
+            yield name, w
+
+
+def reservoir_sample(items, k, rng):
+    """Algorithm L：从可迭代对象中等概率抽取 k 个，返回 (随机顺序的结果, 总数)"""
+    if k <= 0:
+        return [], sum(1 for _ in items)
+    random = rng.random
+    log = math.log
+    reservoir = []
+    it = iter(items)
+    for item in it:
+        reservoir.append(item)
+        if len(reservoir) == k:
+            break
+    n = len(reservoir)
+    if n == k:
+        w = math.exp(log(1.0 - random()) / k)
+        skip = math.floor(log(1.0 - random()) / math.log1p(-w)) if w < 1.0 else 0
+        for item in it:
+            n += 1
+            if skip:
+                skip -= 1
+                continue
+            reservoir[rng.randrange(k)] = item
+            w *= math.exp(log(1.0 - random()) / k)
+            skip = math.floor(log(1.0 - random()) / math.log1p(-w)) if w < 1.0 else 0
+    rng.shuffle(reservoir)
+    return reservoir, n
+
+
+def weighted_reservoir_sample(pairs, k, rng):
+    """A-ExpJ：从 (条目, 权重) 流中带权无放回抽取 k 个，返回 (按抽中顺序的结果, 总数)
+
+    键值取对数空间 log(u)/w；蓄水池为按键值的最小堆，跳过的累计权重服从指数分布，
+    只有被选入的条目才消耗随机数。权重 ≤ 0 的条目不会被抽中。
+    """
+    random = rng.random
+    log = math.log
+    heap = []
+    n = 0
+    it = iter(pairs)
+    if k > 0:
+        for item, w in it:
+            n += 1
+            if w > 0:
+                heapq.heappush(heap, (log(1.0 - random()) / w, n, item))
+                if len(heap) == k:
+                    break
+    if len(heap) == k:
+        threshold = log(1.0 - random()) / heap[0][0]
+        acc = 0.0
+        for item, w in it:
+            n += 1
+            if w <= 0:
+                continue
+            acc += w
+            if acc < threshold:
+                continue
+            # 新键值在 (T, 0] 区间内按条件分布生成：u ∈ (exp(T·w), 1)
+            t = math.exp(heap[0][0] * w)
+            u = t + (1.0 - t) * random()
+            key = log(u) / w if u > 0 else heap[0][0]
+            heapq.heapreplace(heap, (key, n, item))
+            threshold = log(1.0 - random()) / heap[0][0]
+            acc = 0.0
+    else:
+        n += sum(1 for _ in it)
+    heap.sort(reverse=True)
+    return [item for _, _, item in heap], n
+
+
+def stream_draw(raw, k, rng=None, rcp=False, weight_column="auto", encoding="utf-8"):
+    """单遍流式抽取
+
+    Args:
+        raw: 二进制可读流（文件或 sys.stdin.buffer）
+        k: 抽取数量
+        rng: 随机源（默认新建系统熵 MT）
+        rcp: 是否为 Base64 编码的 .rcp 流
+        weight_column: 权重列下标（0 起）；"auto" 时根据前 WEIGHT_SNIFF_LINES 行自动识别，None 为不使用权重
+        encoding: 起始编码（已知为 GBK 的文件传入 "gbk"）
+    """
+    rng = rng or create_rng()
+    decoder = LineDecoder(encoding)
+    lines = iter_lines(raw, rcp, decoder)
+    head = []
+    if weight_column == "auto":
+        head, weight_column = _sniff(lines)
+
+    def all_lines():
+        yield from head
+        yield from lines
+
+    if weight_column is not None:
+        names, total = weighted_reservoir_sample(iter_weighted(all_lines(), weight_column), k, rng)
+    else:
+        names, total = reservoir_sample(iter_names(all_lines()), k, rng)
+    return StreamResult(names, total, weight_column is not None, decoder.encoding)
+
+
+def _sniff(lines):
+    """读取前 WEIGHT_SNIFF_LINES 行识别权重列，返回 (已读取的行, 权重列或 None)"""
+    head = []
+    for line, split in lines:
+        head.append((line, split))
+        if len(head) >= WEIGHT_SNIFF_LINES:
+            break
+    column = detect_weight_column([line for line, split in head if split])
+    if column is not None and not all(split for _, split in head):
+        column = None
+    return head, column
+
+
+def sniff_weight_column(path, rcp=None):
+    """只读取文件开头，返回自动识别出的权重列下标（0 起），未识别出时返回 None"""
+    if rcp is None:
+        rcp = path.endswith(".rcp")
+    encoding = "utf-8" if rcp else detect_encoding(path)
+    with open(path, "rb") as f:
+        return _sniff(iter_lines(f, rcp, LineDecoder(encoding)))[1]
+
+
+def stream_draw_file(path, k, rng=None, weight_column="auto", rcp=None):
+    """对文件做流式抽取（rcp 为 None 时按扩展名判断是否为 .rcp）"""
+    if rcp is None:
+        rcp = path.endswith(".rcp")
+    encoding = "utf-8" if rcp else detect_encoding(path)
+    with open(path, "rb") as f:
+        return stream_draw(f, k, rng, rcp=rcp, weight_column=weight_column, encoding=encoding)
+
+
+def main(argv=None):
+    """无界面命令行：流式抽取并逐行输出结果，返回退出码"""
+    parser = argparse.ArgumentParser(prog="rctool.py draw", description="从文件或标准输入流式抽取名字（不加载整个名单）")
+    parser.add_argument("source", help="名单文件（.txt/.csv/.rcp），- 表示标准输入")
+    parser.add_argument("-k", "--count", type=int, default=1, help="抽取数量")
+    parser.add_argument("--weight-column", type=int, default=None,
+                        help="权重列（1 起）；0 表示不使用权重，默认自动识别")
+    parser.add_argument("--rcp", action="store_true", help="输入为 Base64 编码的 .rcp 内容（标准输入时使用）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（用于复现）")
+    args = parser.parse_args(argv)
+
+    if args.count < 1:
+        parser.error("抽取数量不能小于1")
+    if args.weight_column is None:
+        column = "auto"
+    else:
+        column = args.weight_column - 1 if args.weight_column > 0 else None
+    rng = create_rng("mt", args.seed)
+
+    try:
+        if args.source == "-":
+            result = stream_draw(sys.stdin.buffer, args.count, rng, rcp=args.rcp, weight_column=column)
+        else:
+            result = stream_draw_file(args.source, args.count, rng, weight_column=column,
+                                      rcp=True if args.rcp else None)
+    except OSError as e:
+        print(f"读取失败: {e}", file=sys.stderr)
+        return 2
+
+    out = sys.stdout
+    for name in result.names:
+        out.write(f"{name}\n")
+    if len(result.names) < args.count:
+        print(f"名单只有 {len(result.names)} 个可抽取的名字（共 {result.total} 条）", file=sys.stderr)
+    return 0
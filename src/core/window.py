@@ -11,6 +11,13 @@ from core.config import ConfigManager
 from core.info import rct_rcplist_path, rct_version, document_path
 from core.fileman import SampleLibrary, SaveResult, base64decode
 from core.sampler import SmartSampler
+from core.population import PreparedPopulation, NumberPopulation, LabelPopulation
+from core.snapshot import load_snapshot, save_snapshot
+from core.roster import MappedRoster, open_roster, should_map, split_names
+from core.stream import sniff_weight_column, stream_draw_file
+from core.rng import create_rng
+from core.inclusion import sampler_inclusion
+from core.montecarlo import MonteCarloPreview
 from core.platutils import open_file_or_dir
 from core.dialog import AboutWindow, load_about_info
 from core.info import rct_icon_path
@@ -144,11 +151,12 @@ class ConfigWindow:
         tk.Label(f1, text="抽样模式：", width=15, anchor="w").pack(side="left")
         self.sampler_mode_var = tk.IntVar(
             value=self.config.get("sampler_mode", 1))
-        for i, name in enumerate(["基本抽样", "智能抽样", "高级抽样"]):
+        for i, name in enumerate(["基本抽样", "智能抽样", "高级抽样", "最久未抽优先"]):
             tk.Radiobutton(f1, text=name, variable=self.sampler_mode_var,
                            value=i).pack(side="left", padx=1)
 
-        tk.Label(tab, text="基本: 纯随机 | 智能: 避免连续抽中+可自定义权重 | 高级: 完整高级配置",
+        tk.Label(tab, text="基本: 纯随机 | 智能: 避免连续抽中+可自定义权重 | 高级: 完整高级配置"
+                           " | 最久未抽优先: 轮流点到每个人",
                  fg="gray", font=("", 9)).pack(anchor="w", **pad)
 
         # 智能模式：使用固定权重
@@ -157,6 +165,47 @@ class ConfigWindow:
         tk.Checkbutton(tab, text="智能模式使用固定权重（勾选后可自定义权重）",
                        variable=self.smart_fixed_weights_var).pack(anchor="w", **pad)
 
+        # 智能模式：记忆方式（窗口式 / 衰减式）
+        decay_row = tk.Frame(tab)
+        decay_row.pack(fill="x", **pad, pady=(4, 0))
+        tk.Label(decay_row, text="智能记忆方式：", width=15, anchor="w").pack(side="left")
+        self.smart_decay_var = tk.StringVar(value=self.config.get("smart_decay", "off"))
+        for val, name in [("off", "最近N次"), ("draw", "按次衰减"), ("minute", "按分钟衰减")]:
+            tk.Radiobutton(decay_row, text=name, variable=self.smart_decay_var,
+                           value=val).pack(side="left", padx=1)
+        factor_row = tk.Frame(tab)
+        factor_row.pack(fill="x", **pad)
+        tk.Label(factor_row, text="衰减保留比例：", width=15, anchor="w").pack(side="left")
+        self.smart_decay_factor_var = tk.StringVar(
+            value=str(self.config.get("smart_decay_factor", 0.5)))
+        tk.Spinbox(factor_row, textvariable=self.smart_decay_factor_var,
+                   from_=0.1, to=0.9, increment=0.1, format="%.1f",
+                   state="readonly", width=8).pack(side="left")
+        tk.Label(factor_row, text="每次/每分钟后罚分乘以该比例",
+                 fg="gray", font=("", 8)).pack(side="left", padx=5)
+
+        # 最久未抽优先：随机宽松度
+        lru_row = tk.Frame(tab)
+        lru_row.pack(fill="x", **pad)
+        tk.Label(lru_row, text="未抽优先宽松度：", width=15, anchor="w").pack(side="left")
+        self.lru_softness_var = tk.StringVar(value=str(self.config.get("lru_softness", 0.0)))
+        tk.Spinbox(lru_row, textvariable=self.lru_softness_var,
+                   from_=0.0, to=10.0, increment=0.5, format="%.1f",
+                   state="readonly", width=8).pack(side="left")
+        tk.Label(lru_row, text="0=严格按最久未抽，越大越随机（单位：次）",
+                 fg="gray", font=("", 8)).pack(side="left", padx=5)
+
+        # 随机源
+        rng_row = tk.Frame(tab)
+        rng_row.pack(fill="x", **pad, pady=(4, 0))
+        tk.Label(rng_row, text="随机源：", width=15, anchor="w").pack(side="left")
+        self.sampler_rng_var = tk.StringVar(value=self.config.get("sampler_rng", "mt"))
+        for kind, name in [("mt", "标准"), ("os", "加密安全（审计级）")]:
+            tk.Radiobutton(rng_row, text=name, variable=self.sampler_rng_var,
+                           value=kind).pack(side="left", padx=1)
+        tk.Label(tab, text="抽奖、考场分配等场合建议使用加密安全随机源（重启程序后生效）",
+                 fg="gray", font=("", 8)).pack(anchor="w", **pad)
+
         # ── 高级抽取入口 ──
         ttk.Separator(tab, orient="horizontal").pack(fill="x", padx=15, pady=8)
 
@@ -191,7 +240,7 @@ class ConfigWindow:
 
         self._default_vars = {}
         default_items = [
-            ("抽组默认总数：", "rct_group_total", 9, 1, 26),
+            ("抽组默认总数：", "rct_group_total", 9, 1, RandomCallTab.GROUP_TOTAL_MAX),
             ("默认选取数量：", "rct_choice_default", 3, 1, 50),
         ]
         for label, key, default, mn, mx in default_items:
@@ -229,10 +278,10 @@ class ConfigWindow:
             ("adv_smart_memory_count", "smart_memory_count"),
             ("adv_custom_weights", "custom_weights"),
         ]
-        for cfg_key, adv_key in adv_keys:
-            sampler.advanced_config[adv_key] = self.config.get(
-                cfg_key, sampler.advanced_config[adv_key]
-            )
+        sampler.apply_advanced_config({
+            adv_key: self.config.get(cfg_key, sampler.advanced_config[adv_key])
+            for cfg_key, adv_key in adv_keys
+        })
         AdvancedConfigWindow(self.window, sampler)
         rctlog.info("从配置窗口打开高级抽取配置")
 
@@ -484,6 +533,10 @@ class ConfigWindow:
             "max_history_items": int(self.history_var.get()),
             "sampler_mode": self.sampler_mode_var.get(),
             "smart_use_fixed_weights": self.smart_fixed_weights_var.get(),
+            "sampler_rng": self.sampler_rng_var.get(),
+            "smart_decay": self.smart_decay_var.get(),
+            "smart_decay_factor": float(self.smart_decay_factor_var.get()),
+            "lru_softness": float(self.lru_softness_var.get()),
             "rct_default_sample": self.sample_combo.get(),
             "update_source": self.update_source_var.get(),
             "auto_check_update": self.auto_check_var.get(),
@@ -707,6 +760,16 @@ class HomeTab(BaseTab):
 class RandomCallTab(BaseTab):
     """整合的随机抽取选项卡 — 支持随机抽人/随机抽组切换"""
 
+    # 抽组总数上限（编号/字母总体为虚拟序列，规模不占内存）
+    GROUP_TOTAL_MAX = 1000000
+    # 抽取数量下拉框的最大选项数（超大名单/组数时不生成百万项的下拉列表）
+    CHOICE_MAX = 1000
+    # 排除名单窗口中最多列出的名字数（超出时请先输入关键字筛选）
+    EXCLUDE_LIST_MAX = 5000
+    # 权重窗口每页的样本数，以及计算抽中概率（需生成全部样本的权重向量）的样本数上限
+    WEIGHT_PAGE_SIZE = 200
+    WEIGHT_PROB_MAX = 10000
+
     def __init__(self, parent):
         super().__init__(parent, "随机抽取")
         config = ConfigManager()
@@ -717,6 +780,26 @@ class RandomCallTab(BaseTab):
         smart_window = config.get("smart_window", 3)
         self.sampler = SmartSampler(mode=sampler_mode, smart_window=smart_window)
 
+        # 随机源（可播种，便于复现抽取结果）
+        try:
+            self.sampler.set_rng(config.get("sampler_rng", "mt"), config.get("sampler_seed"))
+        except (ValueError, RuntimeError) as e:
+            rctlog.warning(f"随机源配置无效，使用默认 Mersenne Twister: {e}")
+        # 未播种时读入后端代价系数，缺失则在后台线程标定（首次抽取不等待）
+        if not self.sampler.rng.seeded:
+            self.sampler.dispatcher.prepare(self.sampler.rng.kind)
+
+        # 智能模式记忆方式（窗口式 / 按次衰减 / 按分钟衰减）
+        decay = config.get("smart_decay", "off")
+        try:
+            self.sampler.set_decay(None if decay == "off" else decay,
+                                   config.get("smart_decay_factor", 0.5))
+        except ValueError as e:
+            rctlog.warning(f"智能衰减配置无效，使用窗口式: {e}")
+
+        # 最久未抽优先模式的随机宽松度
+        self.sampler.lru_softness = max(0.0, float(config.get("lru_softness", 0.0)))
+
         # 加载智能模式固定权重设置
         self.sampler.use_fixed_weights = config.get("smart_use_fixed_weights", False)
 
@@ -741,13 +824,15 @@ class RandomCallTab(BaseTab):
             ("adv_smart_memory_count", "smart_memory_count"),
             ("adv_custom_weights", "custom_weights"),
         ]
-        for cfg_key, adv_key in adv_keys:
-            self.sampler.advanced_config[adv_key] = config.get(
-                cfg_key, self.sampler.advanced_config[adv_key]
-            )
+        # 一次性写入并编译为抽取策略（之后仅在配置变化时重新编译）
+        self.sampler.apply_advanced_config({
+            adv_key: config.get(cfg_key, self.sampler.advanced_config[adv_key])
+            for cfg_key, adv_key in adv_keys
+        })
 
         # 抽人状态
         self.names = []
+        self.population = None  # 名单加载时构建的 PreparedPopulation（超大名单为 MappedRoster）
         self.current_file = None
         self.auto_file = ""
 
@@ -821,16 +906,19 @@ class RandomCallTab(BaseTab):
 
         config = ConfigManager()
         rcg_total = config.get("rct_group_total", 9)
-        rcg_total = rcg_total if 0 < rcg_total <= 26 else 9
+        rcg_total = rcg_total if 0 < rcg_total <= self.GROUP_TOTAL_MAX else 9
 
         row = tk.Frame(self.group_frame)
         row.pack(pady=5)
         tk.Label(row, text="样本总数：", width=10).pack(side="left")
-        self.total_entry = ttk.Combobox(row, values=list(range(1, 27)), width=5, state="readonly")
+        # 常用总数可从下拉框选择，更大的总数（如全校抽奖券编号）可直接输入
+        self.total_entry = ttk.Combobox(row, values=list(range(1, 27)), width=8)
         self.total_entry.pack(side="left")
         self.total_entry.set(str(rcg_total))
 
         self.total_entry.bind("<<ComboboxSelected>>", self._on_total_change)
+        self.total_entry.bind("<Return>", self._on_total_change)
+        self.total_entry.bind("<FocusOut>", self._on_total_change)
 
         # ----- 右侧历史记录 -----
         self._create_history_area(main_frame)
@@ -852,7 +940,7 @@ class RandomCallTab(BaseTab):
         self.sampler_mode_var = tk.IntVar(value=config.get("sampler_mode", 0))
         self.sampler_mode_combo = ttk.Combobox(
             inner_top,
-            values=["基本抽样", "智能抽样", "高级抽样"],
+            values=list(SmartSampler.MODE_NAMES.values()),
             state="readonly", width=12,
         )
         self.sampler_mode_combo.pack(side="left", padx=5)
@@ -861,7 +949,7 @@ class RandomCallTab(BaseTab):
 
         # 根据当前模式初始化按钮文字/状态
         init_mode = self.sampler_mode_var.get()
-        if init_mode == SmartSampler.MODE_BASIC:
+        if init_mode in (SmartSampler.MODE_BASIC, SmartSampler.MODE_LRU):
             btn_text, btn_state = "权重", "disabled"
         elif init_mode == SmartSampler.MODE_SMART:
             btn_text, btn_state = "权重", "normal"
@@ -888,8 +976,16 @@ class RandomCallTab(BaseTab):
         inner_btns.grid_columnconfigure(0, weight=1)
         inner_btns.grid_columnconfigure(1, weight=1)
 
+        # ----- 抽样统计（每次抽取后刷新，指标均为增量维护，刷新 O(1)）-----
+        self.stats_frame = tk.LabelFrame(self.control_frame, text="抽样统计")
+        self.stats_label = tk.Label(
+            self.stats_frame, text="", fg="gray", font=("", 8), justify="left", anchor="w",
+        )
+        self.stats_label.pack(fill="x", padx=8, pady=(2, 4))
+
         # 初始模式
         self._switch_mode()
+        self._refresh_stats_panel()
 
     def _create_history_area(self, parent):
         """创建右侧历史记录面板"""
@@ -925,7 +1021,7 @@ class RandomCallTab(BaseTab):
     def _switch_mode(self):
         """切换抽人/抽组控件显示"""
         # 先隐藏所有模式相关控件
-        for f in (self.person_frame, self.group_frame, self.action_frame):
+        for f in (self.person_frame, self.group_frame, self.action_frame, self.stats_frame):
             f.pack_forget()
 
         # 切换模式时重置不放回抽取池
@@ -935,9 +1031,10 @@ class RandomCallTab(BaseTab):
         if mode == "person":
             self.person_frame.pack(fill="x", pady=5)
             self.action_frame.pack(fill="x", pady=5)
+            self.stats_frame.pack(fill="x", pady=5)
             # 恢复抽取数量范围为样本数量
             if self.names:
-                self.choice_entry["values"] = list(range(1, len(self.names) + 1))
+                self.choice_entry["values"] = list(range(1, min(len(self.names), self.CHOICE_MAX) + 1))
                 cur = self.choice_entry.get()
                 if cur and int(cur) > len(self.names):
                     self.choice_entry.set("1")
@@ -946,10 +1043,11 @@ class RandomCallTab(BaseTab):
         else:
             self.group_frame.pack(fill="x", pady=5)
             self.action_frame.pack(fill="x", pady=5)
+            self.stats_frame.pack(fill="x", pady=5)
             # 恢复抽取数量范围为组选取数量
             try:
                 total = int(self.total_entry.get())
-                self.choice_entry["values"] = list(range(1, min(total + 1, 27)))
+                self.choice_entry["values"] = list(range(1, min(total, self.CHOICE_MAX) + 1))
                 default_k = ConfigManager().get("rct_choice_default", 3)
                 self.choice_entry.set(str(min(default_k, total)))
             except ValueError:
@@ -960,9 +1058,9 @@ class RandomCallTab(BaseTab):
         try:
             total = int(self.total_entry.get())
             if total > 0:
-                mx = min(total, 26)
+                mx = min(total, self.CHOICE_MAX)
                 if self.mode_var.get() == "group":
-                    self.choice_entry["values"] = list(range(1, mx + 1))
+                    self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
                     cur = self.choice_entry.get()
                     if cur and int(cur) > mx:
                         self.choice_entry.set(str(min(3, mx)))
@@ -979,7 +1077,7 @@ class RandomCallTab(BaseTab):
         self.sampler_mode_var.set(idx)
         self.sampler.set_mode(idx)
         # 更新按钮状态和文字
-        if idx == SmartSampler.MODE_BASIC:
+        if idx in (SmartSampler.MODE_BASIC, SmartSampler.MODE_LRU):
             self.weight_btn.config(state="disabled", text="权重")
         elif idx == SmartSampler.MODE_SMART:
             self.weight_btn.config(state="normal", text="权重")
@@ -1006,11 +1104,7 @@ class RandomCallTab(BaseTab):
         else:
             try:
                 total = int(self.total_entry.get())
-                items = (
-                    list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")[:total]
-                    if self.group_order_var.get() == "ABC"
-                    else list(range(1, total + 1))
-                )
+                items = self._group_population(total)
             except (ValueError, AttributeError):
                 messagebox.showwarning("警告", "请先设置组参数")
                 return
@@ -1064,32 +1158,75 @@ class RandomCallTab(BaseTab):
         canvas.bind_all("<MouseWheel>", _on_mousewheel)
         # WM_DELETE_WINDOW 在下方 _prompt_and_close 中设置
 
-        # 为每个项目创建权重输入框
+        # 样本较多时分页：只为当前页取出样本并创建控件（抽组可达百万组），
+        # 输入过的权重记录在 edits 中，翻页后保留，保存时一并写入
+        n = len(items)
+        page_size = self.WEIGHT_PAGE_SIZE
+        pages = max(1, -(-n // page_size))
+        group_mode = self.mode_var.get() == "group"
+        page = 0
+        page_items = []
+        edits = {}          # 样本 → 输入的权重文本（只记录与已保存值不同的）
+        reset_all = False   # 点击"重置"后保存时先清空全部权重
+        prob_of = {}        # 最近一次计算的入选概率
         weight_vars = {}
         weight_entries = {}
         weight_labels = {}  # 存储权重状态 Label 引用
-        for item in items:
-            row = tk.Frame(inner)
-            row.pack(fill="x", pady=2, padx=5)
-            label_text = str(item) + ("组" if self.mode_var.get() == "group" and isinstance(item, int) else "")
-            tk.Label(row, text=label_text, width=15, anchor="w").pack(side="left")
-            var = tk.StringVar(value=str(self.sampler.get_weight(item)))
-            entry = tk.Entry(row, textvariable=var, width=10)
-            entry.pack(side="left", padx=5)
-            weight_vars[item] = var
-            weight_entries[item] = entry
-            weight_labels[item] = tk.Label(row, text="", fg="gray", font=("", 8))
-            weight_labels[item].pack(side="left")
+        prob_labels = {}    # 入选概率 Label 引用
+
+        def _saved_text(item):
+            return "1.0" if reset_all else str(self.sampler.get_weight(item))
+
+        def _on_edit(item, var):
+            text = var.get()
+            if text == _saved_text(item):
+                edits.pop(item, None)
+            else:
+                edits[item] = text
+
+        def _show_page(p):
+            """切换到第 p 页（0 起），重建该页的输入行"""
+            nonlocal page, page_items
+            page = max(0, min(pages - 1, p))
+            for child in inner.winfo_children():
+                child.destroy()
+            weight_vars.clear()
+            weight_entries.clear()
+            weight_labels.clear()
+            prob_labels.clear()
+            lo = page * page_size
+            page_items = items[lo:lo + page_size]
+            for item in page_items:
+                row = tk.Frame(inner)
+                row.pack(fill="x", pady=2, padx=5)
+                label_text = str(item) + ("组" if group_mode and isinstance(item, int) else "")
+                tk.Label(row, text=label_text, width=15, anchor="w").pack(side="left")
+                var = tk.StringVar(value=edits.get(item, _saved_text(item)))
+                var.trace_add("write", lambda *_, item=item, var=var: _on_edit(item, var))
+                entry = tk.Entry(row, textvariable=var, width=10)
+                entry.pack(side="left", padx=5)
+                weight_vars[item] = var
+                weight_entries[item] = entry
+                weight_labels[item] = tk.Label(row, text="", fg="gray", font=("", 8))
+                weight_labels[item].pack(side="left")
+                prob_labels[item] = tk.Label(row, text="", fg="#2b5b84", font=("", 8))
+                prob_labels[item].pack(side="left", padx=(6, 0))
+            if pages > 1:
+                page_label.config(text=f"第 {page + 1}/{pages} 页（共 {n} 项）")
+            _update_weight_display()
+            _fill_probabilities()
+            canvas.yview_moveto(0)
 
         def _update_weight_display():
             """根据固定权重勾选状态，切换显示智能权重或固定权重"""
             fixed_on = use_fixed_var.get()
-            for item in items:
-                if fixed_on:
+            if fixed_on:
+                for item in page_items:
                     weight_labels[item].config(
                         text=f"固定: {self.sampler.get_weight(item):.1f}")
-                else:
-                    smart_w = self.sampler.get_smart_effective_weight(item)
+            else:
+                smart_weights = self.sampler.iter_smart_effective_weights(page_items)
+                for item, smart_w in zip(page_items, smart_weights):
                     weight_labels[item].config(
                         text=f"智能: {smart_w:.1f}")
             # 同步切换输入框可编辑状态
@@ -1097,6 +1234,11 @@ class RandomCallTab(BaseTab):
             for entry in weight_entries.values():
                 entry.config(state=state)
 
+        def _fill_probabilities():
+            for item, label in prob_labels.items():
+                p = prob_of.get(item)
+                label.config(text="" if p is None else f"概率 {min(1.0, p) * 100:.1f}%")
+
         # 创建复选框（必须在 _update_weight_display 定义之后）
         fixed_cb = tk.Checkbutton(
             top_frame, text="使用固定权重（勾选后可修改，不勾选仅查看智能权重）",
@@ -1106,36 +1248,51 @@ class RandomCallTab(BaseTab):
         )
         fixed_cb.pack(anchor="w", pady=(5, 5))
 
-        # 初始显示
-        _update_weight_display()
+        # 翻页控件（只有一页时不显示）
+        if pages > 1:
+            nav = tk.Frame(top_frame)
+            nav.pack(anchor="w", pady=(0, 4))
+            tk.Button(nav, text="上一页", command=lambda: _show_page(page - 1)).pack(side="left")
+            tk.Button(nav, text="下一页", command=lambda: _show_page(page + 1)).pack(side="left", padx=3)
+            page_label = tk.Label(nav, text="", font=("", 9))
+            page_label.pack(side="left", padx=5)
+            jump_var = tk.StringVar()
+            tk.Entry(nav, textvariable=jump_var, width=7).pack(side="left")
+
+            def _jump():
+                try:
+                    _show_page(int(jump_var.get()) - 1)
+                except ValueError:
+                    messagebox.showwarning("无效输入", "请输入页码", parent=win)
+
+            tk.Button(nav, text="跳页", command=_jump).pack(side="left", padx=3)
 
         # 记录初始状态，用于检测改动
         _init_use_fixed = use_fixed_var.get()
-        _init_weights = {item: var.get() for item, var in weight_vars.items()}
         _applied = False
 
         def _has_weight_changes():
-            if use_fixed_var.get() != _init_use_fixed:
-                return True
-            for item, var in weight_vars.items():
-                if var.get() != _init_weights.get(item):
-                    return True
-            return False
+            return use_fixed_var.get() != _init_use_fixed or reset_all or bool(edits)
 
         def save_weights():
             nonlocal _applied
             self.sampler.use_fixed_weights = use_fixed_var.get()
-            for item, var in weight_vars.items():
+            if reset_all:
+                self.sampler.reset_weights()
+            for item, text in edits.items():
                 try:
-                    w = float(var.get().strip())
+                    w = float(text.strip())
                     self.sampler.set_weight(item, w)
                 except ValueError:
                     messagebox.showwarning("无效输入", f"'{item}' 的权重值无效，已跳过")
                     continue
             # 同步高级模式的自定义权重开关
             self.sampler.advanced_config["custom_weights"] = self.sampler.use_fixed_weights
+            # 空闲时预先构建别名表，下一次抽取无需 O(n) 预处理
+            if self.population is not None:
+                self.frame.after_idle(self.sampler.prepare_alias_table, self.population)
             _applied = True
-            rctlog.info(f"权重已更新 ({len(weight_vars)} 项), 固定权重={self.sampler.use_fixed_weights}")
+            rctlog.info(f"权重已更新 ({len(edits)} 项), 固定权重={self.sampler.use_fixed_weights}")
             messagebox.showinfo("成功", "权重已保存")
             canvas.unbind_all("<MouseWheel>")
             win.destroy()
@@ -1148,23 +1305,201 @@ class RandomCallTab(BaseTab):
             canvas.unbind_all("<MouseWheel>")
             win.destroy()
 
+        def _reset():
+            nonlocal reset_all
+            reset_all = True
+            edits.clear()
+            for var in weight_vars.values():
+                var.set("1.0")
+
+        # ── 入选概率：按当前输入（未保存亦可）计算下一次抽 k 个时每个样本被抽中的概率 ──
+        # 需要为全部样本生成权重向量，只在样本数不超过 WEIGHT_PROB_MAX 时提供；
+        # 内存映射名单按页解码，不为计算概率解码全部名字
+        prob_frame = tk.Frame(win)
+        prob_frame.pack(fill="x", padx=10, pady=(0, 4))
+        prob_status = tk.Label(prob_frame, text="", fg="gray", font=("", 8))
+        if isinstance(items, MappedRoster):
+            prob_status.config(text="超大名单（内存映射）不计算抽中概率")
+        elif n <= self.WEIGHT_PROB_MAX:
+            tk.Label(prob_frame, text="抽取数量：").pack(side="left")
+            try:
+                default_k = int(self.choice_entry.get())
+            except (ValueError, TypeError):
+                default_k = 1
+            prob_k_var = tk.StringVar(value=str(max(1, min(default_k, n))))
+            tk.Spinbox(prob_frame, textvariable=prob_k_var, from_=1, to=n,
+                       width=6).pack(side="left")
+
+            def _show_probabilities():
+                """计算并显示入选概率（小规模精确，大规模近似）"""
+                try:
+                    k = int(prob_k_var.get())
+                except ValueError:
+                    messagebox.showwarning("无效输入", "请输入有效的抽取数量", parent=win)
+                    return
+                fixed = {}
+                for item in items:
+                    try:
+                        fixed[item] = max(0.0, float(edits.get(item, _saved_text(item)).strip()))
+                    except ValueError:
+                        fixed[item] = self.sampler.get_weight(item)
+                result = sampler_inclusion(self.sampler, items, k,
+                                           fixed=fixed, use_fixed=use_fixed_var.get())
+                prob_of.clear()
+                if result is None:
+                    _fill_probabilities()
+                    prob_status.config(text="当前模式下抽中概率取决于抽取顺序，无法预先计算")
+                    return
+                probs, method = result
+                for item, p in zip(items, probs):
+                    prob_of[item] = prob_of.get(item, 0.0) + p
+                _fill_probabilities()
+                prob_status.config(text={"exact": "精确值", "approx": "近似值",
+                                         "uniform": "等概率"}[method])
+
+            tk.Button(prob_frame, text="计算抽中概率", command=_show_probabilities).pack(side="left", padx=5)
+        else:
+            prob_status.config(text=f"样本超过 {self.WEIGHT_PROB_MAX} 个，不计算抽中概率")
+        prob_status.pack(side="left")
+
         btn_frame = tk.Frame(win)
         btn_frame.pack(fill="x", padx=10, pady=(0, 10))
         tk.Button(btn_frame, text="应用", command=save_weights, width=12).pack(side="left", padx=3)
-        tk.Button(btn_frame, text="重置",
-                  command=lambda: [var.set("1.0") for var in weight_vars.values()],
-                  width=15).pack(side="left", padx=3)
+        tk.Button(btn_frame, text="重置", command=_reset, width=15).pack(side="left", padx=3)
         tk.Button(btn_frame, text="取消", command=_prompt_and_close, width=8).pack(side="left", padx=3)
+        _show_page(0)
         # 窗口关闭也触发提醒
         win.protocol("WM_DELETE_WINDOW", _prompt_and_close)
 
+    def _show_sample_count(self, count):
+        """更新样本数量标签（有排除名单时一并显示被排除的人数）"""
+        excluded = self.sampler.excluded_count if isinstance(self.population, PreparedPopulation) else 0
+        text = f"样本数量: {count}" + (f"（已排除 {excluded} 人）" if excluded else "")
+        self.sample_count_label.config(text=text, fg="green")
+
+    def open_exclusion_dialog(self):
+        """排除名单窗口：单击名字即切换是否排除（如今日缺席），不重建名单、不重置抽样进度"""
+        if not isinstance(self.population, PreparedPopulation):
+            if isinstance(self.population, MappedRoster):
+                messagebox.showwarning("警告", "超大名单（内存映射）暂不支持排除名单")
+            else:
+                messagebox.showwarning("警告", "请先加载样本列表文件")
+            return
+        keys = self.population.keys
+        sampler = self.sampler
+
+        win = tk.Toplevel(self.frame.winfo_toplevel())
+        win.title("排除名单")
+        win.geometry("360x480+120+120")
+        win.transient(self.frame.winfo_toplevel())
+        win.minsize(280, 300)
+
+        top_frame = tk.Frame(win)
+        top_frame.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(top_frame, text="单击名字切换是否排除（✗ 为本次不参与抽取）",
+                 font=("", 10, "bold"), fg="blue").pack(anchor="w")
+        tk.Label(top_frame, text="排除只在本次运行中有效，不影响抽样历史与不放回进度",
+                 font=("", 9), fg="gray").pack(anchor="w")
+        search_var = tk.StringVar()
+        search_row = tk.Frame(top_frame)
+        search_row.pack(fill="x", pady=(5, 0))
+        tk.Label(search_row, text="筛选：").pack(side="left")
+        search_entry = tk.Entry(search_row, textvariable=search_var)
+        search_entry.pack(side="left", fill="x", expand=True)
+
+        body_frame = tk.Frame(win)
+        body_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        listbox = tk.Listbox(body_frame, activestyle="none", exportselection=False)
+        vbar = tk.Scrollbar(body_frame, orient="vertical", command=listbox.yview)
+        listbox.configure(yscrollcommand=vbar.set)
+        listbox.pack(side="left", fill="both", expand=True)
+        vbar.pack(side="right", fill="y")
+
+        status = tk.Label(win, text="", fg="gray", font=("", 9))
+        status.pack(anchor="w", padx=10)
+        shown = []
+
+        def _row(name, excluded):
+            return f"✗ {name}" if excluded else f"   {name}"
+
+        def _update_status():
+            text = f"已排除 {sampler.excluded_count} 人，可抽取 {sampler.available_count(self.population)} 人"
+            if len(shown) >= self.EXCLUDE_LIST_MAX:
+                text += f"（仅列出前 {self.EXCLUDE_LIST_MAX} 个，请输入关键字筛选）"
+            status.config(text=text)
+            self._show_sample_count(len(self.population))
+
+        def _refresh(*_):
+            keyword = search_var.get().strip()
+            shown.clear()
+            for name in keys:
+                if keyword in str(name):
+                    shown.append(name)
+                    if len(shown) >= self.EXCLUDE_LIST_MAX:
+                        break
+            listbox.delete(0, "end")
+            listbox.insert("end", *[_row(name, sampler.is_excluded(name)) for name in shown])
+            for i, name in enumerate(shown):
+                if sampler.is_excluded(name):
+                    listbox.itemconfig(i, fg="gray")
+            _update_status()
+
+        def _toggle(index):
+            if not 0 <= index < len(shown):
+                return
+            name = shown[index]
+            excluded = sampler.toggle_excluded(name)
+            listbox.delete(index)
+            listbox.insert(index, _row(name, excluded))
+            listbox.itemconfig(index, fg="gray" if excluded else "black")
+            listbox.activate(index)
+            _update_status()
+
+        def _on_click(event):
+            index = listbox.nearest(event.y)
+            bbox = listbox.bbox(index)
+            if bbox and bbox[1] <= event.y < bbox[1] + bbox[3]:
+                _toggle(index)
+
+        def _clear_all():
+            sampler.clear_exclusions()
+            _refresh()
+
+        listbox.bind("<ButtonRelease-1>", _on_click)
+        listbox.bind("<space>", lambda e: _toggle(listbox.index("active")))
+        search_var.trace_add("write", _refresh)
+        # 筛选框中回车：切换唯一匹配的名字，便于键盘快速勾选
+        search_entry.bind("<Return>", lambda e: (_toggle(0), search_var.set("")) if len(shown) == 1 else None)
+
+        btn_frame = tk.Frame(win)
+        btn_frame.pack(fill="x", padx=10, pady=(0, 10))
+        tk.Button(btn_frame, text="全部恢复", command=_clear_all, width=12).pack(side="left", padx=3)
+        tk.Button(btn_frame, text="关闭", command=win.destroy, width=8).pack(side="right", padx=3)
+
+        _refresh()
+        search_entry.focus_set()
+
     def _open_advanced_config(self):
         """打开高级抽取配置窗口"""
+        if self.mode_var.get() == "person":
+            population = self.population if self.names else None
+        else:
+            try:
+                total = int(self.total_entry.get())
+            except ValueError:
+                total = 0
+            population = self._group_population(total) or None
+        try:
+            k = int(self.choice_entry.get())
+        except (ValueError, TypeError):
+            k = None
         AdvancedConfigWindow(
             self.frame.winfo_toplevel(),
             self.sampler,
             on_apply=self._on_advanced_config_applied,
             on_open_weights=self._open_weight_config_dialog,
+            population=population,
+            k=k,
         )
 
     def _on_advanced_config_applied(self):
@@ -1185,13 +1520,12 @@ class RandomCallTab(BaseTab):
             return
         names = SampleLibrary.load_names(default_name)
         if names:
-            self.names = names
-            self.sampler.reset_no_replace_pool()
+            self._set_names(names)
             self.current_file = os.path.join(rct_rcplist_path, f"{default_name}.rcp")
             self.file_path_label.config(text=f"样本库: {default_name}", fg="purple")
-            self.sample_count_label.config(text=f"样本数量: {len(names)}", fg="green")
+            self._show_sample_count(len(names))
             mx = len(names)
-            self.choice_entry["values"] = list(range(1, mx + 1))
+            self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
             rctlog.info(f"[随机抽取] 自动加载样本库: {default_name}, 共 {len(names)} 个名字")
 
     # ══════════════════════════════════════════════════════════
@@ -1219,6 +1553,9 @@ class RandomCallTab(BaseTab):
 
         extra = []
 
+        if should_map(file_path):
+            return self._load_mapped_roster(file_path, extra)
+
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -1226,17 +1563,7 @@ class RandomCallTab(BaseTab):
             if file_path.endswith(".rcp"):
                 content = self._decode_rcp(content)
 
-            names = []
-            for line in content.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                for sep in [",", ";", "\t"]:
-                    if sep in line:
-                        names.extend(n.strip() for n in line.split(sep) if n.strip())
-                        break
-                else:
-                    names.append(line)
+            names = split_names(content)
 
             config = ConfigManager()
             if config.get("rct_merge_names", True):
@@ -1255,10 +1582,10 @@ class RandomCallTab(BaseTab):
                 text="默认样本" if file_path == self.auto_file else os.path.basename(file_path),
                 fg="purple",
             )
-            self.sample_count_label.config(text=f"样本数量: {len(names)}", fg="green")
+            self._show_sample_count(len(names))
 
             mx = len(names)
-            self.choice_entry["values"] = list(range(1, mx + 1))
+            self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
             self.current_file = file_path
 
             rctlog.info(f"[随机抽取] 成功加载 {len(names)} 个名字")
@@ -1270,9 +1597,9 @@ class RandomCallTab(BaseTab):
                     lines = [line.strip() for line in f if line.strip()]
                 if lines:
                     self.file_path_label.config(text=os.path.basename(file_path), fg="purple")
-                    self.sample_count_label.config(text=f"样本数量: {len(lines)}", fg="green")
+                    self._show_sample_count(len(lines))
                     mx = len(lines)
-                    self.choice_entry["values"] = list(range(1, mx + 1))
+                    self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
                     self.current_file = file_path
                     return lines, extra
             except Exception as e:
@@ -1284,6 +1611,59 @@ class RandomCallTab(BaseTab):
             messagebox.showerror("错误", f"读取文件失败: {e}")
             return [], extra
 
+    def _load_mapped_roster(self, file_path, extra):
+        """超大名单文件：内存映射并建立偏移索引（索引缓存在 data/cache），不读入全部名字"""
+        try:
+            merge = ConfigManager().get("rct_merge_names", True)
+            roster = open_roster(file_path, merge=merge)
+        except (OSError, ValueError) as e:
+            rctlog.error(f"[随机抽取] 读取文件失败: {e}")
+            messagebox.showerror("错误", f"读取文件失败: {e}")
+            return [], extra
+        if roster.duplicates:
+            extra.append("文件中存在重复的名字，" + ("已自动去除" if merge else "已保留"))
+        if not len(roster):
+            roster.close()
+            messagebox.showwarning("警告", "文件中没有有效的数据")
+            return [], extra
+
+        self.file_path_label.config(
+            text="默认样本" if file_path == self.auto_file else os.path.basename(file_path),
+            fg="purple",
+        )
+        self._show_sample_count(len(roster))
+        self.choice_entry["values"] = list(range(1, min(len(roster), self.CHOICE_MAX) + 1))
+        self.current_file = file_path
+        rctlog.info(f"[随机抽取] 已映射 {len(roster)} 个名字（{roster.encoding}）")
+        return roster, extra
+
+    def _set_names(self, names):
+        """切换当前名单：构建预处理总体并重置不放回抽取池
+
+        名字驻留在预处理总体的名字表（NameTable）中，self.names 即为该总体，读入的列表随后释放。
+        内存映射名单（MappedRoster）直接作为总体使用，不构建 id 数组，也不恢复/保存抽样快照。
+        """
+        old = self.population
+        self.sampler.reset_no_replace_pool()
+        if isinstance(names, MappedRoster):
+            self.population = names
+        else:
+            self.population = PreparedPopulation(names)
+            self.sampler.bind_population(self.population)
+            if load_snapshot(self.sampler, self.population):
+                rctlog.info(f"[随机抽取] 已恢复该名单的抽样状态（累计 {self.sampler.total_selections} 次）")
+        self.names = self.population
+        if isinstance(old, MappedRoster) and old is not names:
+            old.close()
+        # 排除名单按名字迁移到新名单，数量标签一并更新
+        self._show_sample_count(len(self.population))
+        self._refresh_stats_panel()
+
+    def _save_snapshot(self):
+        """保存当前名单的抽样快照（内存映射名单不保存）"""
+        if isinstance(self.population, PreparedPopulation):
+            save_snapshot(self.sampler, self.population)
+
     def _decode_rcp(self, data):
         """解码 RCP 编码内容"""
         data = data.strip()
@@ -1293,20 +1673,70 @@ class RandomCallTab(BaseTab):
         """手动选择文件加载"""
         names, extra = self._load_names_from_file()
         if names:
-            self.names = names
-            self.sampler.reset_no_replace_pool()
+            self._set_names(names)
             msg = f"共加载 {len(names)} 个名字"
             if extra:
                 msg += "\n" + "\n".join(extra)
             messagebox.showinfo("成功", msg)
 
+    def stream_draw(self):
+        """流式抽取：单遍扫描所选文件直接抽出结果，不加载名单（适合超大文件，不计入抽样历史）"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[
+                ("可用文件", "*.rcp;*.txt;*.csv"),
+                ("名单文件", "*.rcp"),
+                ("文本文件", "*.txt"),
+                ("CSV文件", "*.csv"),
+                ("所有文件", "*.*"),
+            ],
+            initialdir=document_path,
+            title="选择要流式抽取的文件",
+        )
+        if not file_path:
+            return
+        k = simpledialog.askinteger("流式抽取", "抽取数量：", parent=self.frame,
+                                    minvalue=1, initialvalue=1)
+        if not k:
+            return
+
+        try:
+            # 默认等概率；末列像权重时由用户确认后才按权重抽取
+            column = sniff_weight_column(file_path)
+            if column is not None and not messagebox.askyesno(
+                    "流式抽取", f"检测到每行第 {column + 1} 列均为数字，是否将其作为权重列？\n"
+                               "选择\"否\"将按普通名单（每个字段均为名字）等概率抽取。",
+                    default=messagebox.NO, parent=self.frame):
+                column = None
+            result = stream_draw_file(file_path, k, create_rng(self.sampler.rng.kind),
+                                      weight_column=column)
+        except Exception as e:
+            rctlog.error(f"[随机抽取] 流式抽取失败: {e}")
+            messagebox.showerror("错误", f"流式抽取失败:\n{e}")
+            return
+        selected = result.names
+        if not selected:
+            messagebox.showwarning("警告", "文件中没有有效的数据")
+            return
+
+        mode = "按权重列" if result.weighted else "等概率"
+        preview = ", ".join(selected[:8]) + ("..." if len(selected) > 8 else "")
+        self._add_history("person", selected, f"流式抽{len(selected)}人: {preview}")
+
+        rctlog.info(f"[随机抽取] 流式抽取成功（{mode}，共 {result.total} 条）: {selected}")
+        msg = f"从 {os.path.basename(file_path)} 的 {result.total} 条中{mode}抽取：\n" + "\n".join(selected)
+        if len(selected) < k:
+            msg += f"\n\n文件中只有 {len(selected)} 个可抽取的名字"
+        messagebox.showinfo("抽取结果", msg)
+
+        if ConfigManager().get("save_result", True):
+            SaveResult().save_result("RandomPerson", "随机抽人", selected)
+
     def reload_current_file(self):
         """重新加载当前文件"""
         if self.current_file and os.path.exists(self.current_file):
             names, extra = self._load_names_from_file(self.current_file)
             if names:
-                self.names = names
-                self.sampler.reset_no_replace_pool()
+                self._set_names(names)
                 msg = f"重新加载成功\n共 {len(names)} 个名字"
                 if extra:
                     msg += "\n" + "\n".join(extra)
@@ -1348,7 +1778,7 @@ class RandomCallTab(BaseTab):
                                   bg="#f5f5f5", anchor="w")
             name_label.pack(fill="x", padx=6, pady=(4, 0))
 
-            count = len(SampleLibrary.load_names(name))
+            count = SampleLibrary.count_names(name)
             info_label = tk.Label(card, text=f"{count} 个名字 | {size}B",
                                   font=("", 8), fg="gray", bg="#f5f5f5", anchor="w")
             info_label.pack(fill="x", padx=6, pady=(0, 4))
@@ -1364,13 +1794,12 @@ class RandomCallTab(BaseTab):
         """确认加载样本并关闭窗口"""
         names = SampleLibrary.load_names(name)
         if names:
-            self.names = names
-            self.sampler.reset_no_replace_pool()
+            self._set_names(names)
             self.current_file = os.path.join(rct_rcplist_path, f"{name}.rcp")
             self.file_path_label.config(text=f"样本库: {name}", fg="purple")
-            self.sample_count_label.config(text=f"样本数量: {len(names)}", fg="green")
+            self._show_sample_count(len(names))
             mx = len(names)
-            self.choice_entry["values"] = list(range(1, mx + 1))
+            self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
             rctlog.info(f"[随机抽取] 从样本库加载: {name}, 共 {len(names)} 个名字")
             messagebox.showinfo("成功", f"已加载样本「{name}」\n共 {len(names)} 个名字")
             win.destroy()
@@ -1386,13 +1815,12 @@ class RandomCallTab(BaseTab):
             return
         names = SampleLibrary.load_names(default_name)
         if names:
-            self.names = names
-            self.sampler.reset_no_replace_pool()
+            self._set_names(names)
             self.current_file = os.path.join(rct_rcplist_path, f"{default_name}.rcp")
             self.file_path_label.config(text=f"样本库: {default_name}", fg="purple")
-            self.sample_count_label.config(text=f"样本数量: {len(names)}", fg="green")
+            self._show_sample_count(len(names))
             mx = len(names)
-            self.choice_entry["values"] = list(range(1, mx + 1))
+            self.choice_entry["values"] = list(range(1, min(mx, self.CHOICE_MAX) + 1))
             rctlog.info(f"[随机抽取] 自动加载样本库: {default_name}, 共 {len(names)} 个名字")
             messagebox.showinfo("成功", f"已加载默认样本「{default_name}」\n共 {len(names)} 个名字")
         else:
@@ -1424,16 +1852,29 @@ class RandomCallTab(BaseTab):
 
         if k < 1:
             return
-        if k > len(self.names):
-            messagebox.showwarning("错误", f"抽取数量({k})大于样本数量({len(self.names)})")
-            return
-        if k == len(self.names) and not messagebox.askyesno("提示", "抽取数量与总数量相同，确定要抽取所有人吗？"):
+        if isinstance(self.population, PreparedPopulation) and self.sampler.excluded_count:
+            # 有排除名单时按可抽取的人数校验
+            available = self.sampler.available_count(self.population)
+            if k > available:
+                messagebox.showwarning("错误", f"抽取数量({k})大于可抽取数量({available}，"
+                                               f"已排除 {self.sampler.excluded_count} 人)")
+                return
+        else:
+            available = len(self.names)
+            if k > available:
+                messagebox.showwarning("错误", f"抽取数量({k})大于样本数量({available})")
+                return
+        if k == available and not messagebox.askyesno("提示", "抽取数量与总数量相同，确定要抽取所有人吗？"):
             return
 
-        selected = self.sampler.smart_sample(self.names, k)
+        selected = self.sampler.smart_sample(self.population, k)
+        self._save_snapshot()
+        self._refresh_stats_panel()
 
         preview = ", ".join(selected[:8]) + ("..." if len(selected) > 8 else "")
-        self._add_history("person", selected, f"抽{k}人: {preview}")
+        items = self.population.name_list(selected) \
+            if isinstance(self.population, PreparedPopulation) else selected
+        self._add_history("person", items, f"抽{k}人: {preview}")
 
         rctlog.info(f"[随机抽取] 抽人成功: {selected}")
         messagebox.showinfo("抽取结果", "抽取结果：\n" + "\n".join(selected))
@@ -1441,6 +1882,12 @@ class RandomCallTab(BaseTab):
         if ConfigManager().get("save_result", True):
             SaveResult().save_result("RandomPerson", "随机抽人", selected)
 
+    def _group_population(self, total):
+        """抽组总体：编号 1..total 或表格式字母 A…Z, AA…（虚拟序列，不展开为列表）"""
+        if self.group_order_var.get() == "ABC":
+            return LabelPopulation(total)
+        return NumberPopulation(total)
+
     def _draw_group(self):
         """随机抽组"""
         try:
@@ -1456,20 +1903,21 @@ class RandomCallTab(BaseTab):
         if k < 1:
             messagebox.showwarning("错误", "抽取数量不能小于1")
             return
+        if total > self.GROUP_TOTAL_MAX:
+            messagebox.showwarning("错误", f"样本总数不能大于{self.GROUP_TOTAL_MAX}")
+            return
         if k > total:
             messagebox.showwarning("错误", "抽取数量不能大于总数量")
             return
         if k == total and not messagebox.askyesno("提示", "抽取数量与总数量相同，确定要抽取所有组吗？"):
             return
 
-        all_groups = (
-            list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")[:total]
-            if self.group_order_var.get() == "ABC"
-            else list(range(1, total + 1))
-        )
+        all_groups = self._group_population(total)
 
         selected = self.sampler.smart_sample(all_groups, k)
-        selected.sort()
+        self._refresh_stats_panel()
+        # 按组的先后顺序排列（字母组 Z 之后为 AA，不能按字符串排序）
+        selected.sort(key=all_groups.position)
         result_items = [f"{g}组" for g in selected]
 
         preview = ", ".join(str(g) for g in selected[:8]) + ("..." if len(selected) > 8 else "")
@@ -1645,6 +2093,26 @@ class RandomCallTab(BaseTab):
             rctlog.info("所有历史记录已清除")
             messagebox.showinfo("成功", "历史记录已清除")
 
+    # ══════════════════════════════════════════════════════════
+    #  抽样统计
+    # ══════════════════════════════════════════════════════════
+
+    def _refresh_stats_panel(self):
+        """刷新抽样统计面板（各指标由抽样器增量维护，此处只做格式化）"""
+        stats = self.sampler.get_selection_summary()
+        if not stats["total_selections"]:
+            self.stats_label.config(text="暂无抽取记录")
+            return
+        most, least = stats["most_selected"], stats["least_selected"]
+        lines = [
+            f"累计抽取 {stats['total_selections']} 次，共抽中 {stats['picked_total']} 人次",
+            f"人均 {stats['mean']:.2f} 次，标准差 {stats['stddev']:.2f}，基尼系数 {stats['gini']:.3f}",
+            f"均匀性 χ²={stats['chi_square']:.1f}（自由度 {stats['dof']}，p={stats['p_value']:.3f}）",
+        ]
+        if most and least:
+            lines.append(f"最多: {most[0]}（{most[1]}次）  最少: {least[0]}（{least[1]}次）")
+        self.stats_label.config(text="\n".join(lines))
+
     # ══════════════════════════════════════════════════════════
     #  重置抽样历史
     # ══════════════════════════════════════════════════════════
@@ -1653,6 +2121,9 @@ class RandomCallTab(BaseTab):
         """重置抽样器历史记录"""
         if messagebox.askyesno("确认", "确定要重置抽样历史记录和统计计数吗？"):
             self.sampler.reset_history()
+            if self.names:
+                self._save_snapshot()
+            self._refresh_stats_panel()
             messagebox.showinfo("成功", "抽样历史记录已重置")
 
 # ========================================
@@ -1662,7 +2133,12 @@ class RandomCallTab(BaseTab):
 class AdvancedConfigWindow:
     """高级抽取配置窗口"""
 
-    def __init__(self, parent, sampler, on_apply=None, on_open_weights=None):
+    # 分布预览：未提供总体时使用的示例规模与抽取数量
+    PREVIEW_SAMPLE_SIZE = 30
+    PREVIEW_SAMPLE_K = 3
+
+    def __init__(self, parent, sampler, on_apply=None, on_open_weights=None,
+                 population=None, k=None):
         self.parent = parent
         self.sampler = sampler
         self.on_apply = on_apply
@@ -1670,6 +2146,11 @@ class AdvancedConfigWindow:
         self.config = ConfigManager()
         self.cfg = self.sampler.advanced_config
 
+        # 分布预览使用的总体与抽取数量（未提供时用示例名单）
+        self.preview_population = population or list(range(1, self.PREVIEW_SAMPLE_SIZE + 1))
+        self.preview_k = max(1, min(k or self.PREVIEW_SAMPLE_K, len(self.preview_population)))
+        self._preview = None
+
         self.win = tk.Toplevel(parent)
         self.win.title("高级抽取配置")
         self._applied = False
@@ -1734,6 +2215,8 @@ class AdvancedConfigWindow:
             canvas.unbind_all("<MouseWheel>")
             self.win.destroy()
         self.win.protocol("WM_DELETE_WINDOW", _prompt_close)
+        # 窗口以任何方式关闭时都停止后台预览
+        self.win.bind("<Destroy>", lambda e: self._cancel_preview() if e.widget is self.win else None)
 
         # ═══ 1. 抽取方式 ═══
         sec1 = self._make_section(scroll_inner, "抽取方式")
@@ -1906,6 +2389,26 @@ class AdvancedConfigWindow:
         )
         self.custw_btn.pack(side="left", padx=5)
 
+        # ═══ 4. 分布预览 ═══
+        sec4 = self._make_section(scroll_inner, "分布预览（按当前未保存的配置模拟）")
+        f_prev = tk.Frame(sec4)
+        f_prev.pack(fill="x", pady=3)
+        tk.Label(f_prev, text="模拟次数：").pack(side="left")
+        self.preview_draws_var = tk.StringVar(value="200000")
+        ttk.Combobox(f_prev, textvariable=self.preview_draws_var,
+                     values=["50000", "100000", "200000", "500000"],
+                     state="readonly", width=8).pack(side="left", padx=3)
+        self.preview_btn = tk.Button(f_prev, text="预览分布", width=10,
+                                     command=self._toggle_preview)
+        self.preview_btn.pack(side="left", padx=5)
+        self.preview_status = tk.Label(
+            sec4, text=f"每次抽 {self.preview_k} 个，共 {len(self.preview_population)} 个样本",
+            fg="gray", font=("", 8), anchor="w", justify="left",
+        )
+        self.preview_status.pack(fill="x")
+        self.preview_canvas = tk.Canvas(sec4, height=90, bg="#fafafa", highlightthickness=0)
+        self.preview_canvas.pack(fill="x", pady=(3, 0))
+
         # ── 底部按钮 ──
         btn_frame = tk.Frame(self.win)
         btn_frame.pack(fill="x", padx=10, pady=10)
@@ -2115,7 +2618,8 @@ class AdvancedConfigWindow:
     def _save_to_sampler(self):
         """将配置写入 sampler"""
         cfg = self._collect_config()
-        self.sampler.advanced_config.update(cfg)
+        # 写入并重新编译抽取策略（配置未变化时沿用原策略）
+        self.sampler.apply_advanced_config(cfg)
         # 同步智能模式的记忆窗口
         if cfg.get("smart_reduce_weight", True):
             self.sampler.smart_window = cfg.get("smart_memory_count", 3)
@@ -2163,6 +2667,7 @@ class AdvancedConfigWindow:
 
     def _ok(self):
         """确定并关闭"""
+        self._cancel_preview()
         self._save_to_sampler()
         self._save_to_global_config()
         self._applied = True
@@ -2171,6 +2676,87 @@ class AdvancedConfigWindow:
             self.on_apply()
         self.win.destroy()
 
+    # ── 分布预览 ──────────────────────────────────────────
+
+    def _toggle_preview(self):
+        """开始/停止分布预览"""
+        if self._preview is not None:
+            self._cancel_preview()
+            self.preview_status.config(text="预览已停止")
+            return
+        try:
+            total = int(self.preview_draws_var.get())
+        except ValueError:
+            total = 200000
+        try:
+            self._preview = MonteCarloPreview(
+                self.sampler, self.preview_population, self.preview_k,
+                self._collect_config(), total,
+            )
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e), parent=self.win)
+            return
+        except (OSError, RuntimeError) as e:
+            rctlog.error(f"分布预览启动失败: {e}")
+            messagebox.showerror("错误", f"分布预览启动失败: {e}", parent=self.win)
+            return
+        rctlog.info(f"开始分布预览: {total} 次模拟")
+        self.preview_btn.config(text="停止")
+        self.preview_status.config(text="正在模拟...")
+        self.win.after(200, self._poll_preview)
+
+    def _cancel_preview(self):
+        if self._preview is not None:
+            self._preview.cancel()
+            self._preview = None
+            if self.preview_btn.winfo_exists():
+                self.preview_btn.config(text="预览分布")
+
+    def _poll_preview(self):
+        """定期合并后台结果并刷新直方图（Tk 线程中执行，不阻塞）"""
+        preview = self._preview
+        if preview is None or not self.win.winfo_exists():
+            return
+        if preview.poll():
+            self._draw_preview(preview)
+        if preview.error is not None:
+            self._preview = None
+            self.preview_btn.config(text="预览分布")
+            self.preview_status.config(text=f"模拟出错: {preview.error}")
+            return
+        if preview.finished:
+            self._preview = None
+            self.preview_btn.config(text="预览分布")
+            rctlog.info(f"分布预览完成: {preview.done_draws} 次模拟")
+            return
+        self.win.after(150, self._poll_preview)
+
+    def _draw_preview(self, preview):
+        """绘制各样本入选频率的柱状图（样本较多时按相邻位置分组取平均）"""
+        values = preview.bin_frequencies()
+        bins = len(values)
+        low, high = preview.extremes()
+        expected = preview.k / preview.n
+        canvas = self.preview_canvas
+        canvas.delete("all")
+        width = max(canvas.winfo_width(), 200)
+        height = int(canvas["height"])
+        top = max(max(values), expected) * 1.2 or 1.0
+        bar_w = width / bins
+        for b, v in enumerate(values):
+            x0 = b * bar_w + 1
+            y0 = height - v / top * (height - 4)
+            color = "#4a90d9" if v >= expected else "#9cc3ec"
+            canvas.create_rectangle(x0, y0, x0 + bar_w - 2, height, fill=color, outline="")
+        y = height - expected / top * (height - 4)
+        canvas.create_line(0, y, width, y, fill="#d9534f", dash=(4, 2))
+
+        self.preview_status.config(
+            text=f"已模拟 {preview.done_draws}/{preview.total_draws} 次（每次抽 {preview.k} 个）  "
+                 f"最低 {low * 100:.2f}%  最高 {high * 100:.2f}%  "
+                 f"等概率 {expected * 100:.2f}%（红线）"
+        )
+
     def _reset_defaults(self):
         """恢复默认配置"""
         if not messagebox.askyesno("确认", "确定要恢复高级抽取的默认配置吗？"):
@@ -4,6 +4,8 @@ RandomCallTool - 随机抽取工具
 """
 
 import os
+import sys
+import multiprocessing
 import tkinter as tk
 from tkinter import messagebox
 from core.logman import rctlog
@@ -88,4 +90,10 @@ def main():
         messagebox.showerror("错误", f"程序启动失败:\n{e}")
 
 if __name__ == '__main__':
+    # 打包后的程序需要此调用，分布预览的进程池子进程才能正常启动
+    multiprocessing.freeze_support()
+    # rctool.py draw ... 为无界面的流式抽取命令行
+    if sys.argv[1:2] == ["draw"]:
+        from core.stream import main as stream_main
+        sys.exit(stream_main(sys.argv[2:]))
     main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""底层抽样算法（core.algos）：分布与精确入选概率一致、数据结构的不变量"""
+import random
+
+import pytest
+
+from core.algos import (AliasTable, BitSet, FenwickTree, LazyPermutation, alias_sample_indices,
+                         multi_draw_best_indices, rejection_weighted_indices, weighted_sample_indices)
+from core.inclusion import exact_inclusion
+
+WEIGHTS = [5.0, 1.0, 2.0, 0.5, 3.0, 1.0, 0.0, 2.5]
+TRIALS = 20000
+
+
+def assert_matches_exact(draw, weights, k, trials=TRIALS):
+    """固定种子模拟 trials 次，各位置的入选频率与 exact_inclusion 相差不超过 4 个标准差"""
+    hits = [0] * len(weights)
+    for _ in range(trials):
+        idx = draw()
+        assert len(idx) == len(set(idx)) == k
+        for i in idx:
+            hits[i] += 1
+    for i, p in enumerate(exact_inclusion(weights, k)):
+        tol = 4 * (p * (1 - p) / trials) ** 0.5 + 1e-9
+        assert abs(hits[i] / trials - p) <= tol, (i, hits[i] / trials, p)
+
+
+def test_fenwick_prefix_find_remove():
+    ft = FenwickTree(WEIGHTS)
+    for i in range(len(WEIGHTS) + 1):
+        assert abs(ft.prefix(i) - sum(WEIGHTS[:i])) < 1e-12
+    assert ft.find(0.0) == 0
+    assert ft.find(5.0) == 1
+    assert ft.find(ft.total) == len(WEIGHTS)
+    ft.remove(0)
+    assert ft.total == sum(WEIGHTS) - 5.0
+    assert ft.find(0.0) == 1
+    # 权重为 0 的位置不会被定位到
+    assert all(ft.find(u / 10 * ft.total) != 6 for u in range(10))
+
+
+def test_weighted_sample_indices_matches_exact():
+    rng = random.Random(2024)
+    assert_matches_exact(lambda: weighted_sample_indices(WEIGHTS, 3, rng), WEIGHTS, 3)
+
+
+def test_weighted_sample_indices_zero_weights_fill_uniformly():
+    rng = random.Random(1)
+    weights = [1.0, 0.0, 0.0, 0.0]
+    for _ in range(50):
+        idx = weighted_sample_indices(weights, 2, rng)
+        assert idx[0] == 0 and idx[1] in (1, 2, 3)
+
+
+def test_lazy_permutation_rounds():
+    pool = LazyPermutation(10, random.Random(3))
+    first = pool.take(4)
+    assert sorted(first + pool.remaining_positions()) == list(range(10))
+    second = pool.take(10)
+    assert len(second) == 6 and pool.remaining == 0
+    assert sorted(first + second) == list(range(10))
+    pool.reset()
+    assert pool.remaining == 10 and sorted(pool.take(10)) == list(range(10))
+
+
+def test_lazy_permutation_is_uniform():
+    rng = random.Random(11)
+    hits = [0] * 6
+    for _ in range(6000):
+        pool = LazyPermutation(6, rng)
+        pool.take(2)
+        hits[pool.take(1)[0]] += 1
+    assert all(abs(h / 6000 - 1 / 6) < 0.03 for h in hits)
+
+
+def test_alias_table_single_draw_proportional():
+    table = AliasTable(WEIGHTS)
+    assert table.total == sum(WEIGHTS) and table.w_max == 5.0 and table.positive == 7
+    rng = random.Random(5)
+    hits = [0] * len(WEIGHTS)
+    for _ in range(TRIALS):
+        hits[table.sample(rng)] += 1
+    assert hits[6] == 0
+    for i, w in enumerate(WEIGHTS):
+        p = w / table.total
+        assert abs(hits[i] / TRIALS - p) <= 4 * (p * (1 - p) / TRIALS) ** 0.5 + 1e-9
+
+
+def test_alias_sample_indices_matches_exact():
+    table = AliasTable(WEIGHTS)
+    rng = random.Random(7)
+    assert_matches_exact(lambda: alias_sample_indices(table, 3, rng), WEIGHTS, 3)
+
+
+def test_rejection_weighted_indices_matches_exact():
+    rng = random.Random(9)
+    assert_matches_exact(lambda: rejection_weighted_indices(WEIGHTS, 3, max(WEIGHTS), rng), WEIGHTS, 3)
+
+
+def test_multi_draw_best_matches_simulated_rounds():
+    """闭式解与逐轮模拟计数、随机打破平局的结果同分布：每个位置在各名次上的频率均为 1/n"""
+    n, k, rounds, trials = 6, 3, 4, 20000
+    rng = random.Random(11)
+
+    def simulate():
+        counts = [0] * n
+        for _ in range(rounds):
+            for i in rng.sample(range(n), k):
+                counts[i] += 1
+        return sorted(range(n), key=lambda i: (-counts[i], rng.random()))[:k]
+
+    for draw in (simulate, lambda: multi_draw_best_indices(n, k, rounds, rng)):
+        slots = [[0] * n for _ in range(k)]
+        for _ in range(trials):
+            idx = draw()
+            assert len(set(idx)) == k
+            for r, i in enumerate(idx):
+                slots[r][i] += 1
+        tol = 4 * ((1 / n) * (1 - 1 / n) / trials) ** 0.5
+        assert all(abs(c / trials - 1 / n) <= tol for row in slots for c in row)
+
+
+def test_take_where_leaves_masked_positions_in_pool():
+    masked = {1, 4, 7}
+    pool = LazyPermutation(10, random.Random(13))
+    taken = pool.take_where(5, masked.__contains__)
+    assert len(taken) == 5 and not masked & set(taken)
+    assert masked <= set(pool.remaining_positions())
+    # 未屏蔽的不足时全部取出，被屏蔽的仍留在池中
+    rest = pool.take_where(5, masked.__contains__)
+    assert sorted(taken + rest) == sorted(set(range(10)) - masked)
+    assert sorted(pool.remaining_positions()) == sorted(masked)
+    # 解除屏蔽后本轮仍可抽到
+    assert sorted(pool.take(3)) == sorted(masked)
+    assert pool.remaining == 0
+
+
+def test_bitset_add_discard_toggle_clear():
+    bits = BitSet(20)
+    for i in (0, 7, 8, 19, 7):
+        bits.add(i)
+    assert len(bits) == 4 and list(bits) == [0, 7, 8, 19]
+    assert 8 in bits and 9 not in bits and 20 not in bits and "8" not in bits
+    bits.discard(8)
+    bits.discard(8)
+    assert len(bits) == 3 and 8 not in bits
+    assert bits.toggle(3) is True and bits.toggle(0) is False
+    assert list(bits) == [3, 7, 19] and len(bits) == 3
+    bits.clear()
+    assert len(bits) == 0 and list(bits) == []
+    for bad in (-1, 20):
+        with pytest.raises(IndexError):
+            bits.add(bad)
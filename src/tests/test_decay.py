@@ -0,0 +1,42 @@
+"""衰减式智能模式：存储值 × 全局缩放因子给出的罚分与逐次衰减的直接计算一致（含重新归一化）"""
+import pytest
+
+from core.population import PreparedPopulation
+from core.sampler import SmartSampler
+
+
+@pytest.mark.parametrize("prepared", [False, True])
+@pytest.mark.parametrize("factor", [0.8, 0.01])
+def test_decay_penalty_matches_direct_computation(prepared, factor):
+    names = [f"s{i}" for i in range(8)]
+    population = PreparedPopulation(names) if prepared else names
+    sampler = SmartSampler(mode=SmartSampler.MODE_SMART, seed=12)
+    if prepared:
+        sampler.bind_population(population)
+    sampler.set_decay("draw", factor)
+    draws = []
+    # factor=0.01 时约 50 次抽取后缩放因子低于 DECAY_RENORM_SCALE，会发生重新归一化
+    for _ in range(120):
+        draws.append(set(sampler.smart_sample(population, 3)))
+    t_now = len(draws)
+    for name in names:
+        penalty = sum(factor ** (t_now - t) for t, chosen in enumerate(draws, 1) if name in chosen)
+        expected = max(0.1, 1.0 - 0.35 * penalty) if penalty >= 1e-9 else 1.0
+        assert sampler.get_smart_effective_weight(name) == pytest.approx(expected, abs=1e-9)
+    assert sampler.get_smart_effective_weights(names) == \
+        pytest.approx([sampler.get_smart_effective_weight(name) for name in names])
+
+
+def test_set_decay_validates_and_resets():
+    sampler = SmartSampler(mode=SmartSampler.MODE_SMART, seed=1)
+    with pytest.raises(ValueError):
+        sampler.set_decay("hour")
+    with pytest.raises(ValueError):
+        sampler.set_decay("draw", 1.0)
+    sampler.set_decay("draw", 0.5)
+    sampler.smart_sample(["a", "b", "c"], 1)
+    assert sampler._has_smart_history()
+    sampler.set_decay("draw", 0.6)
+    assert not sampler._has_smart_history()
+    sampler.set_decay(None)
+    assert sampler.get_smart_effective_weights(["a", "b", "c"]) == [1.0, 1.0, 1.0]
@@ -0,0 +1,81 @@
+"""抽样后端自调度：适用条件、按代价模型选择、标定缓存与各后端结果的有效性"""
+import json
+import random
+
+import pytest
+
+from core import dispatch, npbackend
+from core.dispatch import (DEFAULT_COSTS, UNIFORM_BACKENDS, WEIGHTED_BACKENDS, Dispatcher,
+                           alias_trials, rejection_trials)
+
+
+def _cost(name, n, kt, table=DEFAULT_COSTS):
+    a, b, c = table[name]
+    return a + b * n + c * kt
+
+
+def test_trial_bounds():
+    assert rejection_trials(100, 10, 1.0, 100.0) == pytest.approx(1.0 / 0.9)
+    assert rejection_trials(100, 60, 1.0, 100.0) is None
+    assert rejection_trials(100, 1, 0.0, 0.0) is None
+    assert alias_trials(10, 1.0, 100.0) == pytest.approx(1.0 / 0.9)
+    assert alias_trials(60, 1.0, 100.0) is None
+
+
+def test_seeded_choice_uses_static_costs():
+    dispatcher = Dispatcher(path=None, auto_calibrate=False)
+    # 本机系数与静态系数相反时，有种子的选择仍然只取决于静态系数
+    dispatcher._costs["mt"] = {name: (0.0, 0.0, 0.0) if name == "floyd" else (1.0, 1.0, 1.0)
+                               for name in DEFAULT_COSTS}
+    for n, k in ((10, 2), (100000, 5), (5000, 2000)):
+        expected = min(("sample", "floyd"), key=lambda name: _cost(name, n if name == "sample" else 0, k))
+        assert dispatcher.choose_uniform("mt", n, k, use_numpy=False, seeded=True) == expected
+        assert dispatcher.choose_uniform("mt", n, k, use_numpy=False) == "floyd"
+
+
+def test_weighted_choice_respects_applicability():
+    dispatcher = Dispatcher(path=None, auto_calibrate=False)
+    # 权重集中（k·w_max 超过总权重的一半）时不会选拒绝采样或别名表重抽
+    name = dispatcher.choose_weighted("mt", 1000, 10, 100.0, 1500.0, False, alias=True, seeded=True)
+    assert name == "fenwick"
+    name = dispatcher.choose_weighted("mt", 100000, 5, 1.0, 100000.0, False, alias=True, seeded=True)
+    assert name in ("alias", "rejection")
+
+
+def test_calibration_cache_round_trip(tmp_path):
+    path = str(tmp_path / "dispatch.json")
+    table = {name: (1e-6, 2e-9, 3e-7) for name in DEFAULT_COSTS}
+    dispatcher = Dispatcher(path=path, auto_calibrate=False)
+    dispatcher._costs["mt"] = table
+    dispatcher._save()
+    assert Dispatcher(path=path, auto_calibrate=False).costs("mt") == table
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["key"] = "other"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert Dispatcher(path=path, auto_calibrate=False).costs("mt") is DEFAULT_COSTS
+
+
+def test_backends_return_valid_positions():
+    rng = random.Random(4)
+    gen = npbackend.np.random.default_rng(4) if npbackend.HAS_NUMPY else None
+    weights = [0.0 if i % 5 == 0 else 1.0 + i % 3 for i in range(200)]
+    w_max = max(weights)
+    for name, func in UNIFORM_BACKENDS.items():
+        if name == "numpy" and gen is None:
+            continue
+        idx = func(rng, gen, 200, 7)
+        assert len(set(idx)) == 7 and all(0 <= i < 200 for i in idx)
+    for name, func in WEIGHTED_BACKENDS.items():
+        if name == "numpy_weighted" and gen is None:
+            continue
+        w = npbackend.np.asarray(weights) if name == "numpy_weighted" else weights
+        for _ in range(20):
+            idx = func(rng, gen, w, 7, w_max)
+            assert len(set(idx)) == 7 and all(weights[i] > 0 for i in idx)
+
+
+def test_default_dispatcher_is_shared():
+    assert dispatch.default_dispatcher() is dispatch.default_dispatcher()
@@ -0,0 +1,60 @@
+"""入选概率（sampler_inclusion）与抽样器实际行为的一致性"""
+from core.inclusion import next_draw_weights, sampler_inclusion
+from core.sampler import SmartSampler
+
+
+def _no_replace_sampler(method, seed=7):
+    sampler = SmartSampler(mode=SmartSampler.MODE_ADVANCED, seed=seed)
+    sampler.advanced_config["with_replacement"] = False
+    sampler.advanced_config["no_replace_method"] = method
+    return sampler
+
+
+def test_no_replace_partial_round_matches_pool():
+    names = [f"s{i}" for i in range(10)]
+    sampler = _no_replace_sampler(SmartSampler.NO_REPLACE_METHOD_CONTINUOUS)
+    drawn = set()
+    for _ in range(2):
+        drawn.update(sampler.smart_sample(names, 3))
+        pool = sampler._remaining_pool
+        probs, how = sampler_inclusion(sampler, names, 2)
+        assert how == "uniform"
+        remaining = set(pool.remaining_positions())
+        assert remaining == {i for i, name in enumerate(names) if name not in drawn}
+        for i, p in enumerate(probs):
+            assert p == (2 / len(remaining) if i in remaining else 0.0)
+        total = sum(probs)
+        assert abs(total - 2) < 1e-12
+
+    # 下一次抽取只会落在概率非零的位置
+    probs, _ = sampler_inclusion(sampler, names, 3)
+    for name in sampler.smart_sample(names, 3):
+        assert probs[names.index(name)] > 0
+
+
+def test_no_replace_short_pool():
+    names = [f"s{i}" for i in range(10)]
+    # 连续循环：剩余不足时跨越重载，无逐项概率
+    sampler = _no_replace_sampler(SmartSampler.NO_REPLACE_METHOD_CONTINUOUS)
+    sampler.smart_sample(names, 8)
+    assert sampler_inclusion(sampler, names, 4) is None
+    # 整除式：剩余不足时先重载，整池等概率
+    sampler = _no_replace_sampler(SmartSampler.NO_REPLACE_METHOD_DIVISIBLE)
+    sampler.smart_sample(names, 8)
+    probs, how = sampler_inclusion(sampler, names, 4)
+    assert how == "uniform" and probs == [0.4] * 10
+
+
+def test_preview_with_default_weights_follows_smart_reduce():
+    names = [f"s{i}" for i in range(6)]
+    sampler = SmartSampler(mode=SmartSampler.MODE_ADVANCED, seed=3)
+    sampler.advanced_config["custom_weights"] = True
+    sampler.smart_sample(names, 2)
+    smart = sampler.get_smart_effective_weights(names)
+    assert smart != [1.0] * len(names)
+    # 权重对话框传入的字典包含全部样本；全部为 1.0 时与抽样器一样回落到智能降权
+    assert next_draw_weights(sampler, names, fixed={n: 1.0 for n in names}) == smart
+    assert next_draw_weights(sampler, names) == smart
+    fixed = {n: 1.0 for n in names}
+    fixed["s0"] = 3.0
+    assert next_draw_weights(sampler, names, fixed=fixed) == [3.0] + [1.0] * 5
@@ -0,0 +1,47 @@
+"""最久未抽优先：索引最小堆的不变量，以及按名单轮转、重名与排除时的抽取行为"""
+import random
+
+from core.algos import IndexedMinHeap
+from core.population import PreparedPopulation
+from core.sampler import SmartSampler
+
+
+def test_indexed_min_heap_pop_and_set():
+    rng = random.Random(2)
+    keys = [rng.random() for _ in range(50)]
+    heap = IndexedMinHeap(keys)
+    for uid in range(0, 50, 7):
+        keys[uid] = rng.random()
+        heap.set(uid, keys[uid])
+    popped = [heap.pop() for _ in range(20)]
+    assert [keys[uid] for uid in popped] == sorted(keys)[:20]
+    assert len(heap) == 30 and popped[0] not in heap
+    heap.set(popped[0], -1.0)
+    assert popped[0] in heap and heap.pop() == popped[0]
+
+
+def test_lru_rotates_through_every_name_before_repeating():
+    names = [f"s{i}" for i in range(10)]
+    for population in (names, PreparedPopulation(names)):
+        sampler = SmartSampler(mode=SmartSampler.MODE_LRU, seed=9)
+        if isinstance(population, PreparedPopulation):
+            sampler.bind_population(population)
+        first = [name for _ in range(5) for name in sampler.smart_sample(population, 2)]
+        assert sorted(first) == names
+        # 第二轮按第一轮的抽中顺序依次重现
+        second = [name for _ in range(5) for name in sampler.smart_sample(population, 2)]
+        assert [set(second[i:i + 2]) for i in range(0, 10, 2)] == \
+            [set(first[i:i + 2]) for i in range(0, 10, 2)]
+
+
+def test_lru_with_duplicates_and_exclusions():
+    names = ["a", "b", "a", "c", "d"]
+    population = PreparedPopulation(names)
+    sampler = SmartSampler(mode=SmartSampler.MODE_LRU, seed=1)
+    sampler.bind_population(population)
+    sampler.exclude("d")
+    drawn = sampler.smart_sample(population, 3)
+    assert sorted(drawn) == ["a", "b", "c"]
+    assert sorted(sampler.smart_sample(population, 3)) == ["a", "b", "c"]
+    sampler.include("d")
+    assert sampler.smart_sample(population, 1) == ["d"]
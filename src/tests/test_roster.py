@@ -0,0 +1,115 @@
+"""内存映射名单：与读入列表的切分与重名处理一致、最久未抽优先不解码全部名字、旧缓存清理"""
+import os
+from core import roster
+from core.roster import open_roster, split_names
+from core.sampler import SmartSampler
+
+
+def _write(tmp_path, monkeypatch, lines):
+    monkeypatch.setattr(roster, "ROSTER_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "names.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_mapped_roster_matches_split_names(tmp_path, monkeypatch):
+    lines = ["张三, 李四;x", "", "王五\t赵六", "  钱七\u3000", "张三", "a;b\tc", "李四"]
+    path = _write(tmp_path, monkeypatch, lines)
+    names = split_names("\n".join(lines))
+    kept = open_roster(path)
+    merged = open_roster(path, merge=True)
+    try:
+        assert kept.has_duplicates and not merged.has_duplicates
+        assert list(kept) == names
+        assert list(merged) == list(dict.fromkeys(names))
+        assert all(kept.position(name) == names.index(name) for name in names)
+        assert [kept[i] for i in kept.first_positions()] == list(merged)
+    finally:
+        kept.close()
+        merged.close()
+
+
+def test_hash_collision_keeps_distinct_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(roster, "hash", lambda name: 7, raising=False)
+    path = _write(tmp_path, monkeypatch, ["a", "b", "a", "c", "b"])
+    merged = open_roster(path, merge=True)
+    kept = open_roster(path)
+    try:
+        assert list(merged) == ["a", "b", "c"]
+        assert list(kept.first) == [0, 1, 0, 3, 1]
+    finally:
+        merged.close()
+        kept.close()
+
+
+def test_newline_only_split(tmp_path, monkeypatch):
+    lines = ["Smith, John", "Doe;Jane", "Smith, John"]
+    path = _write(tmp_path, monkeypatch, lines)
+    mapped = open_roster(path, split=False)
+    try:
+        assert list(mapped) == split_names("\n".join(lines), split=False) == lines
+    finally:
+        mapped.close()
+
+
+def test_lru_on_mapped_roster_decodes_only_drawn(tmp_path, monkeypatch):
+    path = _write(tmp_path, monkeypatch, [f"s{i}" for i in range(2000)])
+    mapped = open_roster(path)
+    try:
+        sampler = SmartSampler(mode=SmartSampler.MODE_LRU, seed=5)
+        drawn = []
+        for _ in range(4):
+            drawn += sampler.smart_sample(mapped, 50)
+        assert len(set(drawn)) == 200
+        assert len(mapped._positions) == 200
+    finally:
+        mapped.close()
+
+
+def test_lru_on_mapped_roster_with_duplicates(tmp_path, monkeypatch):
+    path = _write(tmp_path, monkeypatch, ["a", "b", "a", "c", "b", "d"])
+    mapped = open_roster(path)
+    try:
+        sampler = SmartSampler(mode=SmartSampler.MODE_LRU, seed=3)
+        first = sampler.smart_sample(mapped, 2)
+        second = sampler.smart_sample(mapped, 2)
+        assert sorted(first + second) == ["a", "b", "c", "d"]
+    finally:
+        mapped.close()
+
+
+def test_stale_cache_entries_are_evicted(tmp_path, monkeypatch):
+    path = _write(tmp_path, monkeypatch, ["a", "b"])
+    open_roster(path).close()
+    cache = tmp_path / "cache"
+    before = set(p.name for p in cache.iterdir())
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("c\n")
+    os.utime(path, ns=(0, 10 ** 18))
+    mapped = open_roster(path)
+    try:
+        assert list(mapped) == ["a", "b", "c"]
+    finally:
+        mapped.close()
+    after = set(p.name for p in cache.iterdir())
+    assert before and not before & after and len(after) == 1
+    roster.forget(path)
+    assert not list(cache.iterdir())
+
+
+def test_roster_size_does_not_keep_roster_open(tmp_path, monkeypatch):
+    path = _write(tmp_path, monkeypatch, ["a", "b", "a"])
+    opened = []
+    real = roster.MappedRoster.close
+    monkeypatch.setattr(roster.MappedRoster, "close", lambda self: opened.remove(self) or real(self))
+    real_init = roster.MappedRoster.__init__
+
+    def init(self, *args, **kwargs):
+        real_init(self, *args, **kwargs)
+        opened.append(self)
+
+    monkeypatch.setattr(roster.MappedRoster, "__init__", init)
+    assert roster.roster_size(path) == 3
+    assert roster.roster_size(path, merge=True) == 2
+    assert roster.roster_size(path) == 3
+    assert not opened
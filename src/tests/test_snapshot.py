@@ -0,0 +1,55 @@
+"""抽样快照：增量提交与整体编码一致、保存后恢复得到相同的状态"""
+import pytest
+
+from core import snapshot
+from core.population import PreparedPopulation
+from core.sampler import SmartSampler
+from core.snapshot import capture_state, encode_state, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(snapshot, "_writer", snapshot.SnapshotWriter())
+    return tmp_path
+
+
+def _bound(names, **kwargs):
+    sampler = SmartSampler(seed=4, **kwargs)
+    population = PreparedPopulation(names)
+    sampler.bind_population(population)
+    return sampler, population
+
+
+def test_capture_copies_only_changed_ids():
+    sampler, population = _bound([f"s{i}" for i in range(1000)], mode=SmartSampler.MODE_SMART)
+    assert capture_state(sampler, population).uids is None
+    sampler.smart_sample(population, 3)
+    delta = capture_state(sampler, population)
+    assert delta.uids is not None and len(delta.uids) == 3
+    assert capture_state(sampler, population).uids.tolist() == []
+    sampler.reset_history()
+    assert capture_state(sampler, population).uids is None
+
+
+@pytest.mark.parametrize("decay_unit", [None, "draw"])
+def test_incremental_saves_match_full_encoding(snapshot_dir, decay_unit):
+    names = [f"s{i % 40}" for i in range(50)]
+    sampler, population = _bound(names, mode=SmartSampler.MODE_SMART)
+    if decay_unit:
+        sampler.set_decay(decay_unit, 0.9)
+    for _ in range(30):
+        sampler.smart_sample(population, 4)
+        save_snapshot(sampler, population)
+    snapshot.flush_snapshots()
+    path = snapshot.snapshot_path(population.fingerprint)
+    with open(path, "rb") as f:
+        assert f.read() == encode_state(sampler, population)
+
+    restored, fresh = _bound(names, mode=SmartSampler.MODE_SMART)
+    if decay_unit:
+        restored.set_decay(decay_unit, 0.9)
+    assert load_snapshot(restored, fresh)
+    assert encode_state(restored, fresh) == encode_state(sampler, population)
+    assert dict(restored.selection_history.items()) == dict(sampler.selection_history.items())
+    assert restored.total_selections == sampler.total_selections == 30
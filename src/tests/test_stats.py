@@ -0,0 +1,70 @@
+"""增量统计（SelectionStats）：逐次 / 批量更新与重建后的指标与直接计算一致"""
+import random
+
+import pytest
+
+from core.stats import SelectionStats
+
+
+def _direct(counts, n):
+    """由完整的次数列表直接计算各指标（未抽中过的样本计 0）"""
+    values = list(counts.values()) + [0] * (n - len(counts))
+    total = sum(values)
+    mean = total / n
+    variance = sum((c - mean) ** 2 for c in values) / n
+    diff = sum(abs(a - b) for a in values for b in values) / 2
+    gini = diff / (n * total) if total else 0.0
+    chi2 = sum((c - mean) ** 2 / mean for c in values) if total else 0.0
+    return variance, gini, chi2
+
+
+def _check(stats, counts, n):
+    variance, gini, chi2 = _direct(counts, n)
+    assert stats.variance() == pytest.approx(variance)
+    assert stats.gini() == pytest.approx(gini)
+    assert stats.chi_square()[0] == pytest.approx(chi2)
+    seen = {k: c for k, c in counts.items() if c}
+    if seen:
+        assert stats.most_selected()[1] == max(seen.values())
+        assert stats.least_selected()[1] == min(seen.values())
+        assert counts[stats.most_selected()[0]] == max(seen.values())
+
+
+def test_incremental_updates_match_direct_computation():
+    rng = random.Random(8)
+    n = 12
+    stats = SelectionStats()
+    stats.set_population_size(n)
+    batched = SelectionStats()
+    batched.set_population_size(n)
+    counts = {}
+    for _ in range(200):
+        keys = [rng.randrange(n) for _ in range(rng.randint(1, 4))]
+        old = []
+        for key in keys:
+            old.append(counts.get(key, 0))
+            stats.add(key, counts.get(key, 0))
+            counts[key] = counts.get(key, 0) + 1
+        # 同一键在一次抽取中出现多次（重名）时原次数依次递增
+        batched.add_many(keys, old)
+        _check(stats, counts, n)
+        _check(batched, counts, n)
+
+    rebuilt = SelectionStats()
+    rebuilt.set_population_size(n)
+    rebuilt.rebuild(counts)
+    for name in ("variance", "gini"):
+        assert getattr(rebuilt, name)() == pytest.approx(getattr(stats, name)())
+    assert rebuilt.chi_square()[0] == pytest.approx(stats.chi_square()[0])
+    assert rebuilt.most_selected()[1] == stats.most_selected()[1]
+
+
+def test_labels_and_empty_stats():
+    stats = SelectionStats()
+    assert stats.summary()["most_selected"] is None and stats.gini() == 0.0
+    stats.rebuild({0: 2, 1: 1}, labels=["甲", "乙"])
+    stats.set_population_size(3)
+    assert stats.most_selected() == ("甲", 2)
+    assert stats.least_selected() == ("乙", 1)
+    stats.add_many([1], [1])
+    assert stats.summary()["picked_total"] == 4
@@ -0,0 +1,51 @@
+"""高级配置编译为抽取策略：阶段组合与配置修改后的重新编译"""
+from core.sampler import SmartSampler
+from core.strategy import (DrawStrategy, MultiDrawBestStage, NoReplaceStage, ShuffleStage,
+                           WeightedStage, compile_strategy)
+
+
+def _config(**changes):
+    cfg = dict(SmartSampler(mode=SmartSampler.MODE_ADVANCED).advanced_config)
+    cfg.update(changes)
+    return cfg
+
+
+def test_compile_stages_and_terminals():
+    strategy = compile_strategy(_config())
+    assert isinstance(strategy, DrawStrategy)
+    assert strategy.stages == () and isinstance(strategy.terminal, WeightedStage)
+
+    # 不放回先于预处理阶段判断，打乱阶段被忽略
+    strategy = compile_strategy(_config(with_replacement=False, shuffle_before=True))
+    assert strategy.stages == () and isinstance(strategy.terminal, NoReplaceStage)
+
+    strategy = compile_strategy(_config(shuffle_before=True, multi_draw_best=True, multi_draw_count=5))
+    assert [type(s) for s in strategy.stages] == [ShuffleStage]
+    assert isinstance(strategy.terminal, MultiDrawBestStage) and strategy.terminal.count == 5
+
+
+def test_every_config_mutation_recompiles():
+    sampler = SmartSampler(mode=SmartSampler.MODE_ADVANCED, seed=1)
+    cfg = sampler.advanced_config
+    mutations = [
+        lambda: cfg.__setitem__("shuffle_before", True),
+        lambda: cfg.update(shuffle_count=2),
+        lambda: cfg.setdefault("extra_key", 1),
+        lambda: cfg.pop("extra_key"),
+        lambda: cfg.__ior__({"multi_draw_best": True}),
+        lambda: cfg.__delitem__("shuffle_count"),
+        lambda: cfg.popitem(),
+        lambda: cfg.clear(),
+    ]
+    for mutate in mutations:
+        compiled = sampler.apply_advanced_config()
+        assert sampler.apply_advanced_config() is compiled
+        mutate()
+        assert sampler._strategy is None
+
+
+def test_apply_same_config_reuses_strategy():
+    sampler = SmartSampler(mode=SmartSampler.MODE_ADVANCED, seed=1)
+    compiled = sampler.apply_advanced_config()
+    assert sampler.apply_advanced_config({"shuffle_before": False}) is compiled
+    assert sampler.apply_advanced_config({"shuffle_before": True}) is not compiled
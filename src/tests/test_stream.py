@@ -0,0 +1,85 @@
+"""流式抽取：蓄水池抽样的分布、与读入列表一致的切分、权重列识别与 .rcp / GBK 流"""
+import io
+import random
+from base64 import b64encode
+
+from core.inclusion import exact_inclusion
+from core.roster import split_names
+from core.stream import (reservoir_sample, sniff_weight_column, stream_draw, stream_draw_file,
+                         weighted_reservoir_sample)
+
+TRIALS = 20000
+
+
+def _frequencies(draw, n, trials=TRIALS):
+    hits = [0] * n
+    for _ in range(trials):
+        for i in draw():
+            hits[i] += 1
+    return [h / trials for h in hits]
+
+
+def _within(freq, p, trials=TRIALS):
+    return abs(freq - p) <= 4 * (p * (1 - p) / trials) ** 0.5 + 1e-9
+
+
+def test_reservoir_sample_is_uniform():
+    rng = random.Random(5)
+    n, k = 9, 3
+
+    def draw():
+        chosen, total = reservoir_sample(range(n), k, rng)
+        assert total == n and len(set(chosen)) == k
+        return chosen
+
+    assert all(_within(f, k / n) for f in _frequencies(draw, n))
+    assert reservoir_sample(range(2), 5, rng)[1] == 2
+    assert reservoir_sample(iter(range(4)), 0, rng) == ([], 4)
+
+
+def test_weighted_reservoir_matches_exact_inclusion():
+    weights = [5.0, 1.0, 2.0, 0.5, 3.0, 0.0, 2.5]
+    rng = random.Random(6)
+    k = 3
+
+    def draw():
+        chosen, total = weighted_reservoir_sample(enumerate(weights), k, rng)
+        assert total == len(weights) and len(set(chosen)) == k
+        return chosen
+
+    freqs = _frequencies(draw, len(weights))
+    assert all(_within(f, p) for f, p in zip(freqs, exact_inclusion(weights, k)))
+
+
+def test_stream_draw_splits_like_the_list_path():
+    text = "张三, 李四\n\n王五\t赵六\n  钱七　\n孙八;周九\n"
+    result = stream_draw(io.BytesIO(text.encode("utf-8")), 100, random.Random(1))
+    assert not result.weighted and result.encoding == "utf-8"
+    assert result.total == len(split_names(text))
+    assert sorted(result.names) == sorted(split_names(text))
+
+
+def test_stream_draw_weight_column_and_rcp():
+    lines = [f"s{i},{'0' if i % 2 else '1.5'}" for i in range(30)]
+    raw = "\n".join(lines).encode("utf-8")
+    result = stream_draw(io.BytesIO(raw), 10, random.Random(2))
+    assert result.weighted and result.total == 30
+    assert all(int(name[1:]) % 2 == 0 for name in result.names)
+
+    rcp = stream_draw(io.BytesIO(b64encode(raw)), 10, random.Random(2), rcp=True)
+    assert rcp.names == result.names
+    plain = stream_draw(io.BytesIO(raw), 60, random.Random(2), weight_column=None)
+    assert plain.total == 60 and not plain.weighted
+
+
+def test_stream_draw_file_gbk_and_sniff(tmp_path):
+    utf8 = tmp_path / "weighted.txt"
+    utf8.write_text("张三,1\n李四,2\n王五,3\n", encoding="utf-8")
+    assert sniff_weight_column(str(utf8)) == 1
+    # GBK 文件逐行读取、不拆分，因此没有权重列
+    gbk = tmp_path / "names.txt"
+    gbk.write_bytes("张三,1\n李四,2\n王五,3\n".encode("gbk"))
+    assert sniff_weight_column(str(gbk)) is None
+    result = stream_draw_file(str(gbk), 3, random.Random(3))
+    assert result.encoding == "gbk" and not result.weighted
+    assert sorted(result.names) == sorted(["张三,1", "李四,2", "王五,3"])